@@ -0,0 +1,163 @@
+import sys
+import os
+import time
+import tempfile
+import random
+import string
+import tracemalloc
+from typing import Dict, List
+import json
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fuzzy_index import DEFAULT_PREFIX_LENGTH, MAX_DISTANCE, FuzzyIndex
+
+
+def generate_lines(num_lines: int) -> List[str]:
+    return [
+        ''.join(random.choices(
+            string.ascii_letters + string.digits, k=random.randint(20, 50)
+        ))
+        for _ in range(num_lines)
+    ]
+
+
+def add_typos(line: str, edits: int) -> str:
+    """Apply ``edits`` random substitutions, insertions or deletions."""
+    chars = list(line)
+    for _ in range(edits):
+        i = random.randrange(len(chars))
+        op = random.choice('sid')
+        if op == 's':
+            chars[i] = random.choice(string.ascii_letters)
+        elif op == 'i':
+            chars.insert(i, random.choice(string.ascii_letters))
+        else:
+            del chars[i]
+    return ''.join(chars)
+
+
+def benchmark_distance(
+    filepath: str,
+    lines: List[str],
+    distance: int,
+    num_queries: int = 200
+) -> Dict:
+    print(f"\nBenchmarking: fuzzy index, k={distance}")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = FuzzyIndex(filepath, distance, DEFAULT_PREFIX_LENGTH)
+    build_seconds = time.perf_counter() - start
+    memory, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    hit_queries = [
+        add_typos(random.choice(lines), distance) for _ in range(num_queries)
+    ]
+    miss_queries = [
+        "NONEXISTENT_" + ''.join(random.choices(string.ascii_letters, k=20))
+        for _ in range(num_queries)
+    ]
+
+    results = {}
+    for label, queries in (('typo', hit_queries), ('miss', miss_queries)):
+        times = []
+        found = 0
+        for query in queries:
+            start = time.perf_counter()
+            match = index.nearest(query, distance)
+            times.append(time.perf_counter() - start)
+            found += match is not None
+        times.sort()
+        results[label] = {
+            'avg_time_ms': sum(times) / len(times) * 1000,
+            'p99_time_ms': times[int(len(times) * 0.99)] * 1000,
+            'found': found,
+        }
+        print(f"  {label}: avg {results[label]['avg_time_ms']:.3f}ms, "
+              f"p99 {results[label]['p99_time_ms']:.3f}ms, "
+              f"{found}/{len(queries)} found")
+
+    variants = len(index.variants)
+    index.close()
+    print(f"  Build: {build_seconds:.2f}s, {variants:,} variants, "
+          f"{memory / 1024 / 1024:.1f}MB (peak {peak / 1024 / 1024:.1f}MB)")
+
+    return {
+        'distance': distance,
+        'build_seconds': build_seconds,
+        'variants': variants,
+        'memory_mb': memory / 1024 / 1024,
+        'peak_memory_mb': peak / 1024 / 1024,
+        'queries': results,
+    }
+
+
+def main():
+    print("=" * 60)
+    print("STRING SEARCH SERVER - FUZZY INDEX BENCHMARK")
+    print("=" * 60)
+
+    file_sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 50000, 100000]
+
+    all_results = {}
+
+    for file_size in file_sizes:
+        print(f"\n{'=' * 60}")
+        print(f"Testing with {file_size:,} lines")
+        print(f"{'=' * 60}")
+
+        lines = generate_lines(file_size)
+        test_file = tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False,
+            suffix='.txt'
+        )
+        with test_file:
+            for line in lines:
+                test_file.write(line + '\n')
+
+        all_results[file_size] = [
+            benchmark_distance(test_file.name, lines, distance)
+            for distance in range(1, MAX_DISTANCE + 1)
+        ]
+
+        os.unlink(test_file.name)
+
+    output_path = os.path.join(
+        os.path.dirname(__file__),
+        'results',
+        'fuzzy_results.json'
+    )
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    with open(output_path, 'w') as f:
+        json.dump(all_results, f, indent=2)
+
+    print(f"\n{'=' * 60}")
+    print(f"Results saved to: {output_path}")
+    print(f"{'=' * 60}")
+
+    print("\nSUMMARY")
+    print("-" * 78)
+    print(f"{'File Size':<12} | {'k':<2} | {'Build (s)':<9} | "
+          f"{'Memory (MB)':<11} | {'Typo (ms)':<9} | {'Miss (ms)':<9}")
+    print("-" * 78)
+    for file_size in file_sizes:
+        for result in all_results[file_size]:
+            print(
+                f"{file_size:<12,} | {result['distance']:<2} | "
+                f"{result['build_seconds']:<9.2f} | "
+                f"{result['memory_mb']:<11.1f} | "
+                f"{result['queries']['typo']['avg_time_ms']:<9.3f} | "
+                f"{result['queries']['miss']['avg_time_ms']:<9.3f}"
+            )
+        print("-" * 78)
+
+    return all_results
+
+
+if __name__ == "__main__":
+    results = main()
@@ -1,31 +1,101 @@
+"""Micro-benchmarks of every registered lookup engine.
+
+Each engine is loaded through ``FileSearcher`` and queried with
+``exists()``, the same calls the server makes, so the numbers cover the
+code that runs in production. For every corpus size and engine, each
+repeat measures:
+
+* build: constructing the searcher with no saved index file;
+* open: constructing it again, reusing the index file just written;
+* cold: one pass over the queries right after the corpus and index file
+  were evicted from the page cache;
+* warm: further passes over the same queries.
+
+Repeats are summarized as a mean with a 95% confidence interval; the
+per-query latency distribution pools every warm query of every repeat.
+
+Memory and build cost are measured separately, one engine at a time in a
+fresh interpreter so earlier runs do not inflate its RSS: build wall and
+CPU time, peak and steady-state RSS, the heap tracemalloc attributes to
+the searcher, bytes per indexed line and the size of the index file.
+
+The results file records the host it was produced on and each query's
+warm latency, so ``compare_results.py`` can test a candidate run against
+a baseline. Use ``--output`` to keep a baseline from being overwritten.
+"""
+import argparse
+import gc
+import multiprocessing
+import platform
+import resource
 import sys
 import os
 import time
 import tempfile
 import random
+import statistics
 import string
-from typing import List, Dict, Tuple, Callable
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Tuple
 import json
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from search import (
-    search_method_simple,
-    search_method_set,
-    search_method_grep,
-    search_method_mmap,
-    search_method_binary
-)
+from searcher import ENGINES, FileSearcher
+
+
+# Two-sided 95% Student t quantiles by degrees of freedom
+T_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447,
+    7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131,
+    20: 2.086, 30: 2.042,
+}
+
+# Whether evicting a file from the page cache is possible here
+CAN_EVICT = hasattr(os, 'posix_fadvise')
+
+
+def host_metadata() -> Dict:
+    """Describe the machine and software the benchmark ran on."""
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'hostname': platform.node(),
+        'cpu': cpu,
+        'cpu_count': os.cpu_count(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'python_implementation': platform.python_implementation(),
+        'system': platform.system(),
+        'kernel': platform.release(),
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
 
 
-def generate_test_file(
-    num_lines: int,
-    output_path: str,
-    sorted_file: bool = False
-) -> List[str]:
+def generate_test_file(num_lines: int, output_path: str) -> List[str]:
     print(f"Generating {num_lines:,} lines...")
-    
+
     lines = []
     for i in range(num_lines):
         length = random.randint(20, 50)
@@ -33,94 +103,311 @@ def generate_test_file(
             random.choices(string.ascii_letters + string.digits, k=length)
         )
         lines.append(line)
-    
-    if sorted_file:
-        lines.sort()
-    
+
     with open(output_path, 'w', encoding='utf-8') as f:
         for line in lines:
             f.write(line + '\n')
-    
+
     print(f"Generated file: {output_path}")
     return lines
 
 
-def benchmark_search_method(
-    method_func: Callable,
-    method_name: str,
+def confidence_interval(values: List[float]) -> float:
+    """Half-width of the 95% confidence interval of the mean."""
+    if len(values) < 2:
+        return 0.0
+    df = len(values) - 1
+    t = T_95[max(k for k in T_95 if k <= df)] if df <= 30 else 1.96
+    return t * statistics.stdev(values) / len(values) ** 0.5
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[idx]
+
+
+def evict(paths: List[str]) -> None:
+    """Drop ``paths`` from the page cache so the next reads go to disk."""
+    if not CAN_EVICT:
+        return
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process now."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size since the last ``reset_peak_rss()``."""
+    # Unlike ru_maxrss, VmHWM is not carried over from the parent process
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def reset_peak_rss() -> None:
+    """Restart peak RSS tracking from the current RSS (Linux 4.0+)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def profile_build(engine: str, filepath: str, num_lines: int) -> Dict:
+    """Measure the memory and build cost of one engine.
+
+    Meant to run in a fresh process. The index is built twice from
+    scratch: once timed, once under tracemalloc, which slows allocation
+    too much to time. Steady-state RSS includes the pages of mapped index
+    files touched while building, which the kernel can reclaim.
+    """
+    index_path = filepath + ENGINES[engine].index_suffix
+
+    def remove_index():
+        if index_path != filepath and os.path.exists(index_path):
+            os.unlink(index_path)
+
+    remove_index()
+    reset_peak_rss()
+    baseline = current_rss_bytes()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    searcher = FileSearcher(filepath, engine=engine)
+    build_wall = time.perf_counter() - wall_start
+    build_cpu = time.process_time() - cpu_start
+    # Fingerprint builds may use worker processes
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    build_cpu += (after.ru_utime - children.ru_utime
+                  + after.ru_stime - children.ru_stime)
+    peak_rss = peak_rss_bytes() - baseline
+    rss = current_rss_bytes() - baseline
+    index_bytes = (
+        os.path.getsize(index_path) if index_path != filepath else 0
+    )
+    searcher.close()
+    del searcher
+    gc.collect()
+    remove_index()
+
+    tracemalloc.start()
+    searcher = FileSearcher(filepath, engine=engine)
+    heap, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    searcher.close()
+    remove_index()
+
+    return {
+        'corpus_bytes': os.path.getsize(filepath),
+        'build_wall_s': build_wall,
+        'build_cpu_s': build_cpu,
+        'peak_rss_bytes': peak_rss,
+        'rss_bytes': rss,
+        'heap_bytes': heap,
+        'heap_peak_bytes': heap_peak,
+        'bytes_per_line': heap / num_lines if num_lines else 0.0,
+        'index_file_bytes': index_bytes,
+    }
+
+
+def profile_engine(engine: str, filepath: str, num_lines: int) -> Dict:
+    """Run ``profile_build()`` in a newly started interpreter."""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        profile = pool.apply(profile_build, (engine, filepath, num_lines))
+
+    mb = 1024 * 1024
+    print(f"  Memory: {profile['rss_bytes'] / mb:.1f} MB RSS "
+          f"(peak {profile['peak_rss_bytes'] / mb:.1f} MB), "
+          f"{profile['heap_bytes'] / mb:.1f} MB heap, "
+          f"{profile['bytes_per_line']:.1f} B/line, "
+          f"index file {profile['index_file_bytes'] / mb:.1f} MB")
+    print(f"  Build cost: {profile['build_wall_s']:.3f}s wall, "
+          f"{profile['build_cpu_s']:.3f}s CPU")
+    return profile
+
+
+def time_queries(
+    searcher: FileSearcher,
+    engine: str,
+    test_queries: List[Tuple[str, bool]]
+) -> List[float]:
+    """Run every query once and return its latency in seconds."""
+    times = []
+    for query, should_exist in test_queries:
+        start = time.perf_counter()
+        found = searcher.exists(query)
+        times.append(time.perf_counter() - start)
+
+        if found != should_exist:
+            print(
+                f"  WARNING: {engine}: incorrect result for '{query}' "
+                f"(expected {should_exist}, got {found})"
+            )
+    return times
+
+
+def benchmark_engine(
+    engine: str,
     filepath: str,
     test_queries: List[Tuple[str, bool]],
-    num_runs: int = 5
+    repeats: int = 5,
+    warm_passes: int = 3
 ) -> Dict:
-   
-    print(f"\nBenchmarking: {method_name}")
-    
-    times = []
-    
-    for query, should_exist in test_queries:
-        query_times = []
-        
-        for _ in range(num_runs):
-            try:
-                found, elapsed = method_func(filepath, query)
-                query_times.append(elapsed)
-                
-               
-                if found != should_exist:
-                    print(
-                        f"  WARNING: Incorrect result for '{query}' "
-                        f"(expected {should_exist}, got {found})"
-                    )
-            except Exception as e:
-                print(f"  ERROR: {e}")
-                query_times.append(float('inf'))
-        
-        query_times.sort()
-        median_time = query_times[len(query_times) // 2]
-        times.append(median_time)
-    
-    avg_time = sum(times) / len(times) if times else 0
-    min_time = min(times) if times else 0
-    max_time = max(times) if times else 0
-    
-    print(f"  Average: {avg_time * 1000:.3f}ms")
-    print(f"  Min: {min_time * 1000:.3f}ms")
-    print(f"  Max: {max_time * 1000:.3f}ms")
-    
-    return {
-        'method': method_name,
-        'avg_time_ms': avg_time * 1000,
-        'min_time_ms': min_time * 1000,
-        'max_time_ms': max_time * 1000,
-        'times': [t * 1000 for t in times]
+    print(f"\nBenchmarking: {engine}")
+
+    index_path = filepath + ENGINES[engine].index_suffix
+    files = [filepath] if index_path == filepath else [filepath, index_path]
+    build_times = []
+    open_times = []
+    cold_means = []
+    warm_means = []
+    cold_latencies: List[float] = []
+    warm_latencies: List[float] = []
+    # Warm latencies of each query, across passes and repeats
+    per_query: List[List[float]] = [[] for _ in test_queries]
+
+    for _ in range(repeats):
+        if index_path != filepath and os.path.exists(index_path):
+            os.unlink(index_path)
+        evict(files)
+        start = time.perf_counter()
+        searcher = FileSearcher(filepath, engine=engine)
+        build_times.append(time.perf_counter() - start)
+        searcher.close()
+
+        evict(files)
+        start = time.perf_counter()
+        searcher = FileSearcher(filepath, engine=engine)
+        open_times.append(time.perf_counter() - start)
+        try:
+            # Pages of an index file are first touched by the queries
+            cold = time_queries(searcher, engine, test_queries)
+            warm = []
+            for _ in range(warm_passes):
+                times = time_queries(searcher, engine, test_queries)
+                for samples, elapsed in zip(per_query, times):
+                    samples.append(elapsed)
+                warm.extend(times)
+        finally:
+            searcher.close()
+
+        cold_means.append(statistics.mean(cold))
+        warm_means.append(statistics.mean(warm))
+        cold_latencies.extend(cold)
+        warm_latencies.extend(warm)
+
+    if index_path != filepath and os.path.exists(index_path):
+        os.unlink(index_path)
+    cold_latencies.sort()
+    warm_latencies.sort()
+
+    result = {
+        'method': engine,
+        'repeats': repeats,
+        'queries': len(test_queries),
+        'cold_cache': CAN_EVICT,
+        # Warm per-query latency, as charted by generate_report.py
+        'avg_time_ms': statistics.mean(warm_latencies) * 1000,
+        'min_time_ms': warm_latencies[0] * 1000,
+        'max_time_ms': warm_latencies[-1] * 1000,
+        'build_s': statistics.mean(build_times),
+        'build_ci95_s': confidence_interval(build_times),
+        'open_s': statistics.mean(open_times),
+        'open_ci95_s': confidence_interval(open_times),
+        # Median warm latency of each query, for compare_results.py
+        'samples_ms': [
+            round(statistics.median(samples) * 1000, 6)
+            for samples in per_query
+        ],
     }
+    for phase, means, latencies in (
+        ('cold', cold_means, cold_latencies),
+        ('warm', warm_means, warm_latencies),
+    ):
+        result[f'{phase}_mean_ms'] = statistics.mean(means) * 1000
+        result[f'{phase}_ci95_ms'] = confidence_interval(means) * 1000
+        for pct, label in ((50, 'p50'), (90, 'p90'), (99, 'p99')):
+            result[f'{phase}_{label}_ms'] = (
+                percentile(latencies, pct) * 1000
+            )
+
+    print(f"  Build: {result['build_s']:.3f}s "
+          f"± {result['build_ci95_s']:.3f}s")
+    print(f"  Open:  {result['open_s']:.3f}s "
+          f"± {result['open_ci95_s']:.3f}s")
+    for phase in ('cold', 'warm'):
+        print(
+            f"  {phase.capitalize()}:  {result[f'{phase}_mean_ms']:.4f}ms "
+            f"± {result[f'{phase}_ci95_ms']:.4f}ms  "
+            f"(p50 {result[f'{phase}_p50_ms']:.4f}ms, "
+            f"p99 {result[f'{phase}_p99_ms']:.4f}ms)"
+        )
+
+    return result
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark every registered lookup engine'
+    )
+    parser.add_argument(
+        '--sizes', default='10000,50000,100000,250000,500000,1000000',
+        help='corpus sizes in lines'
+    )
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200,
+                        help='queries per pass, half of them misses')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed for the corpora and queries; runs to be '
+                             'compared must use the same seed')
+    parser.add_argument('--skip-memory', action='store_true',
+                        help='do not profile memory and build cost')
+    parser.add_argument(
+        '--output',
+        default=os.path.join(
+            os.path.dirname(__file__), 'results', 'benchmark_results.json'
+        ),
+        help='results file (write baselines somewhere else)'
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("STRING SEARCH SERVER - PERFORMANCE BENCHMARK")
     print("=" * 60)
-    
-    # Test files
-    file_sizes = [10000, 50000, 100000, 250000, 500000, 1000000]
-    
-    # Search methods 
-    search_methods = [
-        (search_method_simple, "Simple Loop"),
-        (search_method_set, "Set Lookup"),
-        (search_method_grep, "Grep Command"),
-        (search_method_mmap, "Memory Mapped"),
-        (search_method_binary, "Binary Search (sorted)")
-    ]
-    
-  
+    if not CAN_EVICT:
+        print("posix_fadvise unavailable: cold runs use a warm page cache")
+
+    random.seed(args.seed)
+    file_sizes = [int(size) for size in args.sizes.split(',')]
+    engines = [engine.strip() for engine in args.engines.split(',')]
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"unknown engine: {engine}")
+
     all_results = {}
-    
+
     for file_size in file_sizes:
         print(f"\n{'=' * 60}")
         print(f"Testing with {file_size:,} lines")
         print(f"{'=' * 60}")
-        
+
         # Generate test file
         test_file = tempfile.NamedTemporaryFile(
             mode='w',
@@ -128,90 +415,75 @@ def main():
             suffix='.txt'
         )
         test_file.close()
-        
+
         lines = generate_test_file(file_size, test_file.name)
-        
-        #sorted file for binary search
-        sorted_file = tempfile.NamedTemporaryFile(
-            mode='w',
-            delete=False,
-            suffix='_sorted.txt'
-        )
-        sorted_file.close()
-        generate_test_file(file_size, sorted_file.name, sorted_file=True)
-        
+
         # Prepare test queries
-        test_queries = []
-
-        #existing queries
-        indices = [0, file_size // 4, file_size // 2,
-                   3 * file_size // 4, file_size - 1]
-        for idx in indices:
-            if idx < len(lines):
-                test_queries.append((lines[idx], True))
-        
-        # non-existing queries
-        for _ in range(5):
+        hits = random.sample(lines, min(args.queries // 2, len(lines)))
+        test_queries = [(line, True) for line in hits]
+        for _ in range(args.queries - len(hits)):
             non_exist = "NONEXISTENT_" + ''.join(
                 random.choices(string.ascii_letters, k=20)
             )
             test_queries.append((non_exist, False))
-        
+        random.shuffle(test_queries)
+
         # Benchmarking
         results = []
-        
-        for method_func, method_name in search_methods:
-           
-            if method_name == "Binary Search (sorted)":
-                filepath = sorted_file.name
-            else:
-                filepath = test_file.name
-            
-            result = benchmark_search_method(
-                method_func,
-                method_name,
-                filepath,
+
+        for engine in engines:
+            result = benchmark_engine(
+                engine,
+                test_file.name,
                 test_queries,
-                num_runs=3
+                repeats=args.repeats
             )
             result['file_size'] = file_size
+            if not args.skip_memory:
+                result.update(
+                    profile_engine(engine, test_file.name, file_size)
+                )
             results.append(result)
-        
+
         all_results[file_size] = results
-        
+
         # Cleanup
         os.unlink(test_file.name)
-        os.unlink(sorted_file.name)
-    
- 
-    output_path = os.path.join(
-        os.path.dirname(__file__),
-        'results',
-        'benchmark_results.json'
-    )
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
+
+    output_path = args.output
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
     with open(output_path, 'w') as f:
-        json.dump(all_results, f, indent=2)
-    
+        json.dump({
+            'host': host_metadata(),
+            'settings': {
+                'seed': args.seed,
+                'repeats': args.repeats,
+                'queries': args.queries,
+            },
+            'results': all_results,
+        }, f, indent=2)
+
     print(f"\n{'=' * 60}")
     print(f"Results saved to: {output_path}")
     print(f"{'=' * 60}")
-    
+
     # Print summary
-    print("\nSUMMARY (Average times in ms)")
+    print("\nSUMMARY (warm ms/query, build s)")
     print("-" * 60)
-    print(f"{'File Size':<15} | {'Method':<25} | {'Time (ms)':<10}")
+    print(f"{'File Size':<12} | {'Engine':<12} | {'Query (ms)':<15} | "
+          f"{'Build (s)':<10}")
     print("-" * 60)
-    
+
     for file_size in file_sizes:
         for result in all_results[file_size]:
             print(
-                f"{file_size:<15,} | {result['method']:<25} | "
-                f"{result['avg_time_ms']:<10.3f}"
+                f"{file_size:<12,} | {result['method']:<12} | "
+                f"{result['warm_mean_ms']:.4f} ± {result['warm_ci95_ms']:.4f}"
+                f" | {result['build_s']:<10.3f}"
             )
         print("-" * 60)
-    
+
     return all_results
 
 
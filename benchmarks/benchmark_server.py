@@ -0,0 +1,401 @@
+"""End-to-end load tests against a live server.
+
+Each server setup (server mode x SSL) is started as a real server.py
+process and driven over sockets with the client library, in two ways:
+
+* closed loop: N clients each send a query, wait for the answer and send
+  the next one, swept over the ``--concurrency`` levels;
+* open loop: queries are due at a fixed arrival rate whatever the server
+  does, swept over the ``--rates``. Latency is measured from when a query
+  was due, not from when it was sent, so a server that falls behind is
+  charged for the queueing it causes (no coordinated omission).
+
+Results go to ``results/server_benchmark.json`` as one flat record per
+run, which ``generate_report.py`` charts.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import ssl
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from client import Client, ClientError
+
+
+SERVER_SCRIPT = os.path.join(
+    os.path.dirname(__file__), '..', 'src', 'server.py'
+)
+
+SERVER_MODES = ['threaded', 'asyncio']
+
+# Open-loop queries in flight at once; later ones wait, and the wait is
+# part of their latency
+MAX_OUTSTANDING = 256
+
+
+def generate_corpus(num_lines: int, output_path: str) -> List[str]:
+    print(f"Generating {num_lines:,} lines...")
+
+    lines = [
+        ''.join(random.choices(string.ascii_letters + string.digits, k=30))
+        for _ in range(num_lines)
+    ]
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+    return lines
+
+
+def generate_cert(workdir: str) -> Optional[Tuple[str, str]]:
+    """Create a self-signed certificate, or None without openssl."""
+    if shutil.which('openssl') is None:
+        return None
+    cert = os.path.join(workdir, 'cert.pem')
+    key = os.path.join(workdir, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key, '-out', cert, '-days', '1', '-subj', '/CN=localhost'],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def free_port(port: int) -> int:
+    """First port from ``port`` up that a server can bind."""
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(('127.0.0.1', port))
+                return port
+            except OSError:
+                port += 1
+
+
+def start_server(
+    corpus: str,
+    port: int,
+    workdir: str,
+    options: Dict[str, str]
+) -> subprocess.Popen:
+    """Start server.py with a generated config and wait until it listens."""
+    config_path = os.path.join(workdir, f'config_{port}.ini')
+    with open(config_path, 'w') as f:
+        f.write("[SERVER]\n")
+        f.write("host = 127.0.0.1\n")
+        f.write(f"port = {port}\n")
+        f.write(f"linuxpath = {corpus}\n")
+        for key, value in options.items():
+            f.write(f"{key} = {value}\n")
+
+    proc = subprocess.Popen(
+        [sys.executable, SERVER_SCRIPT, config_path],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def client_context(ssl_enabled: bool) -> Optional[ssl.SSLContext]:
+    """TLS context trusting the generated self-signed certificate."""
+    if not ssl_enabled:
+        return None
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[idx]
+
+
+def summarize(
+    latencies: List[float],
+    errors: Counter,
+    elapsed: float
+) -> Dict:
+    """Throughput, latency percentiles and error rate of one run."""
+    latencies.sort()
+    attempts = len(latencies) + sum(errors.values())
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_rate': sum(errors.values()) / attempts if attempts else 0.0,
+        'errors_by_type': dict(errors),
+        'elapsed_s': elapsed,
+        'throughput_qps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'p999_ms': percentile(latencies, 99.9) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def closed_loop(
+    port: int,
+    queries: List[str],
+    concurrency: int,
+    duration: float,
+    context: Optional[ssl.SSLContext] = None,
+    keepalive: bool = False
+) -> Dict:
+    """Run ``concurrency`` clients back to back for ``duration`` seconds."""
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+    # One pool shared by all clients, so TLS sessions are resumed
+    client = Client('127.0.0.1', port, pool_size=concurrency,
+                    ssl_context=context, keepalive=keepalive)
+
+    def run() -> None:
+        local = []
+        local_errors: Counter = Counter()
+        while time.perf_counter() < stop_at:
+            query = random.choice(queries)
+            start = time.perf_counter()
+            try:
+                client.exists(query)
+                local.append(time.perf_counter() - start)
+            except ClientError as e:
+                local_errors[type(e).__name__] += 1
+        with lock:
+            latencies.extend(local)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    result = summarize(latencies, errors, elapsed)
+    result.update(loop='closed', concurrency=concurrency, offered_rate=None)
+    return result
+
+
+def open_loop(
+    port: int,
+    queries: List[str],
+    rate: float,
+    duration: float,
+    context: Optional[ssl.SSLContext] = None,
+    keepalive: bool = False,
+    max_outstanding: int = MAX_OUTSTANDING
+) -> Dict:
+    """Offer ``rate`` queries per second for ``duration`` seconds.
+
+    Query i is due at ``start + i / rate``. A worker that picks it up late,
+    because every worker was busy, still measures from the due time.
+    """
+    latencies: List[float] = []
+    errors: Counter = Counter()
+    lock = threading.Lock()
+    total = int(rate * duration)
+    next_index = [0]
+    workers = min(max_outstanding, max(1, total))
+    client = Client('127.0.0.1', port, pool_size=workers,
+                    ssl_context=context, keepalive=keepalive)
+
+    def run() -> None:
+        local = []
+        local_errors: Counter = Counter()
+        while True:
+            with lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if i >= total:
+                break
+            due = start + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                client.exists(random.choice(queries))
+                local.append(time.perf_counter() - due)
+            except ClientError as e:
+                local_errors[type(e).__name__] += 1
+        with lock:
+            latencies.extend(local)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=run) for _ in range(workers)]
+    # Leave the threads time to start before the first query is due
+    start = time.perf_counter() + 0.1
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    result = summarize(latencies, errors, elapsed)
+    result.update(loop='open', concurrency=workers, offered_rate=rate)
+    return result
+
+
+def parse_list(text: str, kind=int) -> List:
+    """Parse a comma-separated list such as ``1,8,32``."""
+    return [kind(item) for item in text.split(',') if item.strip()]
+
+
+def print_result(result: Dict) -> None:
+    label = (
+        f"{result['concurrency']:>4} clients" if result['loop'] == 'closed'
+        else f"{result['offered_rate']:>7.0f} q/s offered"
+    )
+    print(
+        f"  {result['loop']:<6} {label}: "
+        f"{result['throughput_qps']:8.1f} q/s  "
+        f"p50 {result['p50_ms']:7.3f}ms  p90 {result['p90_ms']:7.3f}ms  "
+        f"p99 {result['p99_ms']:7.3f}ms  p99.9 {result['p999_ms']:7.3f}ms  "
+        f"errors {result['error_rate']:.2%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load-test server modes over real sockets'
+    )
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--concurrency', default='1,8,32,128',
+                        help='closed-loop client counts to sweep')
+    parser.add_argument('--rates', default='500,1000,2000,4000',
+                        help='open-loop arrival rates (queries/s) to sweep')
+    parser.add_argument('--loop', choices=('closed', 'open', 'both'),
+                        default='both')
+    parser.add_argument('--modes', default=','.join(SERVER_MODES))
+    parser.add_argument('--ssl', choices=('off', 'on', 'both'),
+                        default='both')
+    parser.add_argument('--protocol', choices=('oneshot', 'keepalive'),
+                        default='oneshot')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--max-outstanding', type=int,
+                        default=MAX_OUTSTANDING)
+    # Below the usual ephemeral range, where client sockets would collide
+    parser.add_argument('--port', type=int, default=30001)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("STRING SEARCH SERVER - END-TO-END LOAD TEST")
+    print("=" * 60)
+
+    workdir = tempfile.mkdtemp(prefix='ssbench-')
+    corpus = os.path.join(workdir, 'corpus.txt')
+    lines = generate_corpus(args.lines, corpus)
+    queries = random.sample(lines, min(1000, len(lines)))
+    queries += ["NONEXISTENT_" + q for q in queries[:len(queries) // 2]]
+
+    ssl_settings = {'off': [False], 'on': [True], 'both': [False, True]}
+    ssl_settings = ssl_settings[args.ssl]
+    keepalive = args.protocol == 'keepalive'
+
+    results = []
+    try:
+        cert = None
+        if True in ssl_settings:
+            cert = generate_cert(workdir)
+            if cert is None:
+                print("openssl not found; skipping SSL runs")
+                ssl_settings = [s for s in ssl_settings if not s]
+
+        port = args.port
+        for mode in parse_list(args.modes, str):
+            for ssl_enabled in ssl_settings:
+                print(f"\nBenchmarking: {mode}, "
+                      f"SSL {'on' if ssl_enabled else 'off'}, {args.protocol}")
+                options = {
+                    'server_mode': mode,
+                    'protocol': args.protocol,
+                    'SSL_ENABLED': str(ssl_enabled).lower(),
+                }
+                if ssl_enabled:
+                    options['cert_path'], options['key_path'] = cert
+                port = free_port(port)
+                proc = start_server(corpus, port, workdir, options)
+                context = client_context(ssl_enabled)
+                runs = []
+                try:
+                    if args.loop in ('closed', 'both'):
+                        for concurrency in parse_list(args.concurrency):
+                            runs.append(closed_loop(
+                                port, queries, concurrency, args.duration,
+                                context, keepalive
+                            ))
+                            print_result(runs[-1])
+                    if args.loop in ('open', 'both'):
+                        for rate in parse_list(args.rates, float):
+                            runs.append(open_loop(
+                                port, queries, rate, args.duration,
+                                context, keepalive, args.max_outstanding
+                            ))
+                            print_result(runs[-1])
+                finally:
+                    stop_server(proc)
+                    # A fresh port avoids TIME_WAIT on the next bind
+                    port += 1
+                for run in runs:
+                    run.update(mode=mode, ssl=ssl_enabled,
+                               protocol=args.protocol)
+                results.extend(runs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output_path = os.path.join(
+        os.path.dirname(__file__),
+        'results',
+        'server_benchmark.json'
+    )
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'=' * 60}")
+    print(f"Results saved to: {output_path}")
+    print(f"{'=' * 60}")
+
+    return results
+
+
+if __name__ == "__main__":
+    results = main()
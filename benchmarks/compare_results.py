@@ -0,0 +1,335 @@
+"""Compare a candidate benchmark run against a baseline.
+
+Both files are written by ``benchmark_search.py``. For every engine and
+corpus size present in both, the per-query warm latencies are compared
+with a one-sided Mann-Whitney U test and a bootstrap confidence interval
+of the ratio of medians. A slowdown is flagged as a regression when it is
+both significant (p below ``--alpha``) and larger than ``--threshold``.
+
+The verdict is written as JSON (``results/comparison.json`` by default),
+which ``generate_report.py`` includes in the PDF, and printed as a
+markdown table. The exit status is 1 when any regression is found.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Host fields that must match for a like-for-like comparison
+HOST_FIELDS = ('cpu', 'cpu_count', 'machine', 'python',
+               'python_implementation', 'kernel')
+
+# Benchmark settings that must match; the seed fixes corpora and queries
+SETTING_FIELDS = ('seed', 'repeats', 'queries')
+
+# Default relative slowdown that counts as a regression
+THRESHOLD = 0.10
+
+# Default significance level
+ALPHA = 0.01
+
+# Resamples drawn for each bootstrap interval
+BOOTSTRAP_ROUNDS = 2000
+
+
+def load_run(path: str) -> Tuple[Optional[Dict], Dict]:
+    """Return (host, results) from a results file.
+
+    Files written before host metadata was recorded have no host. The
+    run's settings are returned as part of the host, under ``settings``.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if 'results' in data:
+        host = data.get('host')
+        if host is not None:
+            host = dict(host, settings=data.get('settings', {}))
+        return host, data['results']
+    return None, data
+
+
+def mann_whitney_greater(a: Sequence[float], b: Sequence[float]) -> float:
+    """One-sided p-value that values in ``b`` tend to exceed those in ``a``.
+
+    Uses the normal approximation with tie and continuity corrections,
+    which is accurate for the hundreds of samples a run records.
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted(
+        [(value, 0) for value in a] + [(value, 1) for value in b]
+    )
+    n = n1 + n2
+
+    # Average ranks over ties
+    rank_sum_b = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum_b += rank * sum(1 for k in range(i, j + 1) if combined[k][1])
+        i = j + 1
+
+    u = rank_sum_b - n2 * (n2 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrap_ratio(
+    a: Sequence[float],
+    b: Sequence[float],
+    rounds: int = BOOTSTRAP_ROUNDS,
+    confidence: float = 0.95,
+    seed: int = 0
+) -> Tuple[float, float]:
+    """Confidence interval of median(b) / median(a) by resampling."""
+    rng = random.Random(seed)
+    ratios = []
+    for _ in range(rounds):
+        base = statistics.median(rng.choices(a, k=len(a)))
+        cand = statistics.median(rng.choices(b, k=len(b)))
+        if base > 0:
+            ratios.append(cand / base)
+    if not ratios:
+        return float('nan'), float('nan')
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * (len(ratios) - 1))]
+    high = ratios[int((1 - tail) * (len(ratios) - 1))]
+    return low, high
+
+
+def host_differences(
+    baseline: Optional[Dict],
+    candidate: Optional[Dict]
+) -> List[str]:
+    """Describe the host and setting fields that differ between two runs."""
+    if baseline is None or candidate is None:
+        return ["host metadata missing"]
+    differences = [
+        f"{field}: {baseline.get(field)} -> {candidate.get(field)}"
+        for field in HOST_FIELDS
+        if baseline.get(field) != candidate.get(field)
+    ]
+    base_settings = baseline.get('settings', {})
+    cand_settings = candidate.get('settings', {})
+    differences.extend(
+        f"{field}: {base_settings.get(field)} -> {cand_settings.get(field)}"
+        for field in SETTING_FIELDS
+        if base_settings.get(field) != cand_settings.get(field)
+    )
+    return differences
+
+
+def compare(
+    baseline: Dict,
+    candidate: Dict,
+    threshold: float = THRESHOLD,
+    alpha: float = ALPHA,
+    rounds: int = BOOTSTRAP_ROUNDS,
+    engine_thresholds: Optional[Dict[str, float]] = None
+) -> List[Dict]:
+    """Compare every (size, engine) pair present in both runs.
+
+    ``engine_thresholds`` overrides ``threshold`` for the engines it names.
+    """
+    engine_thresholds = engine_thresholds or {}
+    comparisons = []
+    for size in sorted(set(baseline) & set(candidate), key=int):
+        base_engines = {r['method']: r for r in baseline[size]}
+        cand_engines = {r['method']: r for r in candidate[size]}
+        for engine in base_engines:
+            if engine not in cand_engines:
+                continue
+            a = base_engines[engine].get('samples_ms')
+            b = cand_engines[engine].get('samples_ms')
+            limit = engine_thresholds.get(engine, threshold)
+            entry = {
+                'file_size': int(size), 'engine': engine, 'threshold': limit
+            }
+            if not a or not b:
+                entry['status'] = 'no samples'
+                comparisons.append(entry)
+                continue
+
+            base_median = statistics.median(a)
+            cand_median = statistics.median(b)
+            change = cand_median / base_median - 1 if base_median else 0.0
+            low, high = bootstrap_ratio(a, b, rounds)
+            p_slower = mann_whitney_greater(a, b)
+            p_faster = mann_whitney_greater(b, a)
+
+            if p_slower < alpha and change > limit:
+                status = 'regression'
+            elif p_faster < alpha and change < -limit:
+                status = 'improvement'
+            else:
+                status = 'unchanged'
+
+            entry.update(
+                baseline_median_ms=base_median,
+                candidate_median_ms=cand_median,
+                change=change,
+                ratio_ci95=[low - 1, high - 1],
+                p_slower=p_slower,
+                p_faster=p_faster,
+                status=status,
+            )
+            comparisons.append(entry)
+    return comparisons
+
+
+def verdict(
+    baseline_path: str,
+    candidate_path: str,
+    threshold: float = THRESHOLD,
+    alpha: float = ALPHA,
+    rounds: int = BOOTSTRAP_ROUNDS,
+    engine_thresholds: Optional[Dict[str, float]] = None
+) -> Dict:
+    """Build the machine-readable verdict for two results files."""
+    base_host, baseline = load_run(baseline_path)
+    cand_host, candidate = load_run(candidate_path)
+    comparisons = compare(
+        baseline, candidate, threshold, alpha, rounds, engine_thresholds
+    )
+    differences = host_differences(base_host, cand_host)
+    regressions = sum(1 for c in comparisons if c['status'] == 'regression')
+    return {
+        'baseline': {'path': baseline_path, 'host': base_host},
+        'candidate': {'path': candidate_path, 'host': cand_host},
+        'like_for_like': not differences,
+        'host_differences': differences,
+        'threshold': threshold,
+        'alpha': alpha,
+        'regressions': regressions,
+        'improvements': sum(
+            1 for c in comparisons if c['status'] == 'improvement'
+        ),
+        'passed': regressions == 0,
+        'comparisons': comparisons,
+    }
+
+
+def describe_thresholds(result: Dict) -> str:
+    """The threshold a verdict applied, with any per-engine overrides."""
+    overrides = {
+        c['engine']: c['threshold'] for c in result['comparisons']
+        if c['threshold'] != result['threshold']
+    }
+    text = f"{result['threshold']:.0%}"
+    if overrides:
+        text += " (" + ", ".join(
+            f"{engine} {limit:.0%}"
+            for engine, limit in sorted(overrides.items())
+        ) + ")"
+    return text
+
+
+def to_markdown(result: Dict) -> str:
+    """Render a verdict as a markdown section."""
+    lines = ["## Baseline Comparison", ""]
+    lines.append(
+        f"**{'PASS' if result['passed'] else 'FAIL'}**: "
+        f"{result['regressions']} regression(s), "
+        f"{result['improvements']} improvement(s) "
+        f"(threshold {describe_thresholds(result)}, "
+        f"alpha {result['alpha']})"
+    )
+    lines.append("")
+    if not result['like_for_like']:
+        lines.append("Runs are not like-for-like: "
+                     + "; ".join(result['host_differences']))
+        lines.append("")
+    lines.append("| Size | Engine | Baseline (ms) | Candidate (ms) | Change "
+                 "| 95% CI | p | Status |")
+    lines.append("|---:|---|---:|---:|---:|---|---:|---|")
+    for c in result['comparisons']:
+        if 'change' not in c:
+            lines.append(f"| {c['file_size']:,} | {c['engine']} | | | | | "
+                         f"| {c['status']} |")
+            continue
+        low, high = c['ratio_ci95']
+        p = c['p_slower'] if c['change'] >= 0 else c['p_faster']
+        lines.append(
+            f"| {c['file_size']:,} | {c['engine']} "
+            f"| {c['baseline_median_ms']:.4f} "
+            f"| {c['candidate_median_ms']:.4f} "
+            f"| {c['change']:+.1%} | {low:+.1%} .. {high:+.1%} "
+            f"| {p:.3g} | {c['status']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare benchmark results against a baseline'
+    )
+    parser.add_argument('baseline', help='baseline results file')
+    parser.add_argument(
+        'candidate', nargs='?',
+        default=os.path.join(
+            os.path.dirname(__file__), 'results', 'benchmark_results.json'
+        ),
+        help='candidate results file (default: the latest run)'
+    )
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown that counts as a regression')
+    parser.add_argument('--engine-threshold', action='append', default=[],
+                        metavar='ENGINE=FRACTION',
+                        help='threshold for one engine (repeatable)')
+    parser.add_argument('--alpha', type=float, default=ALPHA,
+                        help='significance level')
+    parser.add_argument('--rounds', type=int, default=BOOTSTRAP_ROUNDS,
+                        help='bootstrap resamples')
+    parser.add_argument(
+        '--output',
+        default=os.path.join(
+            os.path.dirname(__file__), 'results', 'comparison.json'
+        ),
+        help='where to write the JSON verdict'
+    )
+    parser.add_argument('--markdown', help='also write markdown here')
+    args = parser.parse_args()
+
+    engine_thresholds = {}
+    for item in args.engine_threshold:
+        engine, _, fraction = item.partition('=')
+        try:
+            engine_thresholds[engine] = float(fraction)
+        except ValueError:
+            parser.error(f"bad --engine-threshold: {item}")
+
+    result = verdict(
+        args.baseline, args.candidate, args.threshold, args.alpha,
+        args.rounds, engine_thresholds
+    )
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    markdown = to_markdown(result)
+    if args.markdown:
+        with open(args.markdown, 'w') as f:
+            f.write(markdown)
+    print(markdown)
+    print(f"Verdict saved to: {args.output}")
+    return 0 if result['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
+from compare_results import describe_thresholds, load_run, to_markdown
+
 
 def load_results(results_path: str):
     with open(results_path, 'r') as f:
@@ -90,7 +92,298 @@ def create_bar_chart(df: pd.DataFrame, file_size: int, output_path: str):
     plt.close()
 
 
-def generate_pdf_report(results: dict, output_path: str):
+def create_memory_table(results: dict) -> pd.DataFrame:
+    """Memory and build cost rows, for results that were profiled."""
+    data = []
+
+    for file_size, methods in results.items():
+        for method_result in methods:
+            if 'rss_bytes' not in method_result:
+                continue
+            data.append({
+                'File Size': int(file_size),
+                'Method': method_result['method'],
+                'RSS (MB)': method_result['rss_bytes'] / 1024 / 1024,
+                'Peak RSS (MB)': method_result['peak_rss_bytes'] / 1024 / 1024,
+                'Heap (MB)': method_result['heap_bytes'] / 1024 / 1024,
+                'Bytes/Line': method_result['bytes_per_line'],
+                'Index File (MB)':
+                    method_result['index_file_bytes'] / 1024 / 1024,
+                'Build Wall (s)': method_result['build_wall_s'],
+                'Build CPU (s)': method_result['build_cpu_s'],
+            })
+
+    return pd.DataFrame(data)
+
+
+def create_memory_chart(df: pd.DataFrame, output_path: str):
+    """Plot steady RSS (solid) and traced heap (dashed) against file size."""
+    plt.figure(figsize=(12, 8))
+
+    for method in df['Method'].unique():
+        method_data = df[df['Method'] == method].sort_values('File Size')
+        line, = plt.plot(
+            method_data['File Size'],
+            method_data['RSS (MB)'],
+            marker='o',
+            label=f'{method} RSS',
+            linewidth=2
+        )
+        plt.plot(
+            method_data['File Size'],
+            method_data['Heap (MB)'],
+            marker='.',
+            linestyle='--',
+            color=line.get_color(),
+            label=f'{method} heap'
+        )
+
+    plt.xscale('log')
+    plt.yscale('symlog', linthresh=1)
+    plt.xlabel('File Size (lines)', fontsize=12)
+    plt.ylabel('Memory (MB)', fontsize=12)
+    plt.title('Memory vs File Size', fontsize=14, fontweight='bold')
+    plt.legend(fontsize=10)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def memory_section(
+    results: dict,
+    charts_dir: str,
+    styles,
+    heading_style
+) -> list:
+    """Memory charts and the cost per million lines of each engine."""
+    df = create_memory_table(results)
+    if df.empty:
+        return []
+
+    story = [Paragraph("Memory and Build Cost", heading_style)]
+    story.append(Paragraph(
+        """
+        Each engine was built in a fresh process. RSS is the resident memory
+        the built searcher adds; for engines that map an index file it
+        includes file pages the kernel can reclaim. Heap is what tracemalloc
+        attributes to the searcher. Build time starts with no saved index.
+        """,
+        styles['Normal']
+    ))
+    story.append(Spacer(1, 0.2*inch))
+
+    memory_chart_path = os.path.join(charts_dir, 'memory_size.png')
+    create_memory_chart(df, memory_chart_path)
+    story.append(Image(memory_chart_path, width=6*inch, height=4*inch))
+    story.append(Spacer(1, 0.2*inch))
+
+    # Scaled from the largest corpus, where fixed overheads matter least
+    largest = df['File Size'].max()
+    story.append(Paragraph(
+        f"Cost per Million Lines (scaled from {largest:,} lines)",
+        styles['Heading3']
+    ))
+    scale = 1_000_000 / largest
+    table_data = [[
+        'Engine', 'RSS (MB)', 'Peak RSS (MB)', 'Heap (MB)', 'Bytes/Line',
+        'Index File (MB)', 'Build Wall (s)', 'Build CPU (s)'
+    ]]
+    for row in df[df['File Size'] == largest].to_dict('records'):
+        table_data.append([
+            row['Method'],
+            f"{row['RSS (MB)'] * scale:,.1f}",
+            f"{row['Peak RSS (MB)'] * scale:,.1f}",
+            f"{row['Heap (MB)'] * scale:,.1f}",
+            f"{row['Bytes/Line']:.1f}",
+            f"{row['Index File (MB)'] * scale:,.1f}",
+            f"{row['Build Wall (s)'] * scale:.2f}",
+            f"{row['Build CPU (s)'] * scale:.2f}",
+        ])
+
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+    ]))
+    story.append(table)
+    return story
+
+
+def create_server_table(server_results: list) -> pd.DataFrame:
+    df = pd.DataFrame(server_results)
+    df['Setup'] = [
+        f"{mode}, SSL {'on' if ssl else 'off'}"
+        for mode, ssl in zip(df['mode'], df['ssl'])
+    ]
+    return df
+
+
+def create_concurrency_chart(
+    df: pd.DataFrame,
+    column: str,
+    ylabel: str,
+    output_path: str
+):
+    """Plot ``column`` against client count for each closed-loop setup."""
+    data = df[df['loop'] == 'closed']
+    plt.figure(figsize=(10, 6))
+
+    for setup in data['Setup'].unique():
+        setup_data = data[data['Setup'] == setup].sort_values('concurrency')
+        plt.plot(
+            setup_data['concurrency'],
+            setup_data[column],
+            marker='o',
+            label=setup,
+            linewidth=2
+        )
+
+    plt.xscale('log', base=2)
+    plt.xlabel('Concurrent clients', fontsize=12)
+    plt.ylabel(ylabel, fontsize=12)
+    plt.title(f'{ylabel} vs Concurrency', fontsize=14, fontweight='bold')
+    plt.legend(fontsize=10)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def create_open_loop_chart(df: pd.DataFrame, output_path: str):
+    """Plot p50 and p99 latency against offered load for each setup."""
+    data = df[df['loop'] == 'open']
+    plt.figure(figsize=(10, 6))
+
+    for setup in data['Setup'].unique():
+        setup_data = data[data['Setup'] == setup].sort_values('offered_rate')
+        line, = plt.plot(
+            setup_data['offered_rate'],
+            setup_data['p99_ms'],
+            marker='o',
+            label=f'{setup} p99',
+            linewidth=2
+        )
+        plt.plot(
+            setup_data['offered_rate'],
+            setup_data['p50_ms'],
+            marker='.',
+            linestyle='--',
+            color=line.get_color(),
+            label=f'{setup} p50'
+        )
+
+    plt.yscale('log')
+    plt.xlabel('Offered load (queries/s)', fontsize=12)
+    plt.ylabel('Latency (ms)', fontsize=12)
+    plt.title('Latency vs Offered Load (open loop)', fontsize=14,
+              fontweight='bold')
+    plt.legend(fontsize=9)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def comparison_section(comparison: dict, styles, heading_style) -> list:
+    """Verdict and per-engine table of a baseline comparison."""
+    story = [Paragraph("Baseline Comparison", heading_style)]
+
+    passed = comparison['passed']
+    story.append(Paragraph(
+        f"""
+        <b>{'PASS' if passed else 'FAIL'}</b>:
+        {comparison['regressions']} regression(s) and
+        {comparison['improvements']} improvement(s) against
+        {os.path.basename(comparison['baseline']['path'])}. A change is
+        flagged when a one-sided Mann-Whitney test on per-query latencies
+        gives p below {comparison['alpha']} and the median moves by more
+        than {describe_thresholds(comparison)}. The interval is a
+        bootstrap 95% confidence interval of the change in median.
+        """,
+        styles['Normal']
+    ))
+    if not comparison['like_for_like']:
+        story.append(Spacer(1, 0.1*inch))
+        story.append(Paragraph(
+            "<b>Not like-for-like:</b> "
+            + "; ".join(comparison['host_differences']),
+            styles['Normal']
+        ))
+    story.append(Spacer(1, 0.2*inch))
+
+    status_colors = {
+        'regression': colors.HexColor('#e74c3c'),
+        'improvement': colors.HexColor('#2ecc71'),
+    }
+    table_data = [[
+        'File Size', 'Engine', 'Baseline (ms)', 'Candidate (ms)', 'Change',
+        '95% CI', 'p', 'Status'
+    ]]
+    table_style = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]
+    for row, c in enumerate(comparison['comparisons'], 1):
+        if 'change' not in c:
+            table_data.append([
+                f"{c['file_size']:,}", c['engine'], '', '', '', '', '',
+                c['status']
+            ])
+            continue
+        low, high = c['ratio_ci95']
+        p = c['p_slower'] if c['change'] >= 0 else c['p_faster']
+        table_data.append([
+            f"{c['file_size']:,}",
+            c['engine'],
+            f"{c['baseline_median_ms']:.4f}",
+            f"{c['candidate_median_ms']:.4f}",
+            f"{c['change']:+.1%}",
+            f"{low:+.1%} .. {high:+.1%}",
+            f"{p:.3g}",
+            c['status']
+        ])
+        if c['status'] in status_colors:
+            table_style.append(
+                ('TEXTCOLOR', (7, row), (7, row), status_colors[c['status']])
+            )
+
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(TableStyle(table_style))
+    story.append(table)
+    return story
+
+
+def describe_host(host: dict) -> str:
+    """One-line description of the benchmark host."""
+    if not host:
+        return "Linux server"
+    return (
+        f"{host['cpu']} ({host['cpu_count']} CPUs), "
+        f"{host['system']} {host['kernel']}, "
+        f"Python {host['python']}"
+    )
+
+
+def generate_pdf_report(
+    results: dict,
+    output_path: str,
+    server_results: list = None,
+    host: dict = None,
+    comparison: dict = None
+):
     doc = SimpleDocTemplate(
         output_path,
         pagesize=letter,
@@ -142,11 +435,12 @@ def generate_pdf_report(results: dict, output_path: str):
     story.append(Paragraph("Executive Summary", heading_style))
     
     summary_text = """
-    This report presents a comprehensive performance analysis of five different
-    string search algorithms implemented for the String Search Server. Tests were
-    conducted across multiple file sizes ranging from 10,000 to 1,000,000 lines.
-    Each algorithm was tested with 10 queries (5 existing, 5 non-existing) and
-    results were averaged over 3 runs for statistical reliability.
+    This report presents a performance analysis of the lookup engines of the
+    String Search Server. Tests were conducted across multiple file sizes
+    ranging from 10,000 to 1,000,000 lines. Each engine was loaded and
+    queried through FileSearcher, the same code path the server runs, and
+    every measurement was repeated and reported with a 95% confidence
+    interval.
     """
     story.append(Paragraph(summary_text, styles['Normal']))
     story.append(Spacer(1, 0.2*inch))
@@ -154,17 +448,17 @@ def generate_pdf_report(results: dict, output_path: str):
     # Methodology
     story.append(Paragraph("Methodology", heading_style))
     
-    method_text = """
-    <b>Test Environment:</b> Linux server<br/>
+    method_text = f"""
+    <b>Test Environment:</b> {describe_host(host)}<br/>
     <b>File Sizes Tested:</b> 10K, 50K, 100K, 250K, 500K, 1M lines<br/>
     <b>Query Types:</b> 50% existing strings, 50% non-existing strings<br/>
-    <b>Runs per Query:</b> 3 (median time reported)<br/>
-    <b>Algorithms Tested:</b><br/>
-    1. Simple Loop - Line-by-line iteration<br/>
-    2. Set Lookup - O(1) hash-based lookup<br/>
-    3. Grep Command - Native Linux grep utility<br/>
-    4. Memory Mapped - mmap-based file access<br/>
-    5. Binary Search - O(log n) search on sorted files
+    <b>Repeats:</b> 5 per engine; each builds the index from scratch, reopens
+    it with a cold page cache, then runs the queries cold and warm<br/>
+    <b>Engines Tested:</b><br/>
+    1. set - every line held in a Python set<br/>
+    2. sorted - binary search over a memory-mapped sorted index file<br/>
+    3. fingerprint - 64-bit line hashes and offsets, confirmed in the file<br/>
+    4. prefix - memory-mapped, block front-coded sorted index
     """
     story.append(Paragraph(method_text, styles['Normal']))
     story.append(Spacer(1, 0.2*inch))
@@ -178,12 +472,16 @@ def generate_pdf_report(results: dict, output_path: str):
     df = create_comparison_table(results)
     
     # Overall ranking table
+    sizes = sorted(df['File Size'].unique())
+    ranking_size = 250000 if 250000 in sizes else sizes[-1]
     story.append(Paragraph(
-        "Overall Performance Ranking (250K lines)",
+        f"Overall Performance Ranking ({ranking_size:,} lines)",
         styles['Heading3']
     ))
     
-    ranking_data = df[df['File Size'] == 250000].sort_values('Avg Time (ms)')
+    ranking_data = df[df['File Size'] == ranking_size].sort_values(
+        'Avg Time (ms)'
+    )
     
     table_data = [['Rank', 'Method', 'Avg Time (ms)', 'Performance']]
     
@@ -219,21 +517,25 @@ def generate_pdf_report(results: dict, output_path: str):
     story.append(PageBreak())
     story.append(Paragraph("Detailed Results", heading_style))
     
-    detailed_data = [['File Size', 'Method', 'Avg (ms)', 'Min (ms)', 'Max (ms)']]
+    detailed_data = [[
+        'File Size', 'Engine', 'Warm (ms)', 'Warm p99 (ms)', 'Cold (ms)',
+        'Build (s)'
+    ]]
     
     for file_size in sorted([int(k) for k in results.keys()]):
         for method in results[str(file_size)]:
             detailed_data.append([
                 f"{file_size:,}",
                 method['method'],
-                f"{method['avg_time_ms']:.3f}",
-                f"{method['min_time_ms']:.3f}",
-                f"{method['max_time_ms']:.3f}"
+                f"{method['warm_mean_ms']:.4f} ± {method['warm_ci95_ms']:.4f}",
+                f"{method['warm_p99_ms']:.4f}",
+                f"{method['cold_mean_ms']:.4f} ± {method['cold_ci95_ms']:.4f}",
+                f"{method['build_s']:.3f} ± {method['build_ci95_s']:.3f}"
             ])
     
     detailed_table = Table(
         detailed_data,
-        colWidths=[1.2*inch, 2*inch, 0.9*inch, 0.9*inch, 0.9*inch]
+        colWidths=[0.9*inch, 1.0*inch, 1.4*inch, 1.0*inch, 1.4*inch, 1.1*inch]
     )
     detailed_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
@@ -264,32 +566,48 @@ def generate_pdf_report(results: dict, output_path: str):
     
     # Bar chart for 250K lines
     bar_chart_path = os.path.join(charts_dir, 'performance_bar.png')
-    create_bar_chart(df, 250000, bar_chart_path)
+    create_bar_chart(df, ranking_size, bar_chart_path)
     
     story.append(Paragraph(
-        "Algorithm Comparison (250K lines)",
+        f"Engine Comparison ({ranking_size:,} lines)",
         styles['Heading3']
     ))
     story.append(Image(bar_chart_path, width=5*inch, height=3*inch))
     
     story.append(PageBreak())
     
+    if comparison:
+        story.extend(comparison_section(comparison, styles, heading_style))
+        story.append(PageBreak())
+
+    memory_story = memory_section(results, charts_dir, styles, heading_style)
+    if memory_story:
+        story.extend(memory_story)
+        story.append(PageBreak())
+
+    if server_results:
+        story.extend(server_section(
+            server_results, charts_dir, styles, heading_style
+        ))
+        story.append(PageBreak())
+
     # Analysis and Recommendations
     story.append(Paragraph("Analysis and Recommendations", heading_style))
     
     analysis_text = """
     <b>Key Findings:</b><br/>
-    1. Set Lookup demonstrates exceptional performance across all file sizes,
-    consistently sub-millisecond response times<br/>
-    2. Binary Search provides predictable O(log n) performance<br/>
-    3. Simple Loop and Memory Mapped approaches scale linearly<br/>
-    4. Grep Command shows good performance for larger files<br/>
+    1. The set engine answers fastest at every file size, but holds every
+    line on the Python heap and rebuilds the set on each start<br/>
+    2. The fingerprint engine stays within a few microseconds of the set
+    while keeping only 16 bytes per line in memory<br/>
+    3. The sorted and prefix engines pay a binary search over a mapped file
+    per query; their first queries after a cold start also fault in pages<br/>
+    4. Engines with an index file reopen in milliseconds once it is built<br/>
     <br/>
     <b>Recommendations:</b><br/>
-    - For read-once queries: Use Set Lookup for best performance<br/>
-    - For sorted data: Binary Search offers excellent scalability<br/>
-    - For system integration: Grep Command is reliable<br/>
-    - For memory-constrained environments: Memory Mapped files<br/>
+    - For the lowest latency with memory to spare: set<br/>
+    - For large corpora and fast restarts: fingerprint<br/>
+    - For autocomplete queries: prefix<br/>
     """
     story.append(Paragraph(analysis_text, styles['Normal']))
     
@@ -300,11 +618,9 @@ def generate_pdf_report(results: dict, output_path: str):
     story.append(Paragraph("Conclusions", heading_style))
     
     conclusion_text = """
-    The benchmark analysis demonstrates that algorithm selection significantly
-    impacts string search performance. Set Lookup remains the optimal choice for
-    most use cases due to its superior performance characteristics. However,
-    Binary Search provides better scalability for sorted datasets, while Grep
-    Command offers system-level integration benefits.
+    Every engine answers exact-match queries well under a millisecond, so
+    the choice between them is driven by memory, start-up time and the
+    query types needed rather than by lookup speed alone.
     """
     story.append(Paragraph(conclusion_text, styles['Normal']))
     
@@ -314,6 +630,83 @@ def generate_pdf_report(results: dict, output_path: str):
     print(f"PDF report generated: {output_path}")
 
 
+def server_section(
+    server_results: list,
+    charts_dir: str,
+    styles,
+    heading_style
+) -> list:
+    """Tables and charts for the end-to-end load tests."""
+    df = create_server_table(server_results)
+    story = [Paragraph("End-to-End Load Tests", heading_style)]
+
+    story.append(Paragraph(
+        """
+        Queries were sent to a running server over real sockets. Closed-loop
+        runs keep a fixed number of clients busy; open-loop runs offer a
+        fixed arrival rate and measure latency from when each query was due,
+        so queueing behind a slow server is included.
+        """,
+        styles['Normal']
+    ))
+    story.append(Spacer(1, 0.2*inch))
+
+    table_data = [[
+        'Setup', 'Load', 'Throughput (q/s)', 'p50 (ms)', 'p90 (ms)',
+        'p99 (ms)', 'p99.9 (ms)', 'Errors'
+    ]]
+    for row in df.itertuples():
+        load = (
+            f"{row.concurrency} clients" if row.loop == 'closed'
+            else f"{row.offered_rate:,.0f} q/s"
+        )
+        table_data.append([
+            row.Setup,
+            load,
+            f"{row.throughput_qps:,.0f}",
+            f"{row.p50_ms:.2f}",
+            f"{row.p90_ms:.2f}",
+            f"{row.p99_ms:.2f}",
+            f"{row.p999_ms:.2f}",
+            f"{row.error_rate:.2%}"
+        ])
+
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+    ]))
+    story.append(table)
+
+    if (df['loop'] == 'closed').any():
+        throughput_path = os.path.join(charts_dir, 'server_throughput.png')
+        create_concurrency_chart(
+            df, 'throughput_qps', 'Throughput (queries/s)', throughput_path
+        )
+        tail_path = os.path.join(charts_dir, 'server_p99.png')
+        create_concurrency_chart(df, 'p99_ms', 'p99 latency (ms)', tail_path)
+
+        story.append(PageBreak())
+        story.append(Paragraph("Closed Loop", styles['Heading3']))
+        story.append(Image(throughput_path, width=5*inch, height=3*inch))
+        story.append(Spacer(1, 0.2*inch))
+        story.append(Image(tail_path, width=5*inch, height=3*inch))
+
+    if (df['loop'] == 'open').any():
+        open_path = os.path.join(charts_dir, 'server_open_loop.png')
+        create_open_loop_chart(df, open_path)
+
+        story.append(Paragraph("Open Loop", styles['Heading3']))
+        story.append(Image(open_path, width=5*inch, height=3*inch))
+
+    return story
+
+
 def main():
     results_path = os.path.join(
         os.path.dirname(__file__),
@@ -326,7 +719,35 @@ def main():
         print("Please run benchmark_search.py first")
         return
     
-    results = load_results(results_path)
+    host, results = load_run(results_path)
+
+    # Written by benchmark_server.py; the report covers it when present
+    server_results_path = os.path.join(
+        os.path.dirname(__file__),
+        'results',
+        'server_benchmark.json'
+    )
+    server_results = None
+    if os.path.exists(server_results_path):
+        server_results = load_results(server_results_path)
+    
+    # Written by compare_results.py
+    comparison_path = os.path.join(
+        os.path.dirname(__file__),
+        'results',
+        'comparison.json'
+    )
+    comparison = None
+    if os.path.exists(comparison_path):
+        comparison = load_results(comparison_path)
+        markdown_path = os.path.join(
+            os.path.dirname(__file__),
+            'results',
+            'comparison.md'
+        )
+        with open(markdown_path, 'w') as f:
+            f.write(to_markdown(comparison))
+        print(f"Comparison summary: {os.path.abspath(markdown_path)}")
     
     output_path = os.path.join(
         os.path.dirname(__file__),
@@ -334,7 +755,9 @@ def main():
         'performance_report.pdf'
     )
     
-    generate_pdf_report(results, output_path)
+    generate_pdf_report(
+        results, output_path, server_results, host, comparison
+    )
     
     print(f"Report generated ")
     print(f"Location: {os.path.abspath(output_path)}")
@@ -1,34 +1,798 @@
+"""Client library and command-line client for the string search server.
+
+``Client`` keeps a thread-safe pool of keep-alive connections and can
+pipeline many queries over one connection; ``submit()`` returns a future
+per query and queries submitted together are sent together. ``AsyncClient``
+offers the same on asyncio. Failures raise ``ClientError`` subclasses
+rather than returning error strings.
+
+Connection reuse and pipelining need the server's keep-alive protocol
+(``protocol = keepalive``); with ``keepalive=False`` every request uses a
+new connection, as the one-shot protocol requires.
+"""
+import argparse
+import asyncio
+import queue
 import socket
+import ssl
 import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_PORT = 44445
+
+# Marks a line as a command rather than a query
+COMMAND_PREFIX = '::'
+
+# Most queries the server accepts in one ::BATCH
+MAX_BATCH = 10000
+
+# Most requests written to a connection before reading their responses
+MAX_PIPELINE = 1000
+
+# Bytes read per recv()
+RECV_BYTES = 64 * 1024
+
+
+class ClientError(Exception):
+    """Base class for errors raised by this client."""
+
+
+class ConnectionFailed(ClientError, ConnectionError):
+    """The server could not be reached or closed the connection early."""
+
+
+class RequestTimeout(ClientError, TimeoutError):
+    """The server did not answer within the timeout."""
+
+
+class ServerBusy(ClientError):
+    """The server refused the connection because it is saturated."""
+
+
+class ServerError(ClientError):
+    """The server answered a request with ``ERROR <message>``."""
+
+
+class ProtocolViolation(ClientError):
+    """The server sent a response this client does not understand."""
+
+
+def query_line(query: str) -> bytes:
+    """Encode an exact-match query as one request line."""
+    if '\n' in query:
+        raise ValueError("queries cannot contain newlines")
+    if query.startswith(COMMAND_PREFIX):
+        # Would otherwise be read as a command
+        query = f"{COMMAND_PREFIX}EXISTS {query}"
+    return query.encode('utf-8') + b'\n'
+
+
+def command_line(verb: str, arg: str = '', corpus: str = '') -> bytes:
+    """Encode a command request line such as ``::PREFIX@words 10 ap``."""
+    if '\n' in arg:
+        raise ValueError("command arguments cannot contain newlines")
+    target = f"@{corpus}" if corpus else ''
+    return f"{COMMAND_PREFIX}{verb}{target} {arg}".rstrip(' ').encode(
+        'utf-8', 'surrogateescape'
+    ) + b'\n'
+
+
+def batch_request(queries: Sequence[str], corpus: str = '') -> bytes:
+    """Encode a ``::BATCH`` request carrying ``queries``."""
+    for query in queries:
+        if '\n' in query:
+            raise ValueError("queries cannot contain newlines")
+    body = ''.join(query + '\n' for query in queries)
+    return command_line('BATCH', str(len(queries)), corpus) + body.encode('utf-8')
+
 
-def search(query, host='localhost', port=44445):
-  
+def extra_lines(verb: str, header: bytes) -> int:
+    """Number of lines that follow ``header`` in the response to ``verb``."""
     try:
-        # socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5)
-        
-        #Connect
-        sock.connect((host, port))
-        
-        # Send query
-        sock.sendall(query.encode('utf-8'))
-        
-        # Receive response
-        response = sock.recv(1024).decode('utf-8').strip()
-        
-        sock.close()
-        
-        return response
-        
-    except Exception as e:
-        return f"Error: {e}"
+        if verb in ('PREFIX', 'MORE'):
+            return int(header.split(b' ', 1)[0])
+        if verb == 'SUBSTR':
+            return int(header.split(b' ')[1])
+    except (ValueError, IndexError):
+        raise ProtocolViolation(f"unexpected {verb} header: {header[:80]!r}")
+    return 0
+
+
+def check_header(header: bytes) -> bytes:
+    """Raise the typed error for an error response line."""
+    if header.startswith(b'ERROR'):
+        raise ServerError(header[6:].decode('utf-8', 'replace'))
+    if header == b'SERVER BUSY':
+        raise ServerBusy("server busy")
+    return header
+
+
+def parse_exists(lines: List[bytes]) -> bool:
+    """Interpret the response to an exact or normalized query."""
+    if lines[0] == b'STRING EXISTS':
+        return True
+    if lines[0] == b'STRING NOT FOUND':
+        return False
+    raise ProtocolViolation(f"unexpected response: {lines[0][:80]!r}")
+
+
+def parse_batch(lines: List[bytes], size: int) -> List[bool]:
+    """Interpret a ::BATCH response of ``size`` results."""
+    line = lines[0]
+    if len(line) != size or line.strip(b'01'):
+        raise ProtocolViolation(f"unexpected batch response: {line[:80]!r}")
+    return [c == 0x31 for c in line]
+
+
+class Connection:
+    """One socket with buffered line reads."""
+
+    def __init__(self, sock: socket.socket):
+        """Wrap a connected socket."""
+        self.sock = sock
+        self._buffer = b""
+
+    def send(self, data: bytes) -> None:
+        """Send all of ``data``."""
+        try:
+            self.sock.sendall(data)
+        except socket.timeout:
+            raise RequestTimeout("timed out sending request")
+        except OSError as e:
+            raise ConnectionFailed(f"send failed: {e}") from e
+
+    def read_line(self) -> bytes:
+        """Read one response line, without its newline."""
+        while b'\n' not in self._buffer:
+            try:
+                data = self.sock.recv(RECV_BYTES)
+            except socket.timeout:
+                raise RequestTimeout("timed out waiting for response")
+            except OSError as e:
+                raise ConnectionFailed(f"receive failed: {e}") from e
+            if not data:
+                if self._buffer:
+                    # One-shot servers may close without a final newline
+                    line, self._buffer = self._buffer, b""
+                    return line
+                raise ConnectionFailed("server closed the connection")
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line
+
+    def read_response(self, verb: str) -> List[bytes]:
+        """Read the complete response to one request."""
+        header = check_header(self.read_line())
+        return [header] + [self.read_line() for _ in range(
+            extra_lines(verb, header)
+        )]
+
+    def close(self) -> None:
+        """Close the socket."""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class Client:
+    """Thread-safe client with a pool of keep-alive connections.
+
+    ``ssl_context`` enables TLS; the session of the most recent TLS
+    connection is offered when opening the next one, so new connections
+    can resume instead of doing a full handshake.
+    """
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = DEFAULT_PORT,
+        pool_size: int = 8,
+        timeout: float = 5.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        server_hostname: Optional[str] = None,
+        keepalive: bool = True,
+        max_pipeline: int = MAX_PIPELINE
+    ):
+        """Configure the client; connections are opened on first use."""
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.server_hostname = server_hostname or host
+        self.keepalive = keepalive
+        self.max_pipeline = max_pipeline
+        self.connects = 0
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._session: Optional[ssl.SSLSession] = None
+        self._submitted: queue.Queue = queue.Queue()
+        self._dispatchers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _connect(self) -> Connection:
+        """Open a new connection."""
+        try:
+            sock = socket.create_connection(
+                (self.host, self.port), timeout=self.timeout
+            )
+        except socket.timeout:
+            raise RequestTimeout(f"timed out connecting to {self.host}:{self.port}")
+        except OSError as e:
+            raise ConnectionFailed(
+                f"cannot connect to {self.host}:{self.port}: {e}"
+            ) from e
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.ssl_context is not None:
+            try:
+                sock = self.ssl_context.wrap_socket(
+                    sock, server_hostname=self.server_hostname,
+                    session=self._session
+                )
+            except socket.timeout:
+                sock.close()
+                raise RequestTimeout("timed out during TLS handshake")
+            except (ssl.SSLError, OSError) as e:
+                sock.close()
+                raise ConnectionFailed(f"TLS handshake failed: {e}") from e
+        self.connects += 1
+        return Connection(sock)
+
+    def _acquire(self) -> Tuple[Connection, bool]:
+        """Take an idle pooled connection or open one, within pool_size.
+
+        Also returns whether the connection was reused from the pool.
+        """
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        try:
+            return self._connect(), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: Connection, reusable: bool) -> None:
+        """Return a connection to the pool, or close it."""
+        if reusable and isinstance(conn.sock, ssl.SSLSocket):
+            # Tickets arrive after the handshake, so the session is read
+            # once the connection has carried a response
+            self._session = conn.sock.session or self._session
+        if reusable and self.keepalive and not self._closed:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def roundtrip(self, requests: Sequence[Tuple[bytes, str]]) -> List[object]:
+        """Send requests on one connection and read their responses in order.
+
+        Each request is an encoded line and its verb. The result holds, per
+        request, its response lines or the ``ServerError`` it was answered
+        with; failures of the connection itself are raised.
+        """
+        if not requests:
+            return []
+        if not self.keepalive and len(requests) > 1:
+            return [r for request in requests for r in self.roundtrip([request])]
+
+        conn, reused = self._acquire()
+        results: List[object] = []
+        reusable = False
+        try:
+            conn.send(b"".join(line for line, _ in requests))
+            for _, verb in requests:
+                try:
+                    results.append(conn.read_response(verb))
+                except ServerError as e:
+                    # The connection is still in step with the server
+                    results.append(e)
+            reusable = True
+        except ConnectionFailed:
+            if not (reused and not results):
+                raise
+        finally:
+            self._release(conn, reusable)
+        if not reusable:
+            # The server closed an idle pooled connection; queries are
+            # idempotent, so send them again on a fresh one
+            return self.roundtrip(requests)
+        return results
+
+    def request(self, line: bytes, verb: str = 'EXISTS') -> List[bytes]:
+        """Send one request line and return its response lines."""
+        result, = self.roundtrip([(line, verb)])
+        if isinstance(result, ClientError):
+            raise result
+        return result
+
+    def exists(self, query: str, corpus: str = '') -> bool:
+        """Check whether ``query`` is a line of the corpus."""
+        line = (
+            command_line('EXISTS', query, corpus) if corpus
+            else query_line(query)
+        )
+        return parse_exists(self.request(line))
+
+    def exists_normalized(self, query: str, corpus: str = '') -> bool:
+        """Check ``query`` in normalized-match mode (``::NORM``)."""
+        return parse_exists(self.request(command_line('NORM', query, corpus)))
+
+    def exists_many(
+        self,
+        queries: Sequence[str],
+        batch_size: int = MAX_BATCH,
+        corpus: str = ''
+    ) -> List[bool]:
+        """Check many queries with ``::BATCH`` requests of ``batch_size``.
+
+        With keep-alive, the batches are pipelined on one connection.
+        """
+        chunks = [
+            queries[i:i + batch_size]
+            for i in range(0, len(queries), batch_size)
+        ]
+        requests = [(batch_request(chunk, corpus), 'BATCH') for chunk in chunks]
+
+        results: List[bool] = []
+        for response, chunk in zip(self.roundtrip(requests), chunks):
+            if isinstance(response, ClientError):
+                raise response
+            results.extend(parse_batch(response, len(chunk)))
+        return results
+
+    def prefix(
+        self, prefix: str, limit: int = 100, corpus: str = ''
+    ) -> Tuple[List[str], Optional[str]]:
+        """Return one page of lines starting with ``prefix`` and its cursor."""
+        return self._page(self.request(
+            command_line('PREFIX', f"{limit} {prefix}", corpus), 'PREFIX'
+        ))
+
+    def more(
+        self, cursor: str, limit: int = 100, corpus: str = ''
+    ) -> Tuple[List[str], Optional[str]]:
+        """Return the page after ``cursor`` from an earlier prefix query."""
+        return self._page(self.request(
+            command_line('MORE', f"{limit} {cursor}", corpus), 'MORE'
+        ))
+
+    @staticmethod
+    def _page(lines: List[bytes]) -> Tuple[List[str], Optional[str]]:
+        """Split a PREFIX/MORE response into lines and cursor."""
+        cursor = lines[0].split(b' ', 1)[1].decode('ascii')
+        return (
+            [line.decode('utf-8', 'surrogateescape') for line in lines[1:]],
+            None if cursor == '-' else cursor
+        )
+
+    def substring(
+        self, fragment: str, limit: int = 10, corpus: str = ''
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """Count lines containing ``fragment``; return (count, matches)."""
+        lines = self.request(
+            command_line('SUBSTR', f"{limit} {fragment}", corpus), 'SUBSTR'
+        )
+        matches = []
+        for line in lines[1:]:
+            offset, _, text = line.partition(b' ')
+            matches.append((int(offset), text.decode('utf-8', 'surrogateescape')))
+        return int(lines[0].split(b' ')[0]), matches
+
+    def nearest(
+        self, query: str, distance: int = 1, corpus: str = ''
+    ) -> Optional[Tuple[int, str]]:
+        """Return (distance, line) for the closest line, or None."""
+        line = self.request(
+            command_line('FUZZY', f"{distance} {query}", corpus), 'FUZZY'
+        )[0]
+        if line == b'STRING NOT FOUND':
+            return None
+        d, _, text = line.partition(b' ')
+        return int(d), text.decode('utf-8', 'surrogateescape')
+
+    def submit(self, query: str) -> 'Future[bool]':
+        """Queue an exact-match query and return a future for its result.
+
+        Queries submitted close together are pipelined on pooled
+        connections, up to ``max_pipeline`` per round trip.
+        """
+        future: 'Future[bool]' = Future()
+        try:
+            line = query_line(query)
+        except ValueError as e:
+            future.set_exception(e)
+            return future
+        self._start_dispatchers()
+        self._submitted.put((line, future))
+        return future
+
+    def pipeline(self, queries: Iterable[str]) -> List[bool]:
+        """Check many queries as individual pipelined requests."""
+        futures = [self.submit(query) for query in queries]
+        return [future.result() for future in futures]
+
+    def _start_dispatchers(self) -> None:
+        """Start one dispatcher thread per pooled connection, once."""
+        if self._dispatchers:
+            return
+        with self._lock:
+            if self._dispatchers:
+                return
+            for i in range(self.pool_size):
+                thread = threading.Thread(
+                    target=self._dispatch, name=f"client-dispatch-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._dispatchers.append(thread)
+
+    def _dispatch(self) -> None:
+        """Send whatever has been submitted, pipelined, until closed."""
+        limit = self.max_pipeline if self.keepalive else 1
+        while True:
+            item = self._submitted.get()
+            if item is None:
+                # Pass the stop signal on to the next dispatcher
+                self._submitted.put(None)
+                return
+            items = [item]
+            while len(items) < limit:
+                try:
+                    item = self._submitted.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._submitted.put(None)
+                    break
+                items.append(item)
+
+            try:
+                results = self.roundtrip([(line, 'EXISTS') for line, _ in items])
+            except Exception as e:
+                # Every future must be resolved, whatever went wrong
+                results = [e] * len(items)
+            for (_, future), result in zip(items, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    try:
+                        future.set_result(parse_exists(result))
+                    except ClientError as e:
+                        future.set_exception(e)
+
+    def close(self) -> None:
+        """Stop the dispatchers and close every idle connection."""
+        self._closed = True
+        if self._dispatchers:
+            self._submitted.put(None)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class AsyncClient:
+    """asyncio client with a pool of keep-alive connections.
+
+    Coroutines mirror ``Client``; ``pipeline()`` writes many queries to
+    each connection before reading the responses.
+    """
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = DEFAULT_PORT,
+        pool_size: int = 8,
+        timeout: float = 5.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        server_hostname: Optional[str] = None,
+        keepalive: bool = True,
+        max_pipeline: int = MAX_PIPELINE
+    ):
+        """Configure the client; connections are opened on first use."""
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.server_hostname = server_hostname or host
+        self.keepalive = keepalive
+        self.max_pipeline = max_pipeline
+        self.connects = 0
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Open a new connection."""
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.host, self.port, ssl=self.ssl_context,
+                    server_hostname=(
+                        self.server_hostname if self.ssl_context else None
+                    ),
+                    limit=RECV_BYTES * 16
+                ),
+                self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise RequestTimeout(f"timed out connecting to {self.host}:{self.port}")
+        except (ssl.SSLError, OSError) as e:
+            raise ConnectionFailed(
+                f"cannot connect to {self.host}:{self.port}: {e}"
+            ) from e
+        self.connects += 1
+        return reader, writer
+
+    async def _read_line(self, reader: asyncio.StreamReader) -> bytes:
+        """Read one response line, without its newline."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            raise RequestTimeout("timed out waiting for response")
+        except (OSError, ValueError) as e:
+            raise ConnectionFailed(f"receive failed: {e}") from e
+        if not line:
+            raise ConnectionFailed("server closed the connection")
+        return line.rstrip(b'\n')
+
+    async def roundtrip(
+        self, requests: Sequence[Tuple[bytes, str]]
+    ) -> List[object]:
+        """Async version of ``Client.roundtrip()``."""
+        if not requests:
+            return []
+        if not self.keepalive and len(requests) > 1:
+            results: List[object] = []
+            for request in requests:
+                results.extend(await self.roundtrip([request]))
+            return results
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            reused = bool(self._idle)
+            reader, writer = (
+                self._idle.pop() if reused else await self._connect()
+            )
+            results = []
+            reusable = False
+            try:
+                writer.write(b"".join(line for line, _ in requests))
+                await writer.drain()
+                for _, verb in requests:
+                    try:
+                        header = check_header(await self._read_line(reader))
+                        lines = [header]
+                        for _ in range(extra_lines(verb, header)):
+                            lines.append(await self._read_line(reader))
+                        results.append(lines)
+                    except ServerError as e:
+                        results.append(e)
+                reusable = True
+            except RequestTimeout:
+                # Also an OSError, but a slow server is not a stale
+                # connection; retrying would double the wait
+                raise
+            except (ConnectionFailed, OSError) as e:
+                if not (reused and not results):
+                    if isinstance(e, ClientError):
+                        raise
+                    raise ConnectionFailed(f"send failed: {e}") from e
+            finally:
+                if reusable and self.keepalive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+        if not reusable:
+            # A stale pooled connection; send again on a fresh one
+            return await self.roundtrip(requests)
+        return results
+
+    async def request(self, line: bytes, verb: str = 'EXISTS') -> List[bytes]:
+        """Send one request line and return its response lines."""
+        result, = await self.roundtrip([(line, verb)])
+        if isinstance(result, ClientError):
+            raise result
+        return result
+
+    async def exists(self, query: str, corpus: str = '') -> bool:
+        """Check whether ``query`` is a line of the corpus."""
+        line = (
+            command_line('EXISTS', query, corpus) if corpus
+            else query_line(query)
+        )
+        return parse_exists(await self.request(line))
+
+    async def exists_many(
+        self,
+        queries: Sequence[str],
+        batch_size: int = MAX_BATCH,
+        corpus: str = ''
+    ) -> List[bool]:
+        """Check many queries with pipelined ``::BATCH`` requests."""
+        chunks = [
+            queries[i:i + batch_size]
+            for i in range(0, len(queries), batch_size)
+        ]
+        requests = [(batch_request(chunk, corpus), 'BATCH') for chunk in chunks]
+
+        results: List[bool] = []
+        for response, chunk in zip(await self.roundtrip(requests), chunks):
+            if isinstance(response, ClientError):
+                raise response
+            results.extend(parse_batch(response, len(chunk)))
+        return results
+
+    async def pipeline(self, queries: Sequence[str]) -> List[bool]:
+        """Check queries individually, pipelined across the pool."""
+        lines = [(query_line(query), 'EXISTS') for query in queries]
+        step = self.max_pipeline if self.keepalive else 1
+        chunks = [lines[i:i + step] for i in range(0, len(lines), step)]
+        results: List[bool] = []
+        for responses in await asyncio.gather(
+            *(self.roundtrip(chunk) for chunk in chunks)
+        ):
+            for response in responses:
+                if isinstance(response, ClientError):
+                    raise response
+                results.append(parse_exists(response))
+        return results
+
+    async def close(self) -> None:
+        """Close every idle connection."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def search(query, host='localhost', port=DEFAULT_PORT):
+    """Send one query and return the server's response line.
+
+    Raises a ``ClientError`` subclass on failure.
+    """
+    with Client(host, port, pool_size=1, keepalive=False) as client:
+        line = client.request(query_line(query))[0]
+    return line.decode('utf-8')
+
+
+def search_batch(queries, host='localhost', port=DEFAULT_PORT,
+                 batch_size=MAX_BATCH):
+    """Check many queries, sending them in ::BATCH requests of batch_size."""
+    with Client(host, port, pool_size=1, timeout=30, keepalive=False) as client:
+        return client.exists_many(list(queries), batch_size)
+
+
+def read_queries(stream) -> List[str]:
+    """Read one query per line from ``stream``."""
+    return [line.rstrip('\r\n') for line in stream]
+
+
+def run_queries(
+    client: Client,
+    queries: List[str],
+    mode: str,
+    connections: int,
+    batch_size: int
+) -> List[bool]:
+    """Answer ``queries`` using ``connections`` pooled connections."""
+    if mode == 'batch':
+        chunks = [
+            queries[i:i + batch_size]
+            for i in range(0, len(queries), batch_size)
+        ]
+        results: List[List[bool]] = [[] for _ in chunks]
+        errors: List[ClientError] = []
+
+        def worker(indexes):
+            try:
+                for i in indexes:
+                    results[i] = client.exists_many(chunks[i], batch_size)
+            except ClientError as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=worker, args=(range(n, len(chunks), connections),))
+            for n in range(connections)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return [found for chunk in results for found in chunk]
+
+    return client.pipeline(queries)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line client; queries come from arguments or stdin."""
+    parser = argparse.ArgumentParser(
+        description="Query a string search server."
+    )
+    parser.add_argument('queries', nargs='*',
+                        help="queries to check (default: one per stdin line)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--connections', type=int, default=4,
+                        help="pooled connections used in parallel")
+    parser.add_argument('--mode', choices=('pipeline', 'batch'),
+                        default='pipeline',
+                        help="pipelined single queries or ::BATCH requests")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--oneshot', action='store_true',
+                        help="server uses the one-shot protocol")
+    parser.add_argument('--tls', action='store_true', help="connect with TLS")
+    parser.add_argument('--cafile', help="CA bundle for verifying the server")
+    parser.add_argument('--insecure', action='store_true',
+                        help="do not verify the server certificate")
+    parser.add_argument('--quiet', action='store_true',
+                        help="print only the summary")
+    args = parser.parse_args(argv)
+
+    queries = args.queries or read_queries(sys.stdin)
+    if not queries:
+        parser.error("no queries given")
+
+    context = None
+    if args.tls:
+        context = ssl.create_default_context(cafile=args.cafile)
+        if args.insecure:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+    start = time.perf_counter()
+    try:
+        with Client(
+            args.host, args.port, pool_size=args.connections,
+            timeout=args.timeout, ssl_context=context,
+            keepalive=not args.oneshot
+        ) as client:
+            results = run_queries(
+                client, queries, args.mode, args.connections, args.batch_size
+            )
+            connects = client.connects
+    except ClientError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        for query, found in zip(queries, results):
+            print(f"{query}\t{'STRING EXISTS' if found else 'STRING NOT FOUND'}")
+    if args.quiet or len(queries) > 1:
+        hits = sum(results)
+        print(
+            f"{len(queries)} queries, {hits} found, {connects} connections, "
+            f"{elapsed:.3f}s ({len(queries) / elapsed:.0f} queries/s)",
+            file=sys.stderr
+        )
+    return 0
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 client.py 'search_string'")
-        sys.exit(1)
-    
-    query = sys.argv[1]
-    result = search(query)
-    print(result)
\ No newline at end of file
+    sys.exit(main())
@@ -35,7 +35,11 @@ setup(
     author='Malakai Mwaniki',
     author_email='patrickmwaniki884@example.com',
     url='https://github.com/malechmwaniki/string-search-server',
-    packages=find_packages(exclude=['tests', 'benchmarks']),
+    # src/ has no __init__.py; it is installed as the ``src`` package that
+    # the console scripts below point at
+    packages=find_packages(exclude=['tests', 'benchmarks']) + ['src'],
+    # client.py is a top-level module so the console script can import it
+    py_modules=['client'],
     install_requires=read_requirements(),
     python_requires='>=3.8',
     classifiers=[
@@ -52,6 +56,7 @@ setup(
         'console_scripts': [
             'string-search-server=src.server:main',
             'string-search-client=client:main',
+            'string-search-build-index=src.build_index:main',
         ],
     },
     package_data={
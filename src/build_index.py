@@ -0,0 +1,174 @@
+"""Build or check the index file for a corpus ahead of a deploy."""
+import argparse
+import configparser
+import os
+import sys
+import time
+
+# setup.py installs these modules as the ``src`` package for the console
+# script; they import each other by their flat names
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpora import CORPUS_SECTION
+from fingerprint_index import FingerprintIndex
+from generation import read_generation
+from index_format import (
+    KIND_FINGERPRINT, KIND_PREFIX, KIND_SORTED, payload_crc, read_header
+)
+from prefix_index import build_prefix_index
+from searcher import ENGINES
+from sorted_index import build_sorted_index
+
+
+KINDS = {
+    'sorted': KIND_SORTED,
+    'fingerprint': KIND_FINGERPRINT,
+    'prefix': KIND_PREFIX,
+}
+
+
+def check_index(filepath: str, index_path: str, engine: str) -> bool:
+    """Return True if ``index_path`` is a valid, current index of ``filepath``."""
+    header = read_header(index_path)
+    if header is None:
+        print(f"Missing or invalid index: {index_path}")
+        return False
+    if not header.matches(KINDS[engine], read_generation(filepath)):
+        print(f"Stale index: {index_path}")
+        return False
+    if payload_crc(index_path) != header.payload_crc:
+        print(f"Corrupt index (checksum mismatch): {index_path}")
+        return False
+    print(f"Index is current: {index_path} ({header.count:,} lines)")
+    return True
+
+
+def build_index(
+    filepath: str,
+    index_path: str,
+    engine: str,
+    workers: int = 1
+) -> int:
+    """Build the index for ``engine`` and return the number of lines."""
+    generation = read_generation(filepath)
+    if engine == 'sorted':
+        return build_sorted_index(filepath, index_path, generation=generation)
+    if engine == 'prefix':
+        return build_prefix_index(filepath, index_path, generation=generation)
+
+    index = FingerprintIndex(filepath, workers=workers)
+    try:
+        index.save(index_path, generation)
+        return len(index)
+    finally:
+        index.close()
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Build the index file for a String Search Server corpus',
+        epilog='The engine defaults to the one in the config file when it '
+               'keeps an index file (sorted, fingerprint or prefix); '
+               'otherwise --engine is required.'
+    )
+    parser.add_argument(
+        'corpus',
+        nargs='?',
+        help='Corpus file (default: linuxpath from the config file)'
+    )
+    parser.add_argument(
+        '--config',
+        default='config.ini',
+        help='Config file to read defaults from (default: config.ini)'
+    )
+    parser.add_argument(
+        '--corpus-name',
+        help='Read settings from the [CORPUS:name] section of the config file'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=sorted(KINDS),
+        help='Index type to build (default: engine from the config file, '
+             'if it has an index)'
+    )
+    parser.add_argument(
+        '--index-path',
+        help='Output path (default: index_path from config, or next to corpus)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Build processes (default: build_workers from config, 0 = per CPU)'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Only check whether the existing index is current'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild even if the existing index is current'
+    )
+    args = parser.parse_args()
+
+    cfg = {}
+    config = configparser.ConfigParser()
+    if config.read(args.config) and config.has_section('SERVER'):
+        cfg = config['SERVER']
+
+    if args.corpus_name:
+        section = CORPUS_SECTION + args.corpus_name
+        if not config.has_section(section):
+            parser.error(f"no [{section}] section in {args.config}")
+        # Corpus sections inherit [SERVER] options, except the index path
+        cfg = {k: v for k, v in cfg.items() if k != 'index_path'}
+        cfg.update(config[section])
+
+    corpus = args.corpus or cfg.get('linuxpath')
+    if not corpus:
+        parser.error("no corpus given and no linuxpath in the config file")
+    corpus = os.path.expanduser(corpus.strip())
+    engine = args.engine
+    if engine is None:
+        engine = cfg.get('engine', 'set')
+        if engine not in KINDS:
+            parser.error(
+                f"the configured engine '{engine}' has no index file; "
+                f"choose one with --engine {{{','.join(sorted(KINDS))}}}"
+            )
+    index_path = args.index_path or cfg.get('index_path')
+    index_path = os.path.expanduser(
+        index_path.strip() if index_path else corpus + ENGINES[engine].index_suffix
+    )
+
+    if not os.path.isfile(corpus):
+        print(f"ERROR: File not found: {corpus}")
+        sys.exit(1)
+
+    if args.check:
+        sys.exit(0 if check_index(corpus, index_path, engine) else 1)
+
+    if not args.force and check_index(corpus, index_path, engine):
+        return
+
+    workers = args.workers
+    if workers is None:
+        workers = int(cfg.get('build_workers', 1))
+    workers = workers or os.cpu_count() or 1
+
+    print(f"Building {engine} index of {corpus} ({workers} workers)...")
+    start = time.perf_counter()
+    count = build_index(corpus, index_path, engine, workers)
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(index_path) / (1024 * 1024)
+
+    print("Done!")
+    print(f"  Lines: {count:,}")
+    print(f"  Index: {index_path} ({size_mb:.2f} MB)")
+    print(f"  Build time: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
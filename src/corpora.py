@@ -0,0 +1,140 @@
+"""Corpus definitions read from ``config.ini``.
+
+The ``[SERVER]`` section's ``linuxpath`` defines the corpus named
+``default``. Further corpora are declared in ``[CORPUS:name]`` sections,
+each with its own ``linuxpath`` and optionally its own engine, reread and
+cache settings; anything a corpus section leaves out is taken from
+``[SERVER]``::
+
+    [CORPUS:words]
+    linuxpath = /srv/data/words.txt
+    engine = fingerprint
+"""
+import configparser
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fuzzy_index import DEFAULT_PREFIX_LENGTH
+from searcher import FileSearcher
+from trigram_index import DEFAULT_BUDGET
+
+
+# Section name prefix for additional corpora
+CORPUS_SECTION = 'CORPUS:'
+
+# Name of the corpus defined by [SERVER] linuxpath
+DEFAULT_CORPUS = 'default'
+
+
+class CorpusConfig(NamedTuple):
+    """Settings for one searchable file."""
+    name: str
+    filepath: str
+    reread: bool
+    engine: str
+    index_path: Optional[str]
+    persist_index: bool
+    build_workers: int
+    cache_entries: int
+    cache_bytes: int
+    substring: bool
+    substring_budget: int
+    fuzzy_distance: int
+    fuzzy_prefix_length: int
+    normalize: Optional[str]
+
+
+def _corpus_config(
+    name: str,
+    section: configparser.SectionProxy,
+    server: configparser.SectionProxy
+) -> CorpusConfig:
+    """Read one corpus, falling back to ``server`` for missing options."""
+    def get(key, fallback=None):
+        return section.get(key, fallback=server.get(key, fallback))
+
+    def getboolean(key, fallback):
+        return section.getboolean(
+            key, fallback=server.getboolean(key, fallback=fallback)
+        )
+
+    def getint(key, fallback):
+        return section.getint(key, fallback=server.getint(key, fallback=fallback))
+
+    filepath = section.get('linuxpath')
+    if not filepath:
+        raise ValueError(f"corpus {name} has no linuxpath")
+    index_path = get('index_path')
+    if section is not server and 'index_path' not in section:
+        # A shared index_path would make corpora overwrite each other
+        index_path = None
+    return CorpusConfig(
+        name=name,
+        filepath=os.path.expanduser(filepath.strip()),
+        reread=getboolean('REREAD_ON_QUERY', False),
+        engine=get('engine', 'set'),
+        index_path=os.path.expanduser(index_path) if index_path else None,
+        persist_index=getboolean('persist_index', True),
+        build_workers=getint('build_workers', 1),
+        cache_entries=getint('cache_entries', 0),
+        cache_bytes=getint('cache_bytes', 0),
+        substring=getboolean('substring', False),
+        substring_budget=getint('substring_budget', DEFAULT_BUDGET),
+        fuzzy_distance=getint('fuzzy_distance', 0),
+        fuzzy_prefix_length=getint('fuzzy_prefix_length', DEFAULT_PREFIX_LENGTH),
+        normalize=get('normalize'),
+    )
+
+
+def load_corpus_configs(
+    config: configparser.ConfigParser
+) -> Tuple[Dict[str, CorpusConfig], str]:
+    """Return every configured corpus by name, and the default name.
+
+    Plain queries from clients that do not pick a corpus go to the
+    default: ``default_corpus`` from ``[SERVER]`` if set, otherwise the
+    ``[SERVER]`` corpus, otherwise the first ``[CORPUS:name]`` section.
+    """
+    server = config['SERVER']
+    corpora: Dict[str, CorpusConfig] = {}
+    if server.get('linuxpath'):
+        corpora[DEFAULT_CORPUS] = _corpus_config(DEFAULT_CORPUS, server, server)
+
+    for section in config.sections():
+        if not section.startswith(CORPUS_SECTION):
+            continue
+        name = section[len(CORPUS_SECTION):].strip()
+        if not name or any(c.isspace() for c in name):
+            raise ValueError(f"invalid corpus name in [{section}]")
+        if name in corpora:
+            raise ValueError(f"corpus {name} is defined twice")
+        corpora[name] = _corpus_config(name, config[section], server)
+
+    if not corpora:
+        raise ValueError(
+            "no corpus configured: set linuxpath or add a [CORPUS:name] section"
+        )
+
+    default = server.get('default_corpus', fallback=None) or next(iter(corpora))
+    if default not in corpora:
+        raise ValueError(f"default_corpus {default} is not configured")
+    return corpora, default
+
+
+def open_searcher(corpus: CorpusConfig) -> FileSearcher:
+    """Create (and, unless it rereads per query, load) a corpus searcher."""
+    return FileSearcher(
+        corpus.filepath,
+        corpus.reread,
+        corpus.engine,
+        corpus.index_path,
+        corpus.persist_index,
+        corpus.build_workers,
+        corpus.cache_entries,
+        corpus.cache_bytes,
+        corpus.substring,
+        corpus.substring_budget,
+        corpus.fuzzy_distance,
+        corpus.fuzzy_prefix_length,
+        corpus.normalize,
+    )
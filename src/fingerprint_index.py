@@ -0,0 +1,418 @@
+"""Compact in-memory index of 64-bit line fingerprints."""
+import mmap
+import os
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from heapq import merge
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from generation import FileGeneration
+from index_format import (
+    HEADER_SIZE, KIND_FINGERPRINT, make_header, unpack_header
+)
+
+
+# Suffix of the index file written next to the corpus
+FINGERPRINT_INDEX_SUFFIX = '.fpidx'
+
+# Files smaller than this are always fingerprinted in-process
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+# Lines sorted in memory at once. Sorting holds a few Python objects per
+# line, so larger files are sorted in runs of this many lines that are
+# spilled to temporary files and merged into the finished arrays
+SORT_RUN_LINES = 1 << 20
+
+# Records read from a spilled run at a time while merging
+MERGE_BLOCK_RECORDS = 1024
+
+
+def fingerprint(key: bytes) -> int:
+    """Return a stable 64-bit fingerprint of a line."""
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), 'little')
+
+
+def scan_fingerprints(
+    mm: mmap.mmap,
+    start: int,
+    end: int,
+    limit: Optional[int] = None
+) -> Tuple[array, array]:
+    """Fingerprint every line starting in ``[start, end)``.
+
+    ``start`` must be the first byte of a line. At most ``limit`` lines are
+    read; the mapping is then positioned at the start of the next line.
+    Returns unsorted arrays of fingerprints and the byte offsets of the
+    lines they came from.
+    """
+    fingerprints = array('Q')
+    offsets = array('Q')
+    mm.seek(start)
+    offset = start
+    while offset < end and (limit is None or len(offsets) < limit):
+        line = mm.readline()
+        if not line:
+            break
+        fingerprints.append(fingerprint(line.rstrip(b'\r\n')))
+        offsets.append(offset)
+        offset += len(line)
+    return fingerprints, offsets
+
+
+def sort_fingerprints(
+    fingerprints: array,
+    offsets: array
+) -> Tuple[array, array]:
+    """Sort fingerprints ascending, keeping offsets aligned with them.
+
+    The sort holds Python ints for every line, so it is only used on runs
+    of at most ``SORT_RUN_LINES`` lines.
+    """
+    order = sorted(range(len(fingerprints)), key=fingerprints.__getitem__)
+    return (
+        array('Q', [fingerprints[i] for i in order]),
+        array('Q', [offsets[i] for i in order]),
+    )
+
+
+def spill_run(spill, fingerprints: array, offsets: array) -> Tuple[int, int]:
+    """Append a sorted run to ``spill`` as packed (fingerprint, offset) pairs.
+
+    Returns the position of the run in the file and its number of records.
+    """
+    records = array('Q', [0]) * (2 * len(fingerprints))
+    records[0::2] = fingerprints
+    records[1::2] = offsets
+    position = spill.tell()
+    records.tofile(spill)
+    return position, len(fingerprints)
+
+
+def spill_runs(
+    mm: mmap.mmap,
+    start: int,
+    end: int,
+    spill,
+    run_lines: int
+) -> List[Tuple[int, int]]:
+    """Write the lines in ``[start, end)`` to ``spill`` as sorted runs."""
+    runs = []
+    while start < end:
+        fingerprints, offsets = scan_fingerprints(mm, start, end, run_lines)
+        if not offsets:
+            break
+        start = mm.tell()
+        runs.append(
+            spill_run(spill, *sort_fingerprints(fingerprints, offsets))
+        )
+    return runs
+
+
+def read_run(
+    path: str,
+    position: int,
+    count: int
+) -> Iterator[Tuple[int, int]]:
+    """Yield the (fingerprint, offset) pairs of one spilled run in order."""
+    with open(path, 'rb') as f:
+        f.seek(position)
+        while count:
+            block = array('Q')
+            n = min(count, MERGE_BLOCK_RECORDS)
+            block.fromfile(f, 2 * n)
+            pairs = iter(block)
+            yield from zip(pairs, pairs)
+            count -= n
+
+
+def merge_runs(
+    spilled: Sequence[Tuple[str, List[Tuple[int, int]]]]
+) -> Tuple[array, array]:
+    """Merge spilled runs into the final sorted fingerprint and offset arrays.
+
+    ``spilled`` lists each spill file with the runs written to it. Both
+    arrays are allocated at their final size up front, so the merge needs
+    16 bytes per line plus one block per run.
+    """
+    runs = [
+        read_run(path, position, count)
+        for path, file_runs in spilled
+        for position, count in file_runs
+    ]
+    total = sum(count for _, file_runs in spilled for _, count in file_runs)
+    fingerprints = array('Q', [0]) * total
+    offsets = array('Q', [0]) * total
+    for i, (fp, offset) in enumerate(merge(*runs)):
+        fingerprints[i] = fp
+        offsets[i] = offset
+    return fingerprints, offsets
+
+
+def split_ranges(mm: mmap.mmap, parts: int) -> List[Tuple[int, int]]:
+    """Split the mapped file into up to ``parts`` newline-aligned ranges.
+
+    Every range starts at the beginning of a line, so each line belongs to
+    exactly one range.
+    """
+    size = mm.size()
+    bounds = [0]
+    for i in range(1, parts):
+        pos = max(size * i // parts, bounds[-1] + 1)
+        nl = mm.find(b'\n', pos - 1)
+        if nl == -1 or nl + 1 >= size:
+            break
+        bounds.append(nl + 1)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _spill_range(
+    filepath: str,
+    start: int,
+    end: int,
+    spill_dir: str,
+    run_lines: int
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """Worker: spill sorted runs of one range of the file to ``spill_dir``."""
+    with open(filepath, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            fd, path = tempfile.mkstemp(prefix='run-', dir=spill_dir)
+            with os.fdopen(fd, 'wb') as spill:
+                return path, spill_runs(mm, start, end, spill, run_lines)
+        finally:
+            mm.close()
+
+
+def build_fingerprints(
+    filepath: str,
+    mm: mmap.mmap,
+    workers: int = 1
+) -> Tuple[array, array]:
+    """Fingerprint every line of the mapped file, sorted by fingerprint.
+
+    Files of up to ``SORT_RUN_LINES`` lines are sorted in memory. Larger
+    ones are cut into sorted runs that are spilled to a temporary directory
+    and merged, so the build needs little more memory than the 16 bytes per
+    line of the finished index. With ``workers`` > 1 the file is split into
+    newline-aligned ranges that are fingerprinted and spilled in a process
+    pool.
+    """
+    size = mm.size()
+    parallel = workers > 1 and size >= PARALLEL_MIN_BYTES
+    if not parallel:
+        fingerprints, offsets = scan_fingerprints(mm, 0, size, SORT_RUN_LINES)
+        if mm.tell() >= size:
+            return sort_fingerprints(fingerprints, offsets)
+
+    with tempfile.TemporaryDirectory(prefix='fpidx-') as spill_dir:
+        if parallel:
+            ranges = split_ranges(mm, workers)
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                spilled = list(pool.map(
+                    _spill_range,
+                    [filepath] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges],
+                    [spill_dir] * len(ranges),
+                    [SORT_RUN_LINES] * len(ranges),
+                ))
+        else:
+            # Spill the run already in memory, then the rest of the file
+            path = os.path.join(spill_dir, 'runs')
+            with open(path, 'wb') as spill:
+                start = mm.tell()
+                runs = [spill_run(
+                    spill, *sort_fingerprints(fingerprints, offsets)
+                )]
+                del fingerprints, offsets
+                runs.extend(spill_runs(mm, start, size, spill, SORT_RUN_LINES))
+            spilled = [(path, runs)]
+        return merge_runs(spilled)
+
+
+class FingerprintIndex:
+    """Sorted array of line fingerprints with offsets into the mapped file.
+
+    Each line costs 16 bytes (fingerprint plus offset) instead of a Python
+    ``bytes`` object in a set. A fingerprint match is confirmed against the
+    real bytes in the mapped file, so collisions never produce false hits.
+    Because lookups read the mapping, the file should be replaced by
+    rename rather than truncated in place while it is being served.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        fingerprints: Optional[array] = None,
+        offsets: Optional[array] = None,
+        workers: int = 1
+    ):
+        """Map ``filepath`` and fingerprint every line in it.
+
+        Prebuilt, sorted ``fingerprints`` and ``offsets`` arrays may be
+        passed in to skip the scan. Otherwise the scan is spread over
+        ``workers`` processes.
+        """
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = None
+        self.fingerprints = array('Q')
+        self.offsets = array('Q')
+        if self.size:
+            self._mm = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            if fingerprints is None:
+                fingerprints, offsets = build_fingerprints(
+                    filepath, self._mm, workers
+                )
+            self.fingerprints, self.offsets = fingerprints, offsets
+
+    @classmethod
+    def load(
+        cls,
+        filepath: str,
+        index_path: str,
+        generation: FileGeneration
+    ) -> Optional['FingerprintIndex']:
+        """Load a saved index of ``filepath`` in one bulk read.
+
+        Returns None if the index file is missing, corrupt or was built
+        from a different generation of the file.
+        """
+        try:
+            with open(index_path, 'rb') as f:
+                header = unpack_header(f.read(HEADER_SIZE))
+                if (
+                    header is None
+                    or not header.matches(KIND_FINGERPRINT, generation)
+                ):
+                    return None
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+
+        if (
+            len(payload) != header.count * 16
+            or zlib.crc32(payload) != header.payload_crc
+        ):
+            return None
+
+        fingerprints = array('Q')
+        offsets = array('Q')
+        fingerprints.frombytes(payload[:header.count * 8])
+        offsets.frombytes(payload[header.count * 8:])
+        if sys.byteorder != 'little':
+            fingerprints.byteswap()
+            offsets.byteswap()
+        return cls(filepath, fingerprints, offsets)
+
+    def save(self, index_path: str, generation: FileGeneration) -> None:
+        """Write the index next to the corpus, replacing any older one."""
+        fingerprints = self.fingerprints
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            fingerprints = array('Q', fingerprints)
+            offsets = array('Q', offsets)
+            fingerprints.byteswap()
+            offsets.byteswap()
+        payload = fingerprints.tobytes() + offsets.tobytes()
+        header = make_header(
+            KIND_FINGERPRINT, len(fingerprints), generation,
+            zlib.crc32(payload)
+        )
+
+        directory = os.path.dirname(os.path.abspath(index_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.index-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(header.pack())
+                out.write(payload)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the fingerprint and offset arrays."""
+        return (
+            len(self.fingerprints) * self.fingerprints.itemsize
+            + len(self.offsets) * self.offsets.itemsize
+        )
+
+    def _line_at(self, offset: int) -> bytes:
+        """Return the line starting at ``offset`` without its terminator."""
+        end = self._mm.find(b'\n', offset)
+        if end == -1:
+            end = self.size
+        return self._mm[offset:end].rstrip(b'\r\n')
+
+    def _confirm(self, key: bytes, fp: int, lo: int) -> Tuple[bool, int]:
+        """Check candidates from position ``lo`` whose fingerprint is ``fp``.
+
+        Returns whether ``key`` was found and the first position past the
+        candidates, which later searches for larger fingerprints can start
+        from.
+        """
+        fingerprints = self.fingerprints
+        i = bisect_left(fingerprints, fp, lo)
+        n = len(fingerprints)
+        while i < n and fingerprints[i] == fp:
+            if self._line_at(self.offsets[i]) == key:
+                return True, i
+            i += 1
+        return False, i
+
+    def __contains__(self, key: bytes) -> bool:
+        """Return True if ``key`` is one of the indexed lines."""
+        if self._mm is None:
+            return False
+        return self._confirm(key, fingerprint(key), 0)[0]
+
+    def contains_many(self, keys: Sequence[bytes]) -> List[bool]:
+        """Look up a batch of keys in one ordered pass.
+
+        The batch is fingerprinted and sorted, and each distinct fingerprint
+        is searched for once, starting where the previous search ended.
+        Keys whose fingerprint is absent are answered without touching the
+        mapped file.
+        """
+        results = [False] * len(keys)
+        if self._mm is None:
+            return results
+
+        fingerprints = self.fingerprints
+        offsets = self.offsets
+        n = len(fingerprints)
+        line_at = self._line_at
+        lo = 0
+        last_fp = -1
+        for fp, i in sorted(zip(map(fingerprint, keys), range(len(keys)))):
+            if fp != last_fp:
+                lo = bisect_left(fingerprints, fp, lo)
+                last_fp = fp
+            j = lo
+            while j < n and fingerprints[j] == fp:
+                if line_at(offsets[j]) == keys[i]:
+                    results[i] = True
+                    break
+                j += 1
+        return results
+
+    def close(self) -> None:
+        """Release the mapping and file handle."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
@@ -0,0 +1,171 @@
+"""Symmetric-delete index for bounded edit-distance lookups.
+
+Two strings within edit distance k of each other can both be reduced to a
+common string by deleting at most k characters from each. Every line is
+indexed under all of its deletion variants up to ``max_distance``
+characters, so a query only needs to generate its own variants and look
+them up; the lines found are candidates, and the exact edit distance
+confirms them.
+
+Variants are generated only from the first ``prefix_length`` characters
+of a line, which keeps the number of entries per line independent of its
+length (1 + p + p(p-1)/2 for k = 2 and p = 7). The prefixes of two
+matching strings need not be within distance k of each other: "xabc" and
+"abc" differ by one edit, but their first three characters by two. No
+match is missed all the same, because the characters an optimal alignment
+pairs up inside both prefixes form a common string that each prefix
+reaches with at most k deletions, and those deletions are all indexed.
+"""
+import mmap
+import os
+from array import array
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from trigram_index import mapped_lines
+
+
+# Largest edit distance an index may be built for; the number of variants
+# per line grows roughly as prefix_length ** k
+MAX_DISTANCE = 3
+
+# Default edit distance indexed
+DEFAULT_DISTANCE = 2
+
+# Characters at the start of each line that variants are generated from
+DEFAULT_PREFIX_LENGTH = 7
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """Every string reachable from ``word`` by up to ``distance`` deletions."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {
+            w[:i] + w[i + 1:] for w in frontier for i in range(len(w))
+        }
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` if above it."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """Finds the closest line within a small edit distance of a query."""
+
+    def __init__(
+        self,
+        filepath: str,
+        max_distance: int = DEFAULT_DISTANCE,
+        prefix_length: int = DEFAULT_PREFIX_LENGTH
+    ):
+        """Map ``filepath`` and index every line's deletion variants."""
+        if not 1 <= max_distance <= MAX_DISTANCE:
+            raise ValueError(
+                f"max_distance must be between 1 and {MAX_DISTANCE}"
+            )
+        if prefix_length <= max_distance:
+            raise ValueError("prefix_length must be greater than max_distance")
+        self.filepath = filepath
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.offsets = array('Q')
+        # Variant -> line id, or a list of ids when several lines share it
+        self.variants: Dict[str, Union[int, List[int]]] = {}
+        self._file = open(filepath, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = None
+        if self.size:
+            self._mm = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            self._build()
+
+    def _build(self) -> None:
+        """Index the deletion variants of every distinct line prefix."""
+        variants = self.variants
+        seen: Set[bytes] = set()
+        for offset, line in mapped_lines(self._mm):
+            if line in seen:
+                continue
+            seen.add(line)
+            line_id = len(self.offsets)
+            self.offsets.append(offset)
+            key = line.decode('utf-8', 'surrogateescape')
+            for variant in deletes(key[:self.prefix_length], self.max_distance):
+                entry = variants.get(variant)
+                if entry is None:
+                    variants[variant] = line_id
+                elif isinstance(entry, int):
+                    variants[variant] = [entry, line_id]
+                else:
+                    entry.append(line_id)
+
+    def __len__(self) -> int:
+        """Number of distinct lines indexed."""
+        return len(self.offsets)
+
+    def _line(self, line_id: int) -> str:
+        """Return the text of line ``line_id``."""
+        start = self.offsets[line_id]
+        end = self._mm.find(b'\n', start)
+        if end == -1:
+            end = self.size
+        return self._mm[start:end].rstrip(b'\r').decode(
+            'utf-8', 'surrogateescape'
+        )
+
+    def nearest(self, query: str, distance: int) -> Optional[Tuple[int, str]]:
+        """Return (distance, line) for the closest line within ``distance``.
+
+        Ties go to the line that comes first in the file. Returns None when
+        no line is close enough. ``distance`` is capped at the indexed
+        maximum.
+        """
+        if self._mm is None:
+            return None
+        distance = min(distance, self.max_distance)
+        candidates: Set[int] = set()
+        for variant in deletes(query[:self.prefix_length], distance):
+            entry = self.variants.get(variant)
+            if entry is None:
+                continue
+            if isinstance(entry, int):
+                candidates.add(entry)
+            else:
+                candidates.update(entry)
+
+        best = None
+        for line_id in sorted(candidates):
+            line = self._line(line_id)
+            d = edit_distance(query, line, distance)
+            if d <= distance and (best is None or d < best[0]):
+                best = (d, line)
+                if d == 0:
+                    break
+                # Later candidates must now beat this one
+                distance = d - 1
+        return best
+
+    def close(self) -> None:
+        """Release the mapping and file handle."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
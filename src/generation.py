@@ -0,0 +1,47 @@
+"""Identity of one version of a corpus file."""
+import mmap
+import os
+import zlib
+from typing import NamedTuple
+
+
+# Bytes hashed at each end of the file to tell an append from a rewrite
+CHECK_WINDOW = 4096
+
+
+class FileGeneration(NamedTuple):
+    """Identity of one version of the searched file."""
+    inode: int
+    size: int
+    mtime_ns: int
+    head_crc: int
+    tail_crc: int
+
+
+def generation_of(st: os.stat_result, data) -> FileGeneration:
+    """Build the generation record for an opened file.
+
+    ``data`` is anything sliceable holding the file contents, usually an
+    mmap of it.
+    """
+    size = st.st_size
+    return FileGeneration(
+        inode=st.st_ino,
+        size=size,
+        mtime_ns=st.st_mtime_ns,
+        head_crc=zlib.crc32(data[:min(CHECK_WINDOW, size)]),
+        tail_crc=zlib.crc32(data[max(0, size - CHECK_WINDOW):size]),
+    )
+
+
+def read_generation(filepath: str) -> FileGeneration:
+    """Stat and checksum the file as it is on disk now."""
+    with open(filepath, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return generation_of(st, b"")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return generation_of(st, mm)
+        finally:
+            mm.close()
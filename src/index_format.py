@@ -0,0 +1,122 @@
+"""Header shared by the index files written next to a corpus.
+
+Every index file starts with a fixed 64-byte little-endian header::
+
+    magic        4s   b'SSIX'
+    version      H    FORMAT_VERSION
+    kind         H    KIND_SORTED, KIND_FINGERPRINT or KIND_PREFIX
+    count        Q    number of indexed lines
+    source_size  Q    size of the corpus the index was built from
+    source_mtime Q    mtime_ns of that corpus
+    head_crc     I    CRC32 of the corpus head window
+    tail_crc     I    CRC32 of the corpus tail window
+    payload_crc  I    CRC32 of everything after the header
+
+An index is reused only when all of the source fields match the corpus on
+disk, so a copied or rebuilt corpus is detected even if its size is
+unchanged.
+"""
+import struct
+import zlib
+from typing import NamedTuple, Optional
+
+from generation import FileGeneration
+
+
+MAGIC = b'SSIX'
+FORMAT_VERSION = 1
+
+KIND_SORTED = 1
+KIND_FINGERPRINT = 2
+KIND_PREFIX = 3
+
+HEADER = struct.Struct('<4sHHQQQIII20x')
+HEADER_SIZE = HEADER.size
+
+
+class IndexHeader(NamedTuple):
+    """Decoded index file header."""
+    kind: int
+    count: int
+    source_size: int
+    source_mtime_ns: int
+    head_crc: int
+    tail_crc: int
+    payload_crc: int
+    version: int = FORMAT_VERSION
+
+    def pack(self) -> bytes:
+        """Encode the header to its on-disk form."""
+        return HEADER.pack(
+            MAGIC, self.version, self.kind, self.count, self.source_size,
+            self.source_mtime_ns, self.head_crc, self.tail_crc,
+            self.payload_crc
+        )
+
+    def matches(self, kind: int, generation: FileGeneration) -> bool:
+        """Return True if this index was built from ``generation``."""
+        return (
+            self.version == FORMAT_VERSION
+            and self.kind == kind
+            and self.source_size == generation.size
+            and self.source_mtime_ns == generation.mtime_ns
+            and self.head_crc == generation.head_crc
+            and self.tail_crc == generation.tail_crc
+        )
+
+
+def make_header(
+    kind: int,
+    count: int,
+    generation: FileGeneration,
+    payload_crc: int
+) -> IndexHeader:
+    """Build the header for an index of ``generation``."""
+    return IndexHeader(
+        kind=kind,
+        count=count,
+        source_size=generation.size,
+        source_mtime_ns=generation.mtime_ns,
+        head_crc=generation.head_crc,
+        tail_crc=generation.tail_crc,
+        payload_crc=payload_crc,
+    )
+
+
+def unpack_header(data: bytes) -> Optional[IndexHeader]:
+    """Decode a header, or return None if ``data`` is not an index header."""
+    if len(data) < HEADER_SIZE:
+        return None
+    (magic, version, kind, count, source_size, source_mtime_ns,
+     head_crc, tail_crc, payload_crc) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    return IndexHeader(
+        kind=kind,
+        count=count,
+        source_size=source_size,
+        source_mtime_ns=source_mtime_ns,
+        head_crc=head_crc,
+        tail_crc=tail_crc,
+        payload_crc=payload_crc,
+        version=version,
+    )
+
+
+def read_header(index_path: str) -> Optional[IndexHeader]:
+    """Read the header of an index file, or None if it is missing or invalid."""
+    try:
+        with open(index_path, 'rb') as f:
+            return unpack_header(f.read(HEADER_SIZE))
+    except FileNotFoundError:
+        return None
+
+
+def payload_crc(index_path: str, chunk_size: int = 1024 * 1024) -> int:
+    """Compute the CRC32 of an index file's payload."""
+    crc = 0
+    with open(index_path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
@@ -0,0 +1,271 @@
+"""Request metrics with per-thread histograms, exported for Prometheus.
+
+Search latency and hit/miss counts carry a ``corpus`` label when the
+server has named corpora; other series are server-wide.
+"""
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Tuple, Union
+
+
+# Request stages that get a latency histogram
+STAGES = ('handshake', 'recv', 'search', 'send')
+
+# Quantiles exported for each stage
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# Buckets per power of two; 2**3 keeps every bucket within 12.5% of its value
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Values are recorded in microseconds up to 2**40 (about 12 days)
+MAX_EXPONENT = 40
+BUCKET_COUNT = (MAX_EXPONENT + 1) * SUB_BUCKETS
+
+PREFIX = 'string_search'
+
+
+def bucket_index(micros: int) -> int:
+    """Map a value in microseconds to its log-linear (HDR-style) bucket.
+
+    Values below ``2 * SUB_BUCKETS`` get exact buckets; above that every
+    power of two is split into ``SUB_BUCKETS`` equal buckets.
+    """
+    if micros < 2 * SUB_BUCKETS:
+        return max(0, micros)
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    index = (shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+    return min(index, BUCKET_COUNT - 1)
+
+
+def bucket_upper(index: int) -> int:
+    """Smallest value in microseconds above bucket ``index``."""
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    shift = index // SUB_BUCKETS - 1
+    return (index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift
+
+
+class Histogram:
+    """Fixed-size log-linear latency histogram.
+
+    Recording is a bucket computation and a list increment, with no
+    locking; each thread records into its own instance (see Metrics).
+    """
+
+    def __init__(self):
+        """Create an empty histogram."""
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one observation, in seconds."""
+        self.counts[bucket_index(int(seconds * 1_000_000))] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other: 'Histogram') -> None:
+        """Add the observations of ``other`` into this histogram."""
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q: float) -> float:
+        """Upper bound, in seconds, of the bucket holding quantile ``q``."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return bucket_upper(i) / 1_000_000
+        return bucket_upper(BUCKET_COUNT - 1) / 1_000_000
+
+
+def escape_label(value: str) -> str:
+    """Escape a label value as the text exposition format requires."""
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+def labels(**pairs: str) -> str:
+    """Format non-empty label values as a Prometheus label set."""
+    text = ','.join(
+        f'{k}="{escape_label(v)}"' for k, v in pairs.items() if v
+    )
+    return f"{{{text}}}" if text else ''
+
+
+class _Shard:
+    """One thread's histograms and counters, keyed by (name, corpus)."""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Counter = Counter()
+
+
+class Metrics:
+    """Per-thread request metrics merged when scraped.
+
+    Each thread updates only its own shard, so the hot path takes no lock.
+    ``render()`` sums the shards; a scrape may miss an update that is in
+    flight, which is fine for monitoring.
+    """
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._gauges: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+
+    def _shard(self) -> _Shard:
+        """Return the calling thread's shard, creating it on first use."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def observe(self, stage: str, seconds: float, corpus: str = '') -> None:
+        """Record the duration of one request stage."""
+        histograms = self._shard().histograms
+        key = (stage, corpus)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.record(seconds)
+
+    def inc(self, counter: str, n: int = 1, corpus: str = '') -> None:
+        """Add ``n`` to a counter (hits, misses, errors, rejected, tls_*)."""
+        self._shard().counters[counter, corpus] += n
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        fn: Callable[[], Union[float, Dict[str, float]]],
+        kind: str = 'gauge'
+    ) -> None:
+        """Register a metric whose value is read from ``fn`` at scrape time.
+
+        ``fn`` may return a dict of values by corpus name. ``kind`` may be
+        ``counter`` for totals kept elsewhere, such as the result cache's
+        hit count.
+        """
+        self._gauges[name] = (kind, help_text, fn)
+
+    def snapshot(self) -> Tuple[Dict[Tuple[str, str], Histogram], Counter]:
+        """Merge every thread's shard into totals keyed by (name, corpus).
+
+        Every stage is present, with an empty corpus if nothing has been
+        recorded for it yet.
+        """
+        histograms: Dict[Tuple[str, str], Histogram] = {}
+        counters: Counter = Counter()
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, histogram in list(shard.histograms.items()):
+                histograms.setdefault(key, Histogram()).merge(histogram)
+            counters.update(shard.counters)
+        for stage in STAGES:
+            if not any(key[0] == stage for key in histograms):
+                histograms[stage, ''] = Histogram()
+        return histograms, counters
+
+    def render(self) -> str:
+        """Format the current metrics in the Prometheus text format."""
+        histograms, counters = self.snapshot()
+        corpora = sorted(
+            {corpus for name, corpus in counters if name in ('hits', 'misses')}
+        ) or ['']
+
+        name = f"{PREFIX}_requests_total"
+        out = [
+            f"# HELP {name} Queries answered, by result.",
+            f"# TYPE {name} counter",
+        ]
+        for corpus in corpora:
+            for result, counter in (('hit', 'hits'), ('miss', 'misses')):
+                out.append(
+                    f"{name}{labels(corpus=corpus, result=result)} "
+                    f"{counters[counter, corpus]}"
+                )
+        out += [
+            f"# HELP {PREFIX}_errors_total Client and protocol errors.",
+            f"# TYPE {PREFIX}_errors_total counter",
+            f"{PREFIX}_errors_total {counters['errors', '']}",
+            f"# HELP {PREFIX}_rejected_total Connections refused as busy.",
+            f"# TYPE {PREFIX}_rejected_total counter",
+            f"{PREFIX}_rejected_total {counters['rejected', '']}",
+            f"# HELP {PREFIX}_tls_handshakes_total TLS handshakes completed.",
+            f"# TYPE {PREFIX}_tls_handshakes_total counter",
+            f"{PREFIX}_tls_handshakes_total{labels(resumed='false')} "
+            f"{counters['tls_full', '']}",
+            f"{PREFIX}_tls_handshakes_total{labels(resumed='true')} "
+            f"{counters['tls_resumed', '']}",
+        ]
+
+        name = f"{PREFIX}_stage_seconds"
+        out.append(f"# HELP {name} Latency of each request stage.")
+        out.append(f"# TYPE {name} summary")
+        for (stage, corpus), histogram in sorted(
+            histograms.items(), key=lambda item: (
+                STAGES.index(item[0][0]), item[0][1]
+            )
+        ):
+            for q in QUANTILES:
+                quantile = labels(stage=stage, corpus=corpus, quantile=str(q))
+                out.append(f"{name}{quantile} {histogram.quantile(q):.6f}")
+            series = labels(stage=stage, corpus=corpus)
+            out.append(f"{name}_sum{series} {histogram.total:.6f}")
+            out.append(f"{name}_count{series} {histogram.count}")
+
+        for gauge, (kind, help_text, fn) in self._gauges.items():
+            out.append(f"# HELP {PREFIX}_{gauge} {help_text}")
+            out.append(f"# TYPE {PREFIX}_{gauge} {kind}")
+            value = fn()
+            if isinstance(value, dict):
+                for corpus, v in value.items():
+                    out.append(f"{PREFIX}_{gauge}{labels(corpus=corpus)} {v}")
+            else:
+                out.append(f"{PREFIX}_{gauge} {value}")
+        return '\n'.join(out) + '\n'
+
+
+def serve_metrics(metrics: Metrics, host: str, port: int) -> HTTPServer:
+    """Serve ``metrics`` at /metrics over HTTP from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header(
+                'Content-Type', 'text/plain; version=0.0.4; charset=utf-8'
+            )
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer((host, port), Handler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics", daemon=True
+    ).start()
+    return server
@@ -0,0 +1,106 @@
+"""Normalized matching: case folding, Unicode forms and whitespace.
+
+A ``Normalizer`` is configured from a comma-separated list of steps::
+
+    normalize = casefold, nfkc, whitespace
+
+and is applied once to every line when the index is built and once to
+each normalized query. Lines that are already in normal form are found
+through the exact index, so the secondary index holds only the lines that
+normalization changes.
+"""
+import mmap
+import os
+import unicodedata
+from typing import Iterable, Optional, Set
+
+
+# Unicode normalization forms accepted as steps
+FORMS = ('nfc', 'nfd', 'nfkc', 'nfkd')
+
+# Every accepted step
+STEPS = FORMS + ('casefold', 'lower', 'whitespace')
+
+
+class Normalizer:
+    """Applies a fixed sequence of normalization steps to a string.
+
+    Whitespace is collapsed first, then the string is case-mapped, with
+    the Unicode form applied both before and after case mapping; folding
+    can produce characters that are not in normal form (``'ǰ'.casefold()``
+    is not NFC), and normalizing twice keeps the result stable when the
+    normalizer is applied again.
+    """
+
+    def __init__(self, steps: Iterable[str]):
+        """Create a normalizer from step names; see ``STEPS``."""
+        steps = [step.strip().lower() for step in steps if step.strip()]
+        unknown = [step for step in steps if step not in STEPS]
+        if unknown:
+            raise ValueError(
+                f"Unknown normalization: {', '.join(unknown)} "
+                f"(expected any of {', '.join(STEPS)})"
+            )
+        forms = [step for step in steps if step in FORMS]
+        if len(forms) > 1:
+            raise ValueError("only one Unicode normalization form may be set")
+        self.steps = tuple(steps)
+        self.form = forms[0].upper() if forms else None
+        self.whitespace = 'whitespace' in steps
+        self.case = (
+            str.casefold if 'casefold' in steps
+            else str.lower if 'lower' in steps else None
+        )
+
+    @classmethod
+    def from_spec(cls, spec: Optional[str]) -> Optional['Normalizer']:
+        """Parse a comma-separated step list; None or empty disables it."""
+        if not spec or not spec.strip():
+            return None
+        return cls(spec.split(','))
+
+    def __call__(self, text: str) -> str:
+        """Return the normal form of ``text``."""
+        if self.whitespace:
+            text = ' '.join(text.split())
+        if self.form:
+            text = unicodedata.normalize(self.form, text)
+        if self.case:
+            text = self.case(text)
+            if self.form:
+                text = unicodedata.normalize(self.form, text)
+        return text
+
+    def key(self, text: str) -> bytes:
+        """Normal form of ``text`` encoded the way index keys are."""
+        return self(text).encode('utf-8', 'surrogateescape')
+
+
+class NormalizedIndex:
+    """Normal forms of the lines that normalization changes."""
+
+    def __init__(self, filepath: str, normalizer: Normalizer):
+        """Normalize every line of ``filepath``."""
+        self.filepath = filepath
+        self.normalizer = normalizer
+        self.keys: Set[bytes] = set()
+        with open(filepath, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for line in iter(mm.readline, b""):
+                    raw = line.rstrip(b'\r\n')
+                    key = normalizer.key(raw.decode('utf-8', 'surrogateescape'))
+                    if key != raw:
+                        self.keys.add(key)
+            finally:
+                mm.close()
+
+    def __len__(self) -> int:
+        """Number of lines whose normal form differs from the line."""
+        return len(self.keys)
+
+    def __contains__(self, key: bytes) -> bool:
+        """True if a changed line normalizes to ``key``."""
+        return key in self.keys
@@ -0,0 +1,244 @@
+"""Front-coded sorted index for exact and prefix lookups.
+
+The distinct lines of the corpus are stored in sorted order in blocks of
+``BLOCK_SIZE`` keys. The first key of a block is stored in full; every
+other key is stored as the length it shares with the previous key plus
+the remaining suffix, so runs of similar lines take little space::
+
+    header     64 bytes (see index_format)
+    blocks     varint(len) key, then varint(shared) varint(len) suffix ...
+    directory  one little-endian uint64 offset per block
+    trailer    directory offset (Q), block size (I), block count (I)
+
+Only the block directory is held in memory. A lookup binary-searches the
+first keys of the blocks and then decodes a single block.
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import List, Optional
+
+from generation import FileGeneration, read_generation
+from index_format import HEADER_SIZE, KIND_PREFIX, make_header, unpack_header
+from sorted_index import RUN_BYTES, sorted_lines
+
+
+# Suffix of the index file written next to the corpus
+PREFIX_INDEX_SUFFIX = '.prefix'
+
+# Keys per front-coded block: larger blocks are smaller on disk but take
+# longer to decode per lookup
+BLOCK_SIZE = 16
+
+TRAILER = struct.Struct('<QII')
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    """Append ``n`` as an unsigned LEB128 varint."""
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int):
+    """Decode the varint at ``pos``; return it and the next position."""
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _shared_length(a: bytes, b: bytes) -> int:
+    """Length of the common prefix of ``a`` and ``b``."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def build_prefix_index(
+    source: str,
+    index_path: str,
+    block_size: int = BLOCK_SIZE,
+    run_bytes: int = RUN_BYTES,
+    generation: Optional[FileGeneration] = None
+) -> int:
+    """Build a front-coded index of the distinct lines in ``source``.
+
+    Lines are sorted with the same bounded-memory external sort as the
+    sorted engine. The index is written to a temporary file and moved into
+    place atomically, behind a header recording ``generation``.
+
+    Returns the number of distinct lines written.
+    """
+    if generation is None:
+        generation = read_generation(source)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    offsets = array('Q')
+    with sorted_lines(source, directory, run_bytes) as keys:
+        fd, tmp_path = tempfile.mkstemp(prefix='.index-', dir=directory)
+        count = 0
+        crc = 0
+        pos = HEADER_SIZE
+        with os.fdopen(fd, 'wb', buffering=1024 * 1024) as out:
+            out.write(bytes(HEADER_SIZE))
+            block = bytearray()
+            previous = b""
+            for key in keys:
+                if count % block_size == 0:
+                    if block:
+                        out.write(block)
+                        crc = zlib.crc32(block, crc)
+                        pos += len(block)
+                        block = bytearray()
+                    offsets.append(pos)
+                    _put_varint(block, len(key))
+                    block += key
+                else:
+                    shared = _shared_length(previous, key)
+                    _put_varint(block, shared)
+                    _put_varint(block, len(key) - shared)
+                    block += key[shared:]
+                previous = key
+                count += 1
+            if block:
+                out.write(block)
+                crc = zlib.crc32(block, crc)
+                pos += len(block)
+
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+            tail = offsets.tobytes() + TRAILER.pack(
+                pos, block_size, len(offsets)
+            )
+            out.write(tail)
+            crc = zlib.crc32(tail, crc)
+            out.seek(0)
+            out.write(make_header(KIND_PREFIX, count, generation, crc).pack())
+        os.replace(tmp_path, index_path)
+        return count
+
+
+class PrefixIndex:
+    """Answers exact and prefix queries from a mapped front-coded index."""
+
+    def __init__(self, index_path: str):
+        """Map an index file built by ``build_prefix_index``."""
+        self.index_path = index_path
+        self._file = open(index_path, 'rb')
+        self.header = unpack_header(self._file.read(HEADER_SIZE))
+        if self.header is None or self.header.kind != KIND_PREFIX:
+            self._file.close()
+            raise ValueError(f"Not a prefix index: {index_path}")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._end, self.block_size, blocks = TRAILER.unpack(
+            self._mm[self.size - TRAILER.size:]
+        )
+        self.directory = array('Q')
+        self.directory.frombytes(self._mm[self._end:self._end + blocks * 8])
+        if sys.byteorder != 'little':
+            self.directory.byteswap()
+
+    def __len__(self) -> int:
+        return self.header.count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the index file (the mapped, on-disk representation)."""
+        return self.size
+
+    def _first_key(self, block: int) -> bytes:
+        """Decode only the first key of ``block``."""
+        length, pos = _get_varint(self._mm, self.directory[block])
+        return self._mm[pos:pos + length]
+
+    def _block(self, block: int) -> List[bytes]:
+        """Decode every key of ``block``."""
+        mm = self._mm
+        pos = self.directory[block]
+        end = (
+            self.directory[block + 1]
+            if block + 1 < len(self.directory) else self._end
+        )
+        length, pos = _get_varint(mm, pos)
+        key = mm[pos:pos + length]
+        pos += length
+        keys = [key]
+        while pos < end:
+            shared, pos = _get_varint(mm, pos)
+            length, pos = _get_varint(mm, pos)
+            key = key[:shared] + mm[pos:pos + length]
+            pos += length
+            keys.append(key)
+        return keys
+
+    def _find_block(self, key: bytes) -> int:
+        """Index of the last block whose first key is <= ``key`` (or 0)."""
+        lo, hi = 0, len(self.directory)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._first_key(mid) <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return max(0, lo - 1)
+
+    def __contains__(self, key: bytes) -> bool:
+        """Return True if ``key`` is one of the indexed lines."""
+        if not self.directory:
+            return False
+        keys = self._block(self._find_block(key))
+        i = bisect_left(keys, key)
+        return i < len(keys) and keys[i] == key
+
+    def prefix(
+        self,
+        prefix: bytes,
+        limit: int,
+        after: Optional[bytes] = None
+    ) -> List[bytes]:
+        """Return up to ``limit`` indexed lines starting with ``prefix``.
+
+        Lines come back in sorted order. Passing the last line of a previous
+        result as ``after`` continues from just past it.
+        """
+        if not self.directory or limit <= 0:
+            return []
+        start = prefix if after is None or after < prefix else after
+        block = self._find_block(start)
+        keys = self._block(block)
+        i = bisect_left(keys, start)
+
+        results: List[bytes] = []
+        while len(results) < limit:
+            if i == len(keys):
+                block += 1
+                if block == len(self.directory):
+                    break
+                keys = self._block(block)
+                i = 0
+            key = keys[i]
+            i += 1
+            if after is not None and key <= after:
+                continue
+            if not key.startswith(prefix):
+                break
+            results.append(key)
+        return results
+
+    def close(self) -> None:
+        """Release the mapping and file handle."""
+        self._mm.close()
+        self._file.close()
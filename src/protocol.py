@@ -0,0 +1,285 @@
+"""Wire protocol helpers shared by the server modes.
+
+A request is one line. Plain lines are exact-match queries, as in the
+original protocol. Lines starting with the command prefix (``::`` by
+default) are commands::
+
+    ::EXISTS <query>    exact-match query, for queries that start with
+                        the command prefix themselves
+    ::BATCH <n>         followed by n query lines; answered with one line
+                        of n characters, '1' for a hit and '0' for a miss
+    ::USE <corpus>      send later requests on this connection to the named
+                        corpus; answered with OK
+    ::PREFIX <k> <p>    up to k lines starting with p, in sorted order
+    ::MORE <k> <cursor> the next k lines of an earlier PREFIX query
+    ::SUBSTR <k> <f>    count the lines containing f anywhere, with the
+                        first k of them
+    ::FUZZY <k> <query> the closest line within edit distance k of query
+    ::NORM <query>      like EXISTS, but compares the configured normal
+                        forms (case-folded, Unicode-normalized, ...)
+
+PREFIX and MORE are answered with a line ``<n> <cursor>`` followed by n
+result lines. The cursor is an opaque token for MORE, or ``-`` when there
+are no further matches. SUBSTR is answered with a line ``<count> <n>``
+followed by n lines ``<offset> <line>``, where offset is the byte offset
+of the line in the corpus file. FUZZY is answered with ``<d> <line>`` for
+the closest line, d being its edit distance, or ``STRING NOT FOUND``.
+
+A command verb may name a corpus for that request alone, as in
+``::EXISTS@words <query>`` or ``::BATCH@words <n>``. Requests that name
+no corpus go to the server's default corpus.
+
+Setting an empty prefix disables commands entirely.
+
+BATCH query lines should each end with a newline. A final line without
+one is only taken once the client stops sending: when it shuts down its
+write side, or, in one-shot mode, when it stays idle for the server's
+client timeout. A batch still short of its count then is an error.
+"""
+from typing import Collection, List, NamedTuple, Optional, Tuple
+
+
+# Longest query line accepted in keep-alive mode
+MAX_LINE_BYTES = 64 * 1024
+
+# Marks a line as a command rather than a query
+DEFAULT_PREFIX = '::'
+
+# Most queries a single BATCH command may carry
+MAX_BATCH = 10000
+
+# Most bytes of query lines a single BATCH command may carry
+MAX_BATCH_BYTES = 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised when a client violates the wire protocol."""
+
+
+class LineBuffer:
+    """Splits a byte stream into newline-terminated query lines.
+
+    Data is fed in as it arrives; complete lines come out in order, while a
+    trailing partial line is held until the rest of it is received.
+    """
+
+    def __init__(self, max_line: int = MAX_LINE_BYTES):
+        """Create an empty buffer refusing lines longer than ``max_line``."""
+        self.max_line = max_line
+        self._pending = b""
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Add received bytes and return every line they complete.
+
+        Returned lines do not include the terminating newline.
+        """
+        lines = (self._pending + data).split(b'\n')
+        self._pending = lines.pop()
+        if len(self._pending) > self.max_line:
+            raise ProtocolError(
+                f"query line longer than {self.max_line} bytes"
+            )
+        return lines
+
+    @property
+    def pending(self) -> bytes:
+        """Bytes received after the last complete line."""
+        return self._pending
+
+
+class Request(NamedTuple):
+    """One parsed client request."""
+    verb: str
+    arg: bytes = b""
+    lines: Tuple[bytes, ...] = ()
+    # Corpus name; empty for the server's default corpus
+    corpus: str = ''
+
+
+class RequestReader:
+    """Turns a byte stream into requests, collecting BATCH bodies."""
+
+    def __init__(
+        self,
+        prefix: str = DEFAULT_PREFIX,
+        max_batch: int = MAX_BATCH,
+        max_line: int = MAX_LINE_BYTES,
+        corpora: Optional[Collection[str]] = None,
+        max_batch_bytes: int = MAX_BATCH_BYTES
+    ):
+        """Create a reader; an empty ``prefix`` disables commands.
+
+        ``corpora`` lists the names a USE command may switch to; None
+        accepts any name. ``max_batch_bytes`` caps the total size of a
+        batch's query lines, newlines included.
+        """
+        self.prefix = prefix.encode('utf-8')
+        self.max_batch = max_batch
+        self.max_batch_bytes = max_batch_bytes
+        self.corpora = corpora
+        # Corpus selected by USE for requests that do not name one
+        self.corpus = ''
+        self._lines = LineBuffer(max_line)
+        self._batch: List[bytes] = []
+        self._batch_size = 0
+        self._batch_bytes = 0
+        self._batch_corpus = ''
+        self._in_batch = False
+
+    def feed(self, data: bytes) -> List[Request]:
+        """Add received bytes and return every request they complete."""
+        requests = []
+        for line in self._lines.feed(data):
+            request = self._parse(line)
+            if request is not None:
+                requests.append(request)
+        return requests
+
+    def finish(self) -> List[Request]:
+        """Parse an unterminated final line once the client stops sending.
+
+        Called at end of stream, or when a one-shot client goes idle.
+        """
+        pending = self._lines.pending
+        requests = []
+        # Inside a batch even a blank final line is a query
+        if (pending if self._in_batch else pending.strip()):
+            request = self._parse(pending)
+            if request is not None:
+                requests.append(request)
+        if self._in_batch:
+            raise ProtocolError(
+                f"request ended after {len(self._batch)} of "
+                f"{self._batch_size} batch queries"
+            )
+        return requests
+
+    @property
+    def in_batch(self) -> bool:
+        """True while the lines of a BATCH are still being received."""
+        return self._in_batch
+
+    def _parse(self, line: bytes):
+        """Turn one line into a request, or None while a batch is open."""
+        if self._in_batch:
+            self._batch_bytes += len(line) + 1
+            if self._batch_bytes > self.max_batch_bytes:
+                raise ProtocolError(
+                    f"batch longer than {self.max_batch_bytes} bytes"
+                )
+            self._batch.append(line)
+            return self._close_batch()
+
+        if not self.prefix or not line.startswith(self.prefix):
+            return Request('EXISTS', line, corpus=self.corpus)
+
+        parts = line[len(self.prefix):].split(None, 1)
+        verb = parts[0].decode('utf-8', errors='ignore') if parts else ''
+        verb, _, corpus = verb.partition('@')
+        verb = verb.upper()
+        corpus = corpus or self.corpus
+        arg = parts[1] if len(parts) > 1 else b""
+
+        if verb == 'USE':
+            name = arg.strip().decode('utf-8', errors='ignore')
+            if name and (self.corpora is None or name in self.corpora):
+                self.corpus = name
+            return Request(verb, arg.strip(), corpus=name)
+
+        if verb != 'BATCH':
+            return Request(verb, arg, corpus=corpus)
+
+        try:
+            size = int(arg)
+        except ValueError:
+            raise ProtocolError("BATCH needs a query count")
+        if size < 0 or size > self.max_batch:
+            raise ProtocolError(
+                f"batch size must be between 0 and {self.max_batch}"
+            )
+        self._in_batch = True
+        self._batch = []
+        self._batch_size = size
+        self._batch_bytes = 0
+        self._batch_corpus = corpus
+        return self._close_batch()
+
+    def _close_batch(self):
+        """Return the batch request once all of its lines have arrived."""
+        if len(self._batch) < self._batch_size:
+            return None
+        self._in_batch = False
+        request = Request('BATCH', str(self._batch_size).encode(),
+                          tuple(self._batch), self._batch_corpus)
+        self._batch = []
+        return request
+
+
+def parse_limit(arg: bytes, max_limit: int) -> Tuple[int, bytes]:
+    """Split ``<k> <rest>`` into a result limit (capped) and the rest."""
+    count, _, rest = arg.partition(b' ')
+    try:
+        limit = int(count)
+    except ValueError:
+        raise ProtocolError("expected a result limit")
+    if limit < 1:
+        raise ProtocolError("result limit must be at least 1")
+    return min(limit, max_limit), rest.rstrip(b'\r')
+
+
+def parse_distance(arg: bytes) -> Tuple[int, bytes]:
+    """Split ``<k> <query>`` into an edit distance and the query."""
+    count, _, rest = arg.partition(b' ')
+    try:
+        distance = int(count)
+    except ValueError:
+        raise ProtocolError("expected an edit distance")
+    if distance < 0:
+        raise ProtocolError("edit distance must not be negative")
+    return distance, rest.rstrip(b'\r')
+
+
+def encode_cursor(prefix: bytes, after: bytes) -> str:
+    """Token that lets MORE resume a prefix query after ``after``."""
+    # Neither part can contain a newline, so it separates them
+    return (prefix + b'\n' + after).hex()
+
+
+def decode_cursor(token: bytes) -> Tuple[bytes, bytes]:
+    """Return the prefix and last line encoded in a MORE cursor."""
+    try:
+        prefix, sep, after = bytes.fromhex(token.strip().decode()).partition(
+            b'\n'
+        )
+    except ValueError:
+        raise ProtocolError("invalid cursor")
+    if not sep:
+        raise ProtocolError("invalid cursor")
+    return prefix, after
+
+
+def format_prefix(lines: List[bytes], cursor: Optional[str]) -> bytes:
+    """Encode a page of prefix results with its continuation cursor."""
+    head = f"{len(lines)} {cursor or '-'}\n".encode('utf-8')
+    return head + b"".join(line + b'\n' for line in lines)
+
+
+def format_substring(count: int, matches: List[Tuple[int, bytes]]) -> bytes:
+    """Encode a substring match count and the first (offset, line) pairs."""
+    head = f"{count} {len(matches)}\n".encode('utf-8')
+    return head + b"".join(
+        b'%d %s\n' % (offset, line) for offset, line in matches
+    )
+
+
+def format_fuzzy(match: Optional[Tuple[int, bytes]]) -> bytes:
+    """Encode the closest fuzzy match and its distance, if any."""
+    if match is None:
+        return b"STRING NOT FOUND\n"
+    distance, line = match
+    return b'%d %s\n' % (distance, line)
+
+
+def format_batch(results: List[bool]) -> bytes:
+    """Encode batch results as one line of '1' (hit) and '0' (miss)."""
+    return bytes(0x31 if found else 0x30 for found in results) + b'\n'
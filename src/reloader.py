@@ -0,0 +1,161 @@
+"""Zero-downtime corpus reloads.
+
+A reload builds a complete new searcher for a corpus in the background
+while the current one keeps answering, then replaces the entry in the
+shared ``searchers`` dict in a single assignment. Request handlers look
+their searcher up once per request, so queries already running finish on
+the old generation and later ones see the new one. The old searcher is
+closed, releasing its mappings and file handles, only after a grace period
+long enough for those queries to finish.
+"""
+import resource
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, MutableMapping, Optional
+
+from corpora import CorpusConfig, open_searcher
+from searcher import FileSearcher
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size since the last ``reset_peak_rss()``."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Without procfs only the lifetime peak is known; ru_maxrss is in
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_rss() -> None:
+    """Restart peak RSS tracking from the current RSS (Linux 4.0+)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class Reloader:
+    """Rebuilds corpora on request and swaps them in atomically."""
+
+    def __init__(
+        self,
+        searchers: MutableMapping[str, FileSearcher],
+        corpora: Dict[str, CorpusConfig],
+        opener: Callable[[CorpusConfig], FileSearcher] = open_searcher,
+        close_delay: float = 30.0
+    ):
+        """Reload entries of ``searchers`` from their ``corpora`` settings.
+
+        Replaced searchers are closed ``close_delay`` seconds after the
+        swap (0 closes them at once).
+        """
+        self.searchers = searchers
+        self.corpora = corpora
+        self.opener = opener
+        self.close_delay = close_delay
+        self.reloads = 0
+        self.failures = 0
+        # Duration of the most recent reload and peak RSS while it ran
+        self.last_seconds = 0.0
+        self.last_peak_rss = 0
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+
+    def reload(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Rebuild the named corpora (default: all) and swap them in.
+
+        Reloads run one at a time. A corpus that fails to load keeps its
+        current searcher. Returns the build time of each corpus reloaded.
+        """
+        names = list(self.corpora if names is None else names)
+        unknown = [name for name in names if name not in self.corpora]
+        if unknown:
+            raise ValueError(f"unknown corpus: {', '.join(unknown)}")
+
+        timings: Dict[str, float] = {}
+        with self._lock:
+            # Measure this reload's peak, not the process lifetime's
+            reset_peak_rss()
+            start = time.perf_counter()
+            for name in names:
+                corpus_start = time.perf_counter()
+                try:
+                    searcher = self.opener(self.corpora[name])
+                except Exception as e:
+                    self.failures += 1
+                    print(f"ERROR: reload of corpus {name} failed: {e}")
+                    continue
+                # One assignment: requests see either the old or new searcher
+                old = self.searchers.get(name)
+                self.searchers[name] = searcher
+                if old is not None:
+                    self._retire(old)
+                timings[name] = time.perf_counter() - corpus_start
+                self.reloads += 1
+            self.last_seconds = time.perf_counter() - start
+            self.last_peak_rss = peak_rss_bytes()
+        for name, seconds in timings.items():
+            print(f"Reloaded corpus {name} in {seconds:.3f}s "
+                  f"(peak RSS {self.last_peak_rss / 1024 / 1024:.1f} MB)")
+        return timings
+
+    def _retire(self, searcher: FileSearcher) -> None:
+        """Close a swapped-out searcher once its queries have finished."""
+        if self.close_delay <= 0:
+            searcher.close()
+            return
+        timer = threading.Timer(self.close_delay, searcher.close)
+        timer.daemon = True
+        timer.start()
+
+    def request(self) -> None:
+        """Reload every corpus on a background thread.
+
+        Safe to call from a signal handler. Requests that arrive while a
+        reload is running are folded into one further reload.
+        """
+        if self._pending.is_set():
+            return
+        self._pending.set()
+        threading.Thread(
+            target=self._run_pending, name="reload", daemon=True
+        ).start()
+
+    def _run_pending(self) -> None:
+        """Run one reload for every request made before it starts."""
+        with self._lock:
+            self._pending.clear()
+        self.reload()
+
+    def stale(self) -> List[str]:
+        """Names of cached corpora whose file changed since it was loaded."""
+        names: List[str] = []
+        for name, searcher in list(self.searchers.items()):
+            if searcher.reread_on_query:
+                continue
+            try:
+                if not searcher.is_current():
+                    names.append(name)
+            except OSError:
+                # Mid-replacement; look again on the next poll
+                continue
+        return names
+
+    def watch(self, interval: float) -> threading.Thread:
+        """Poll the corpus files every ``interval`` seconds and reload changes."""
+        def run():
+            while True:
+                time.sleep(interval)
+                names = self.stale()
+                if names:
+                    self.reload(names)
+
+        thread = threading.Thread(target=run, name="reload-watch", daemon=True)
+        thread.start()
+        return thread
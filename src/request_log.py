@@ -0,0 +1,145 @@
+"""Asynchronous, sampled request logging as JSON lines."""
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from typing import IO, Optional, Tuple
+
+
+class RequestLogger:
+    """Queue-backed logger that keeps formatting and I/O off the hot path.
+
+    Request handlers only build a small dict and enqueue it; a background
+    thread formats queued records as JSON lines and writes them in batches.
+    The queue is bounded, so when the output falls behind records are
+    dropped (and counted) instead of stalling the server.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        sample_rate: float = 1.0,
+        slow_ms: float = 0.0,
+        queue_size: int = 10000,
+        batch_size: int = 512
+    ):
+        """Create a logger; call ``start()`` to begin writing records.
+
+        ``sample_rate`` is the fraction of ordinary requests logged. Errors
+        and requests slower than ``slow_ms`` (when set) are always logged.
+        """
+        self.stream = stream if stream is not None else sys.stdout
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.batch_size = batch_size
+        # Records are small and queries are truncated, so this bounds memory
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the writer thread (once per process, after any fork)."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="request-log", daemon=True
+            )
+            self._thread.start()
+
+    def wanted(self, elapsed_ms: float) -> bool:
+        """Decide whether an ordinary request of this duration is logged."""
+        if self.slow_ms and elapsed_ms >= self.slow_ms:
+            return True
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def log(self, record: dict) -> None:
+        """Enqueue ``record`` without blocking; drop it if the queue is full."""
+        record['t'] = time.time()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def request(
+        self,
+        addr: Tuple[str, int],
+        query: str,
+        elapsed_ms: float,
+        result: str,
+        **fields
+    ) -> None:
+        """Log one answered request, subject to sampling."""
+        if not self.wanted(elapsed_ms):
+            return
+        record = {
+            'event': 'query',
+            'ip': addr[0],
+            'port': addr[1],
+            'query': query[:50],
+            'ms': round(elapsed_ms, 3),
+            'result': result,
+        }
+        record.update(fields)
+        self.log(record)
+
+    def error(
+        self,
+        addr: Optional[Tuple[str, int]],
+        message: str,
+        event: str = 'error',
+        **fields
+    ) -> None:
+        """Log a client error or rejection; these are never sampled out."""
+        record = {'event': event, 'error': message}
+        if addr:
+            record['ip'] = addr[0]
+            record['port'] = addr[1]
+        record.update(fields)
+        self.log(record)
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _format(self, record: dict) -> str:
+        """Render one record as a JSON line with a readable timestamp."""
+        t = record.pop('t')
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(t))
+        return json.dumps(
+            {'ts': f"{ts}.{int(t % 1 * 1000):03d}", **record},
+            separators=(',', ':')
+        ) + '\n'
+
+    def _run(self) -> None:
+        """Writer loop: drain the queue in batches and write them out."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = [self._format(record) for record in batch]
+            if self.dropped != self._reported_dropped:
+                dropped = self.dropped
+                lines.append(self._format({
+                    't': time.time(),
+                    'event': 'dropped',
+                    'count': dropped - self._reported_dropped,
+                }))
+                self._reported_dropped = dropped
+
+            try:
+                self.stream.write(''.join(lines))
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,94 @@
+"""Bounded LRU cache of query results, tied to a file generation."""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+# Rough per-entry cost beyond the key itself: the ordered dict's slot and
+# link node plus the cached value
+ENTRY_OVERHEAD = 120
+
+
+class ResultCache:
+    """LRU cache of query results that is valid for one file generation.
+
+    Every lookup passes the generation the caller is reading. The first
+    lookup with a different generation empties the cache, so a result is
+    never served once the corpus has changed. The cache can be bounded by
+    entries, by approximate bytes, or both.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0):
+        """Create a cache; a bound of 0 means that bound is not applied."""
+        if max_entries <= 0 and max_bytes <= 0:
+            raise ValueError("ResultCache needs max_entries or max_bytes")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = None
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        """Number of cached results."""
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _check_generation(self, generation) -> None:
+        """Drop every entry if ``generation`` is not the cached one."""
+        if generation != self.generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.nbytes = 0
+            self.generation = generation
+
+    def get(self, key: Hashable, generation) -> Optional[bool]:
+        """Return the cached result for ``key``, or None on a miss."""
+        with self._lock:
+            self._check_generation(generation)
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value[0]
+
+    def put(self, key: Hashable, generation, result: bool) -> None:
+        """Cache ``result`` for ``key`` and evict least recently used.
+
+        A result computed against an older generation than the cache has
+        since seen is discarded.
+        """
+        size = sys.getsizeof(key) + ENTRY_OVERHEAD
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (result, size)
+            self.nbytes += size
+
+            entries = self._entries
+            while (
+                (self.max_entries and len(entries) > self.max_entries)
+                or (self.max_bytes and self.nbytes > self.max_bytes)
+            ):
+                _, (_, evicted) = entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
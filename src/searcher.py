@@ -1,38 +1,482 @@
 """File searcher module."""
 import mmap
 import os
-from typing import Optional, Set
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from fingerprint_index import FINGERPRINT_INDEX_SUFFIX, FingerprintIndex
+from fuzzy_index import DEFAULT_PREFIX_LENGTH, FuzzyIndex
+from generation import CHECK_WINDOW, FileGeneration, generation_of, read_generation
+from index_format import KIND_PREFIX, KIND_SORTED, read_header
+from normalize import NormalizedIndex, Normalizer
+from prefix_index import PREFIX_INDEX_SUFFIX, PrefixIndex, build_prefix_index
+from result_cache import ResultCache
+from sorted_index import SORTED_INDEX_SUFFIX, SortedIndex, build_sorted_index
+from trigram_index import DEFAULT_BUDGET, TrigramIndex
+
+
+class Engine(NamedTuple):
+    """A lookup structure selectable with the ``engine`` option."""
+    name: str
+    # Sets the searcher's ``index`` and ``generation`` from its file
+    load: Callable[['FileSearcher'], None]
+    # Default index file suffix; empty for engines without an index file
+    index_suffix: str = ''
+
+
+# Registered engines by name, in registration order
+ENGINES: Dict[str, Engine] = {}
+
+
+def register_engine(
+    name: str,
+    load: Callable[['FileSearcher'], None],
+    index_suffix: str = ''
+) -> None:
+    """Make ``load`` selectable as ``engine = name``.
+
+    ``load(searcher)`` must set ``searcher.index`` to an object answering
+    ``key in index`` for encoded lines (and optionally
+    ``contains_many(keys)``), and ``searcher.generation`` to the file
+    generation it was built from. Registering an existing name replaces it.
+    """
+    ENGINES[name] = Engine(name, load, index_suffix)
 
 
 class FileSearcher:
     """Handles file searching with caching."""
-    
-    def __init__(self, filepath: str, reread_on_query: bool = False):
-        """Initialize searcher."""
+
+    def __init__(
+        self,
+        filepath: str,
+        reread_on_query: bool = False,
+        engine: str = 'set',
+        index_path: Optional[str] = None,
+        persist_index: bool = True,
+        build_workers: int = 1,
+        cache_entries: int = 0,
+        cache_bytes: int = 0,
+        substring: bool = False,
+        substring_budget: int = DEFAULT_BUDGET,
+        fuzzy_distance: int = 0,
+        fuzzy_prefix_length: int = DEFAULT_PREFIX_LENGTH,
+        normalize: Optional[str] = None
+    ):
+        """Initialize searcher.
+
+        ``engine`` selects the lookup structure: ``set`` keeps every line
+        in memory, ``sorted`` binary-searches a sorted index file that is
+        built next to the corpus (or at ``index_path``) and memory-mapped,
+        ``fingerprint`` keeps only a 64-bit hash and file offset per
+        line in memory, and ``prefix`` maps a front-coded sorted index
+        that also answers prefix (autocomplete) queries. Further engines
+        can be added with ``register_engine()``.
+
+        The ``sorted``, ``fingerprint`` and ``prefix`` engines reuse an
+        index file whose header matches the corpus on disk instead of
+        rescanning it.
+        A rebuilt fingerprint index is written back unless
+        ``persist_index`` is False. ``build_workers`` processes share the
+        fingerprinting work; 0 means one per CPU.
+
+        ``cache_entries`` and ``cache_bytes`` bound an LRU cache of query
+        results in front of the index; it is invalidated whenever the file
+        generation changes. Both 0 disables it.
+
+        ``substring`` builds a trigram index at load time, with any engine,
+        for queries that match a fragment anywhere in a line. It holds at
+        most about ``substring_budget`` bytes; fragments it cannot narrow
+        down are answered by scanning the file.
+
+        ``fuzzy_distance`` above 0 builds a symmetric-delete index at load
+        time for finding the closest line within that many edits of a
+        query, generated from the first ``fuzzy_prefix_length`` characters
+        of each line.
+
+        ``normalize`` lists normalization steps (such as ``casefold, nfkc,
+        whitespace``) for ``exists_normalized()``; the normal forms of the
+        lines it changes are indexed at load time.
+        """
         if not os.path.isfile(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
-        
+        if engine not in ENGINES:
+            raise ValueError(
+                f"Unknown engine: {engine} (expected one of {', '.join(ENGINES)})"
+            )
+
         self.filepath = filepath
         self.reread_on_query = reread_on_query
+        self.engine = engine
+        self.index_path = index_path or filepath + ENGINES[engine].index_suffix
+        self.persist_index = persist_index
+        self.build_workers = build_workers or os.cpu_count() or 1
+        # Wall time of the most recent load or rebuild
+        self.load_seconds = 0.0
         self.lines_set: Optional[Set[bytes]] = None
-        
+        self.sorted_index: Optional[SortedIndex] = None
+        self.fingerprint_index: Optional[FingerprintIndex] = None
+        self.prefix_index: Optional[PrefixIndex] = None
+        # Whichever structure the engine answers membership queries from
+        self.index = None
+        self.generation: Optional[FileGeneration] = None
+        self.cache: Optional[ResultCache] = None
+        if cache_entries > 0 or cache_bytes > 0:
+            self.cache = ResultCache(cache_entries, cache_bytes)
+        self.substring_enabled = substring
+        self.substring_budget = substring_budget
+        self.trigram_index: Optional[TrigramIndex] = None
+        self.fuzzy_distance = fuzzy_distance
+        self.fuzzy_prefix_length = fuzzy_prefix_length
+        self.fuzzy_index: Optional[FuzzyIndex] = None
+        self.normalizer = Normalizer.from_spec(normalize)
+        self.normalized_index: Optional[NormalizedIndex] = None
+        # Generation the substring, fuzzy and normalized indexes were
+        # built from
+        self._extras_generation: Optional[FileGeneration] = None
+        self._lock = threading.Lock()
+        # Offset and key of an unterminated last line, which an append
+        # may still extend
+        self._partial_start = 0
+        self._partial_key: Optional[bytes] = None
+
         if not reread_on_query:
             self._load()
-    
+
     def _load(self) -> None:
         """Load file into memory for fast search."""
+        start = time.perf_counter()
+        ENGINES[self.engine].load(self)
+        self._load_extras()
+        self.load_seconds = time.perf_counter() - start
+
+    def _load_set(self) -> None:
+        """Read every line into a set."""
         with open(self.filepath, 'rb') as f:
+            st = os.fstat(f.fileno())
+            lines_set: Set[bytes] = set()
+            if st.st_size == 0:
+                self._partial_key = None
+                self._partial_start = 0
+                self.lines_set = self.index = lines_set
+                self.generation = generation_of(st, b"")
+                return
             mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-            self.lines_set = set()
-            for line in iter(mm.readline, b""):
-                self.lines_set.add(line.rstrip(b'\r\n'))
-            mm.close()
-    
+            try:
+                self._ingest(mm, 0, lines_set)
+                self.lines_set = self.index = lines_set
+                self.generation = generation_of(st, mm)
+            finally:
+                mm.close()
+
+    def _load_sorted(self) -> None:
+        """Open the sorted index, rebuilding it if it is stale."""
+        # Read the generation first so a write during the build is noticed
+        generation = read_generation(self.filepath)
+        header = read_header(self.index_path)
+        if header is None or not header.matches(KIND_SORTED, generation):
+            build_sorted_index(
+                self.filepath, self.index_path, generation=generation
+            )
+
+        # The previous index is left to the garbage collector so lookups
+        # still running against it are not cut off
+        self.sorted_index = self.index = SortedIndex(self.index_path)
+        self.generation = generation
+
+    def _load_prefix(self) -> None:
+        """Open the front-coded index, rebuilding it if it is stale."""
+        generation = read_generation(self.filepath)
+        header = read_header(self.index_path)
+        if header is None or not header.matches(KIND_PREFIX, generation):
+            build_prefix_index(
+                self.filepath, self.index_path, generation=generation
+            )
+
+        self.prefix_index = self.index = PrefixIndex(self.index_path)
+        self.generation = generation
+
+    def _load_extras(self) -> None:
+        """Build the enabled substring, fuzzy and normalized indexes."""
+        generation = self.generation
+        if self.substring_enabled:
+            self.trigram_index = TrigramIndex(
+                self.filepath, self.substring_budget
+            )
+        if self.fuzzy_distance:
+            self.fuzzy_index = FuzzyIndex(
+                self.filepath, self.fuzzy_distance, self.fuzzy_prefix_length
+            )
+        if self.normalizer is not None:
+            self.normalized_index = NormalizedIndex(
+                self.filepath, self.normalizer
+            )
+        self._extras_generation = generation
+
+    def _refresh_extras(self) -> None:
+        """Bring the secondary indexes up to date with the file."""
+        if self.reread_on_query:
+            self.refresh()
+        if self._extras_generation != self.generation:
+            # An append read by refresh() only updates the engine's index
+            with self._lock:
+                if self._extras_generation != self.generation:
+                    self._load_extras()
+
+    def _load_fingerprint(self) -> None:
+        """Load the saved fingerprint index, or fingerprint every line."""
+        generation = read_generation(self.filepath)
+        index = FingerprintIndex.load(
+            self.filepath, self.index_path, generation
+        )
+        if index is None:
+            index = FingerprintIndex(
+                self.filepath, workers=self.build_workers
+            )
+            if self.persist_index:
+                try:
+                    index.save(self.index_path, generation)
+                except OSError as e:
+                    print(f"WARNING: could not save index {self.index_path}: {e}")
+        self.fingerprint_index = self.index = index
+        self.generation = generation
+
+    def _ingest(self, mm: mmap.mmap, start: int, lines_set: Set[bytes]) -> None:
+        """Add every line from ``start`` to the end of ``mm`` to the set."""
+        mm.seek(start)
+        self._partial_key = None
+        line_start = start
+        for line in iter(mm.readline, b""):
+            key = line.rstrip(b'\r\n')
+            if not line.endswith(b'\n') and key not in lines_set:
+                # Only remember keys we introduced, so dropping it later
+                # cannot remove a complete line with the same contents
+                self._partial_key = key
+            lines_set.add(key)
+            self._partial_start = line_start
+            line_start += len(line)
+        if mm.size() and mm[mm.size() - 1:] == b'\n':
+            self._partial_start = mm.size()
+
+    def _is_current(self, st: os.stat_result) -> bool:
+        """Return True if the loaded generation still matches ``st``."""
+        gen = self.generation
+        return (
+            gen is not None
+            and gen.inode == st.st_ino
+            and gen.size == st.st_size
+            and gen.mtime_ns == st.st_mtime_ns
+        )
+
+    def is_current(self) -> bool:
+        """Return True if the file on disk is the one last loaded."""
+        return self._is_current(os.stat(self.filepath))
+
+    def refresh(self) -> None:
+        """Bring the in-memory lines up to date with the file on disk.
+
+        Does nothing when the file is unchanged, reads only the new tail
+        when the file was appended to, and rebuilds everything otherwise.
+        """
+        if self._is_current(os.stat(self.filepath)):
+            return
+
+        with self._lock:
+            with open(self.filepath, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if self._is_current(st):
+                    return
+
+                gen = self.generation
+                if (
+                    gen is None
+                    or self.lines_set is None
+                    or st.st_ino != gen.inode
+                    or st.st_size <= gen.size
+                    or gen.size == 0
+                ):
+                    self._load()
+                    return
+
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    head = mm[:min(CHECK_WINDOW, gen.size)]
+                    tail = mm[max(0, gen.size - CHECK_WINDOW):gen.size]
+                    if (
+                        zlib.crc32(head) != gen.head_crc
+                        or zlib.crc32(tail) != gen.tail_crc
+                    ):
+                        self._load()
+                        return
+
+                    if self._partial_key is not None:
+                        self.lines_set.discard(self._partial_key)
+                    self._ingest(mm, self._partial_start, self.lines_set)
+                    self.generation = generation_of(st, mm)
+                finally:
+                    mm.close()
+
     def exists(self, query: str) -> bool:
         """Check if exact string exists in file."""
         q_bytes = query.encode('utf-8')
-        
+
         if self.reread_on_query:
-            self._load()
-        
-        return q_bytes in self.lines_set
\ No newline at end of file
+            self.refresh()
+
+        cache = self.cache
+        if cache is None:
+            return q_bytes in self.index
+
+        generation = self.generation
+        found = cache.get(q_bytes, generation)
+        if found is None:
+            found = q_bytes in self.index
+            cache.put(q_bytes, generation, found)
+        return found
+
+    def exists_normalized(self, query: str) -> bool:
+        """Check if any line has the same normal form as ``query``.
+
+        Lines already in normal form are looked up in the engine's index;
+        only lines that normalization changes are held separately. Results
+        are not cached. Needs ``normalize`` set.
+        """
+        if self.normalizer is None:
+            raise ValueError("normalized queries need normalize to be set")
+
+        self._refresh_extras()
+        key = self.normalizer.key(query)
+        return key in self.normalized_index or key in self.index
+
+    def exists_many(self, queries: Sequence[str]) -> List[bool]:
+        """Check a batch of exact strings, returning one result per query.
+
+        The file is checked for changes once per batch, and engines with a
+        batched lookup resolve all queries in one pass.
+        """
+        keys = [query.encode('utf-8') for query in queries]
+
+        if self.reread_on_query:
+            self.refresh()
+
+        cache = self.cache
+        if cache is None:
+            return self._contains_many(keys)
+
+        # Only cache misses go to the index
+        generation = self.generation
+        results = [cache.get(key, generation) for key in keys]
+        missing = [i for i, found in enumerate(results) if found is None]
+        if missing:
+            found = self._contains_many([keys[i] for i in missing])
+            for i, hit in zip(missing, found):
+                results[i] = hit
+                cache.put(keys[i], generation, hit)
+        return results
+
+    def _contains_many(self, keys: List[bytes]) -> List[bool]:
+        """Look up encoded queries in the index, batched if it supports it."""
+        index = self.index
+        if hasattr(index, 'contains_many'):
+            return index.contains_many(keys)
+        return [key in index for key in keys]
+
+    def prefix(
+        self,
+        prefix: str,
+        limit: int,
+        after: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """Return up to ``limit`` lines starting with ``prefix``, in order.
+
+        Also returns a cursor to pass back as ``after`` for the next page,
+        or None when there are no more matches. Only the ``prefix`` engine
+        supports this. Lines are decoded so that they encode back to the
+        exact bytes in the file.
+        """
+        if self.engine != 'prefix':
+            raise ValueError("prefix queries need engine = prefix")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+
+        if self.reread_on_query:
+            self.refresh()
+
+        after_key = (
+            after.encode('utf-8', 'surrogateescape')
+            if after is not None else None
+        )
+        # One extra result tells whether another page exists
+        keys = self.index.prefix(
+            prefix.encode('utf-8', 'surrogateescape'), limit + 1, after_key
+        )
+        lines = [key.decode('utf-8', 'surrogateescape') for key in keys]
+        if len(lines) > limit:
+            return lines[:limit], lines[limit - 1]
+        return lines, None
+
+    def substring(self, fragment: str, limit: int) -> Tuple[int, List[int]]:
+        """Count the lines containing ``fragment`` anywhere.
+
+        Returns the number of matching lines and the byte offsets of the
+        first ``limit`` of them, in file order. Needs ``substring`` enabled.
+        """
+        if not self.substring_enabled:
+            raise ValueError("substring queries need substring = true")
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+
+        self._refresh_extras()
+        return self.trigram_index.search(
+            fragment.encode('utf-8', 'surrogateescape'), limit
+        )
+
+    def line_at(self, offset: int) -> str:
+        """Return the line at a byte offset from ``substring()``."""
+        if not self.substring_enabled:
+            raise ValueError("substring queries need substring = true")
+        return self.trigram_index.line_at(offset).decode(
+            'utf-8', 'surrogateescape'
+        )
+
+    def nearest(self, query: str, distance: int) -> Optional[Tuple[int, str]]:
+        """Return (distance, line) for the closest line within ``distance``.
+
+        ``distance`` is capped at ``fuzzy_distance``. Returns None when no
+        line is close enough. Needs ``fuzzy_distance`` above 0.
+        """
+        if not self.fuzzy_distance:
+            raise ValueError("fuzzy queries need fuzzy_distance above 0")
+        if distance < 0:
+            raise ValueError("distance must not be negative")
+
+        self._refresh_extras()
+        return self.fuzzy_index.nearest(query, distance)
+
+    def close(self) -> None:
+        """Release any mapped index files."""
+        if self.fuzzy_index is not None:
+            self.fuzzy_index.close()
+        if self.trigram_index is not None:
+            self.trigram_index.close()
+        if self.sorted_index is not None:
+            self.sorted_index.close()
+        if self.fingerprint_index is not None:
+            self.fingerprint_index.close()
+        if self.prefix_index is not None:
+            self.prefix_index.close()
+        index = self.index
+        if hasattr(index, 'close') and index not in (
+            self.sorted_index, self.fingerprint_index, self.prefix_index
+        ):
+            # Index of an engine registered elsewhere
+            index.close()
+
+
+register_engine('set', FileSearcher._load_set)
+register_engine('sorted', FileSearcher._load_sorted, SORTED_INDEX_SUFFIX)
+register_engine(
+    'fingerprint', FileSearcher._load_fingerprint, FINGERPRINT_INDEX_SUFFIX
+)
+register_engine('prefix', FileSearcher._load_prefix, PREFIX_INDEX_SUFFIX)
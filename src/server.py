@@ -1,36 +1,93 @@
 """TCP String Search Server."""
+import asyncio
+import gc
 import socket
-import threading
 import time
 import configparser
 import os
+import signal
 import sys
 import ssl
-from typing import Tuple
-from searcher import FileSearcher
+from typing import List, Optional, Tuple
 
+# setup.py installs these modules as the ``src`` package for the console
+# script; they import each other by their flat names
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Load configuration
+from protocol import (
+    DEFAULT_PREFIX, MAX_BATCH, MAX_BATCH_BYTES, ProtocolError, Request,
+    RequestReader, decode_cursor, encode_cursor, format_batch, format_fuzzy,
+    format_prefix, format_substring, parse_distance, parse_limit
+)
+from corpora import load_corpus_configs, open_searcher
+from metrics import Metrics, serve_metrics
+from reloader import Reloader
+from request_log import RequestLogger
+from supervisor import Supervisor
+from tls import HANDSHAKE_TIMEOUT, SESSION_TICKETS, make_server_context
+from worker_pool import WorkerPool
+
+
+# Load configuration (path may be given as the first argument)
+CONFIG_PATH = sys.argv[1] if len(sys.argv) > 1 else 'config.ini'
 config = configparser.ConfigParser()
-if not config.read('config.ini'):
-    print("ERROR: config.ini not found or invalid")
+if not config.read(CONFIG_PATH):
+    print(f"ERROR: {CONFIG_PATH} not found or invalid")
     sys.exit(1)
 
 try:
     cfg = config['SERVER']
     HOST = cfg.get('host', '0.0.0.0')
     PORT = cfg.getint('port', 44445)
-    FILEPATH = os.path.expanduser(cfg.get('linuxpath'))
-    REREAD = cfg.getboolean('REREAD_ON_QUERY', fallback=False)
+    # [SERVER] linuxpath plus any [CORPUS:name] sections
+    CORPORA, DEFAULT_CORPUS = load_corpus_configs(config)
     SSL_ENABLED = cfg.getboolean('SSL_ENABLED', fallback=False)
     CERT_PATH = cfg.get('cert_path', 'cert.pem')
     KEY_PATH = cfg.get('key_path', 'key.pem')
+    TLS_HANDSHAKE_TIMEOUT = cfg.getfloat(
+        'tls_handshake_timeout', fallback=HANDSHAKE_TIMEOUT
+    )
+    TLS_MIN_VERSION = cfg.get('tls_min_version', 'TLSv1_2')
+    TLS_CIPHERS = cfg.get('tls_ciphers', fallback=None)
+    TLS_SESSION_TICKETS = cfg.getint(
+        'tls_session_tickets', fallback=SESSION_TICKETS
+    )
+    SERVER_MODE = cfg.get('server_mode', 'threaded')
+    if SERVER_MODE not in ('threaded', 'asyncio'):
+        raise ValueError(f"unknown server_mode: {SERVER_MODE}")
+    PROCESSES = cfg.getint('processes', fallback=1) or os.cpu_count() or 1
+    if PROCESSES > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        raise ValueError("processes > 1 needs SO_REUSEPORT")
+    MAX_WORKERS = cfg.getint('max_workers', fallback=64)
+    ACCEPT_QUEUE = cfg.getint('accept_queue', fallback=256)
+    LISTEN_BACKLOG = cfg.getint('listen_backlog', fallback=130)
+    CLIENT_TIMEOUT = cfg.getfloat('client_timeout', fallback=5.0)
+    PROTOCOL = cfg.get('protocol', 'oneshot')
+    if PROTOCOL not in ('oneshot', 'keepalive'):
+        raise ValueError(f"unknown protocol: {PROTOCOL}")
+    COMMAND_PREFIX = cfg.get('command_prefix', DEFAULT_PREFIX)
+    MAX_BATCH_SIZE = cfg.getint('max_batch', fallback=MAX_BATCH)
+    MAX_BATCH_TOTAL = cfg.getint('max_batch_bytes', fallback=MAX_BATCH_BYTES)
+    MAX_PREFIX_RESULTS = cfg.getint('max_prefix_results', fallback=1000)
+    MAX_SUBSTRING_RESULTS = cfg.getint('max_substring_results', fallback=100)
+    LOG_SAMPLE_RATE = cfg.getfloat('log_sample_rate', fallback=1.0)
+    LOG_SLOW_MS = cfg.getfloat('log_slow_ms', fallback=0.0)
+    LOG_QUEUE = cfg.getint('log_queue', fallback=10000)
+    METRICS_HOST = cfg.get('metrics_host', '127.0.0.1')
+    METRICS_PORT = cfg.getint('metrics_port', fallback=0)
+    RELOAD_WATCH = cfg.getfloat('reload_watch', fallback=0.0)
+    RELOAD_CLOSE_DELAY = cfg.getfloat('reload_close_delay', fallback=30.0)
+    ADMIN_COMMANDS = cfg.getboolean('admin_commands', fallback=False)
 except Exception as e:
     print(f"Config error: {e}")
     sys.exit(1)
 
-# Initialize searcher
-searcher = FileSearcher(FILEPATH, REREAD)
+# Initialize one searcher per corpus; each reloads under its own lock, so
+# a rebuild of one corpus does not block lookups in the others
+searchers = {name: open_searcher(corpus) for name, corpus in CORPORA.items()}
+
+# Rebuilds corpora on SIGHUP, file change or ::RELOAD and swaps them in
+reloader = Reloader(searchers, CORPORA, close_delay=RELOAD_CLOSE_DELAY)
 
 # Setup SSL if enabled
 ssl_context = None
@@ -38,79 +95,681 @@ if SSL_ENABLED:
     if not os.path.exists(CERT_PATH) or not os.path.exists(KEY_PATH):
         print("SSL enabled but certificate or key not found")
         sys.exit(1)
-    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    ssl_context.load_cert_chain(certfile=CERT_PATH, keyfile=KEY_PATH)
+    try:
+        ssl_context = make_server_context(
+            CERT_PATH, KEY_PATH, TLS_MIN_VERSION, TLS_CIPHERS,
+            TLS_SESSION_TICKETS
+        )
+    except (ValueError, ssl.SSLError) as e:
+        print(f"SSL config error: {e}")
+        sys.exit(1)
+
+# Asyncio mode upgrades each stream to TLS itself so it can time the
+# handshake (StreamWriter.start_tls is new in Python 3.11)
+ASYNC_START_TLS = hasattr(asyncio.StreamWriter, 'start_tls')
+
+# Sent instead of a result when the server is saturated
+BUSY_RESPONSE = b"SERVER BUSY\n"
+
+# Bytes read per recv() in keep-alive mode
+RECV_BYTES = 64 * 1024
+
+# Request log; its writer thread is started by serve()
+request_log = RequestLogger(
+    sample_rate=LOG_SAMPLE_RATE, slow_ms=LOG_SLOW_MS, queue_size=LOG_QUEUE
+)
+
+# Threaded mode worker pool, created by serve_threaded()
+pool = None
+
+# Per-stage latency histograms and request counters
+metrics = Metrics()
+
+# Asyncio mode admission counters
+async_active = 0
+async_rejected = 0
+
+
+def answer_query(
+    data: bytes,
+    addr: Tuple[str, int],
+    start: float,
+    corpus: str = DEFAULT_CORPUS,
+    normalized: bool = False
+) -> bytes:
+    """Search for the query in ``data``, log it and build the response.
+
+    ``normalized`` compares normal forms instead of exact bytes.
+    """
+    query = data.rstrip(b'\x00').decode('utf-8', errors='ignore').strip()
+
+    # Search for string
+    search_start = time.perf_counter()
+    if normalized:
+        try:
+            found = searchers[corpus].exists_normalized(query)
+        except ValueError as e:
+            metrics.inc('errors')
+            return f"ERROR {e}\n".encode('utf-8')
+    else:
+        found = searchers[corpus].exists(query)
+    metrics.observe('search', time.perf_counter() - search_start, corpus)
+    metrics.inc('hits' if found else 'misses', corpus=corpus)
+    response = "STRING EXISTS\n" if found else "STRING NOT FOUND\n"
+
+    # Calculate elapsed time
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # Log debug info (formatted and written by the logger thread)
+    request_log.request(
+        addr, f"NORM {query}" if normalized else query, elapsed_ms,
+        'EXISTS' if found else 'NOT_FOUND', corpus=corpus
+    )
 
+    return response.encode('utf-8')
 
-def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
-    """Handle individual client connection."""
+
+def answer_batch(
+    lines: List[bytes],
+    addr: Tuple[str, int],
+    start: float,
+    corpus: str = DEFAULT_CORPUS
+) -> bytes:
+    """Look up a batch of queries in one call and log it as one request."""
+    queries = [
+        line.rstrip(b'\x00').decode('utf-8', errors='ignore').strip()
+        for line in lines
+    ]
+    search_start = time.perf_counter()
+    results = searchers[corpus].exists_many(queries)
+    metrics.observe('search', time.perf_counter() - search_start, corpus)
+    hits = sum(results)
+    metrics.inc('hits', hits, corpus)
+    metrics.inc('misses', len(results) - hits, corpus)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    request_log.request(
+        addr, f"BATCH {len(queries)}", elapsed_ms, 'BATCH',
+        hits=hits, size=len(results), corpus=corpus
+    )
+
+    return format_batch(results)
+
+
+def answer_prefix(
+    prefix: bytes,
+    after: Optional[bytes],
+    limit: int,
+    addr: Tuple[str, int],
+    start: float,
+    corpus: str = DEFAULT_CORPUS
+) -> bytes:
+    """Answer one page of a prefix (autocomplete) query."""
+    def text(raw: bytes) -> str:
+        return raw.decode('utf-8', 'surrogateescape')
+
+    search_start = time.perf_counter()
+    try:
+        lines, cursor = searchers[corpus].prefix(
+            text(prefix), limit, text(after) if after is not None else None
+        )
+    except ValueError as e:
+        metrics.inc('errors')
+        return f"ERROR {e}\n".encode('utf-8')
+    metrics.observe('search', time.perf_counter() - search_start, corpus)
+    metrics.inc('hits' if lines else 'misses', corpus=corpus)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    request_log.request(
+        addr, f"PREFIX {text(prefix)}", elapsed_ms, 'PREFIX',
+        matches=len(lines), corpus=corpus
+    )
+
+    token = None
+    if cursor is not None:
+        token = encode_cursor(prefix, cursor.encode('utf-8', 'surrogateescape'))
+    return format_prefix(
+        [line.encode('utf-8', 'surrogateescape') for line in lines], token
+    )
+
+
+def answer_substring(
+    fragment: bytes,
+    limit: int,
+    addr: Tuple[str, int],
+    start: float,
+    corpus: str = DEFAULT_CORPUS
+) -> bytes:
+    """Count the lines containing a fragment and list the first few."""
+    text = fragment.decode('utf-8', 'surrogateescape')
+    searcher = searchers[corpus]
+    search_start = time.perf_counter()
+    try:
+        count, offsets = searcher.substring(text, limit)
+    except ValueError as e:
+        metrics.inc('errors')
+        return f"ERROR {e}\n".encode('utf-8')
+    matches = [
+        (offset, searcher.line_at(offset).encode('utf-8', 'surrogateescape'))
+        for offset in offsets
+    ]
+    metrics.observe('search', time.perf_counter() - search_start, corpus)
+    metrics.inc('hits' if count else 'misses', corpus=corpus)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    request_log.request(
+        addr, f"SUBSTR {text}", elapsed_ms, 'SUBSTR',
+        matches=count, corpus=corpus
+    )
+    return format_substring(count, matches)
+
+
+def answer_fuzzy(
+    query: bytes,
+    distance: int,
+    addr: Tuple[str, int],
+    start: float,
+    corpus: str = DEFAULT_CORPUS
+) -> bytes:
+    """Find the closest line within ``distance`` edits of a query."""
+    text = query.decode('utf-8', 'surrogateescape').strip()
+    search_start = time.perf_counter()
+    try:
+        match = searchers[corpus].nearest(text, distance)
+    except ValueError as e:
+        metrics.inc('errors')
+        return f"ERROR {e}\n".encode('utf-8')
+    metrics.observe('search', time.perf_counter() - search_start, corpus)
+    metrics.inc('hits' if match else 'misses', corpus=corpus)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    request_log.request(
+        addr, f"FUZZY {text}", elapsed_ms, 'FUZZY',
+        distance=match[0] if match else None, corpus=corpus
+    )
+    if match is None:
+        return format_fuzzy(None)
+    return format_fuzzy(
+        (match[0], match[1].encode('utf-8', 'surrogateescape'))
+    )
+
+
+def answer_reload(arg: bytes, addr: Tuple[str, int]) -> bytes:
+    """Reload one corpus (or all) and report how long it took."""
+    if not ADMIN_COMMANDS:
+        metrics.inc('errors')
+        return b"ERROR admin commands are disabled\n"
+    name = arg.strip().decode('utf-8', errors='ignore')
+    try:
+        timings = reloader.reload([name] if name else None)
+    except ValueError as e:
+        metrics.inc('errors')
+        return f"ERROR {e}\n".encode('utf-8')
+    if not timings:
+        metrics.inc('errors')
+        return b"ERROR reload failed\n"
+    return f"OK {reloader.last_seconds:.3f}\n".encode('utf-8')
+
+
+def answer_request(
+    request: Request,
+    addr: Tuple[str, int],
+    start: float
+) -> bytes:
+    """Build the response to one parsed request."""
+    # USE must name its corpus; an empty name does not mean the default
+    corpus = request.corpus
+    if not corpus and request.verb != 'USE':
+        corpus = DEFAULT_CORPUS
+    if corpus not in searchers:
+        metrics.inc('errors')
+        return f"ERROR unknown corpus: {corpus}\n".encode('utf-8')
+    if request.verb == 'EXISTS':
+        return answer_query(request.arg, addr, start, corpus)
+    if request.verb == 'NORM':
+        return answer_query(request.arg, addr, start, corpus, normalized=True)
+    if request.verb == 'BATCH':
+        return answer_batch(request.lines, addr, start, corpus)
+    if request.verb == 'USE':
+        return b"OK\n"
+    if request.verb == 'RELOAD':
+        return answer_reload(request.arg, addr)
+    if request.verb in ('PREFIX', 'MORE'):
+        try:
+            limit, arg = parse_limit(request.arg, MAX_PREFIX_RESULTS)
+            prefix, after = (
+                decode_cursor(arg) if request.verb == 'MORE' else (arg, None)
+            )
+        except ProtocolError as e:
+            metrics.inc('errors')
+            return f"ERROR {e}\n".encode('utf-8')
+        return answer_prefix(prefix, after, limit, addr, start, corpus)
+    if request.verb == 'SUBSTR':
+        try:
+            limit, fragment = parse_limit(request.arg, MAX_SUBSTRING_RESULTS)
+        except ProtocolError as e:
+            metrics.inc('errors')
+            return f"ERROR {e}\n".encode('utf-8')
+        return answer_substring(fragment, limit, addr, start, corpus)
+    if request.verb == 'FUZZY':
+        try:
+            distance, query = parse_distance(request.arg)
+        except ProtocolError as e:
+            metrics.inc('errors')
+            return f"ERROR {e}\n".encode('utf-8')
+        return answer_fuzzy(query, distance, addr, start, corpus)
+    metrics.inc('errors')
+    return f"ERROR unknown command: {request.verb}\n".encode('utf-8')
+
+
+def answer_requests(
+    requests: List[Request],
+    addr: Tuple[str, int],
+    start: float
+) -> bytes:
+    """Answer a run of pipelined requests, in order, as one buffer."""
+    return b"".join(answer_request(r, addr, start) for r in requests)
+
+
+def new_reader() -> RequestReader:
+    """Create a request parser with the configured limits."""
+    return RequestReader(
+        COMMAND_PREFIX, MAX_BATCH_SIZE, corpora=searchers,
+        max_batch_bytes=MAX_BATCH_TOTAL
+    )
+
+
+def is_command(data: bytes) -> bool:
+    """True if a one-shot request is a command rather than a plain query."""
+    return bool(COMMAND_PREFIX) and data.startswith(
+        COMMAND_PREFIX.encode('utf-8')
+    )
+
+
+def read_command(conn: socket.socket, data: bytes) -> Request:
+    """Read the rest of a one-shot command that started with ``data``."""
+    reader = new_reader()
+    requests = reader.feed(data)
+    if not requests and not reader.in_batch:
+        # One-shot commands need no trailing newline
+        requests = reader.finish()
+    while not requests:
+        try:
+            data = conn.recv(RECV_BYTES)
+        except socket.timeout:
+            # A client waiting for its answer has sent all it will, so
+            # idle ends the request like a shutdown of its write side
+            data = b""
+        requests = reader.feed(data) if data else reader.finish()
+    return requests[0]
+
+
+def send_response(conn: socket.socket, response: bytes) -> None:
+    """Send a response and record how long sending took."""
     start = time.perf_counter()
+    conn.sendall(response)
+    metrics.observe('send', time.perf_counter() - start)
+
+
+def protocol_error(e: ProtocolError) -> bytes:
+    """Count a protocol violation and build its error response."""
+    metrics.inc('errors')
+    return f"ERROR {e}\n".encode('utf-8')
+
+
+def serve_keepalive(
+    conn: socket.socket,
+    addr: Tuple[str, int],
+    ready: float
+) -> None:
+    """Answer newline-terminated requests until the client disconnects.
+
+    Clients may pipeline requests; everything complete in one read is
+    answered with a single sendall().
+    """
+    reader = new_reader()
+    while True:
+        try:
+            data = conn.recv(RECV_BYTES)
+        except socket.timeout:
+            return
+        start = time.perf_counter()
+        if ready:
+            # Later reads include client think time, so only time the first
+            metrics.observe('recv', start - ready)
+            ready = 0.0
+        try:
+            # At end of stream, answer a final request sent without a newline
+            requests = reader.feed(data) if data else reader.finish()
+        except ProtocolError as e:
+            conn.sendall(protocol_error(e))
+            return
+        if requests:
+            send_response(conn, answer_requests(requests, addr, start))
+        if not data:
+            return
+
+
+def tls_handshake(conn: ssl.SSLSocket) -> float:
+    """Complete a TLS handshake on this worker and return its duration."""
+    start = time.perf_counter()
+    # A client that stalls mid-handshake holds only this worker, and only
+    # until the timeout
+    conn.settimeout(TLS_HANDSHAKE_TIMEOUT)
+    conn.do_handshake()
+    elapsed = time.perf_counter() - start
+    metrics.observe('handshake', elapsed)
+    metrics.inc('tls_resumed' if conn.session_reused else 'tls_full')
+    return elapsed
+
+
+def handle_client(
+    conn: socket.socket,
+    addr: Tuple[str, int],
+    ready: float
+) -> None:
+    """Handle individual client connection.
+
+    ``ready`` is when the connection was accepted; time spent queued for a
+    worker counts as recv, while a TLS handshake is timed on its own.
+    """
     try:
+        if isinstance(conn, ssl.SSLSocket):
+            try:
+                ready += tls_handshake(conn)
+            except (ssl.SSLError, OSError) as e:
+                metrics.inc('errors')
+                request_log.error(addr, str(e) or 'handshake timed out',
+                                  event='ssl')
+                return
+
+        # Idle clients must not hold a pool worker forever
+        conn.settimeout(CLIENT_TIMEOUT)
+
+        if PROTOCOL == 'keepalive':
+            serve_keepalive(conn, addr, ready)
+            return
+
         # Receive data (max 1024 bytes)
-        data = conn.recv(1024).rstrip(b'\x00')
-        query = data.decode('utf-8', errors='ignore').strip()
-        
-        # Search for string
-        found = searcher.exists(query)
-        response = "STRING EXISTS\n" if found else "STRING NOT FOUND\n"
-        
-        # Calculate elapsed time
-        elapsed_ms = (time.perf_counter() - start) * 1000
-        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Log debug info
-        print(
-            f"DEBUG: [{ts}] IP={addr[0]} Port={addr[1]} "
-            f"Query=\"{query[:50]}\" Time={elapsed_ms:.3f}ms "
-            f"Result={'EXISTS' if found else 'NOT_FOUND'}"
-        )
-        
+        data = conn.recv(1024)
+
         # Send response
-        conn.sendall(response.encode('utf-8'))
-        
+        if is_command(data):
+            try:
+                request = read_command(conn, data)
+            except ProtocolError as e:
+                conn.sendall(protocol_error(e))
+                return
+        else:
+            request = Request('EXISTS', data)
+        start = time.perf_counter()
+        metrics.observe('recv', start - ready)
+        send_response(conn, answer_request(request, addr, start))
+
     except Exception as e:
-        print(f"DEBUG: Client error {addr}: {e}")
+        metrics.inc('errors')
+        request_log.error(addr, str(e))
     finally:
         conn.close()
 
 
-def main() -> None:
-    """Main server loop."""
+def reject_busy(conn: socket.socket, addr: Tuple[str, int]) -> None:
+    """Tell a client the server is saturated and drop the connection."""
+    metrics.inc('rejected')
+    request_log.error(
+        addr, "server busy", event='busy',
+        queue_depth=pool.queue_depth, rejected=pool.rejected
+    )
+    try:
+        # Replying over TLS would mean a handshake on the accept loop, so
+        # TLS clients are just disconnected
+        if not isinstance(conn, ssl.SSLSocket):
+            conn.sendall(BUSY_RESPONSE)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+
+def needs_executor(request: Request) -> bool:
+    """True if answering ``request`` may take long enough to block."""
+    searcher = searchers.get(request.corpus or DEFAULT_CORPUS)
+    return request.verb in ('BATCH', 'PREFIX', 'MORE', 'SUBSTR', 'FUZZY',
+                           'RELOAD') or (
+        searcher is not None and searcher.reread_on_query
+    )
+
+
+async def run_answer(
+    requests: List[Request],
+    addr: Tuple[str, int],
+    start: float
+) -> bytes:
+    """Answer requests without stalling the event loop.
+
+    Single lookups are O(1) and run inline. Batches, prefix queries, and
+    any request for a corpus in reread mode (which may rebuild its index),
+    run in the default executor instead.
+    """
+    if any(needs_executor(r) for r in requests):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, answer_requests, requests, addr, start
+        )
+    return answer_requests(requests, addr, start)
+
+
+async def read_command_async(
+    reader: asyncio.StreamReader,
+    data: bytes
+) -> Request:
+    """Event-loop version of read_command()."""
+    parser = new_reader()
+    requests = parser.feed(data)
+    if not requests and not parser.in_batch:
+        requests = parser.finish()
+    while not requests:
+        try:
+            data = await asyncio.wait_for(
+                reader.read(RECV_BYTES), CLIENT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            data = b""
+        requests = parser.feed(data) if data else parser.finish()
+    return requests[0]
+
+
+async def send_response_async(
+    writer: asyncio.StreamWriter,
+    response: bytes
+) -> None:
+    """Event-loop version of send_response()."""
+    start = time.perf_counter()
+    writer.write(response)
+    await writer.drain()
+    metrics.observe('send', time.perf_counter() - start)
+
+
+async def serve_keepalive_async(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    addr: Tuple[str, int],
+    ready: float
+) -> None:
+    """Event-loop version of serve_keepalive()."""
+    parser = new_reader()
+    while True:
+        try:
+            data = await asyncio.wait_for(
+                reader.read(RECV_BYTES), CLIENT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return
+        start = time.perf_counter()
+        if ready:
+            metrics.observe('recv', start - ready)
+            ready = 0.0
+        try:
+            requests = parser.feed(data) if data else parser.finish()
+        except ProtocolError as e:
+            writer.write(protocol_error(e))
+            await writer.drain()
+            return
+        if requests:
+            await send_response_async(
+                writer, await run_answer(requests, addr, start)
+            )
+        if not data:
+            return
+
+
+async def reject_busy_async(
+    writer: asyncio.StreamWriter,
+    addr: Tuple[str, int],
+    handshake: bool
+) -> None:
+    """Tell a client the event loop is saturated and drop the connection.
+
+    ``handshake`` is True while the connection still needs its TLS
+    handshake; like the threaded mode, such clients are just disconnected.
+    """
+    metrics.inc('rejected')
+    request_log.error(
+        addr, "server busy", event='busy',
+        active=async_active, rejected=async_rejected
+    )
+    try:
+        if not handshake:
+            writer.write(BUSY_RESPONSE)
+            await asyncio.wait_for(writer.drain(), CLIENT_TIMEOUT)
+        writer.close()
+        await asyncio.wait_for(writer.wait_closed(), CLIENT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        writer.close()
+
+
+async def handle_client_async(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter
+) -> None:
+    """Handle a client connection on the event loop.
+
+    Where the loop supports upgrading a stream (Python 3.11+), the TLS
+    handshake happens here and is timed; otherwise asyncio completes it
+    before calling this and it is not timed.
+    """
+    global async_active, async_rejected
+    ready = time.perf_counter()
+    addr = writer.get_extra_info('peername')
+    handshake = ssl_context is not None and ASYNC_START_TLS
+
+    # Same bound as the threaded mode: running plus queued connections,
+    # checked before the handshake so TLS clients count against it too
+    if async_active >= MAX_WORKERS + ACCEPT_QUEUE:
+        async_rejected += 1
+        await reject_busy_async(writer, addr, handshake)
+        return
+
+    async_active += 1
+    try:
+        if handshake:
+            try:
+                await writer.start_tls(
+                    ssl_context, ssl_handshake_timeout=TLS_HANDSHAKE_TIMEOUT
+                )
+            except (ssl.SSLError, OSError, asyncio.TimeoutError) as e:
+                metrics.inc('errors')
+                request_log.error(addr, str(e) or 'handshake timed out',
+                                  event='ssl')
+                return
+            elapsed = time.perf_counter() - ready
+            metrics.observe('handshake', elapsed)
+            session = writer.get_extra_info('ssl_object')
+            metrics.inc(
+                'tls_resumed' if session.session_reused else 'tls_full'
+            )
+            ready += elapsed
+
+        if PROTOCOL == 'keepalive':
+            await serve_keepalive_async(reader, writer, addr, ready)
+            return
+
+        data = await asyncio.wait_for(reader.read(1024), CLIENT_TIMEOUT)
+        if is_command(data):
+            try:
+                request = await read_command_async(reader, data)
+            except ProtocolError as e:
+                writer.write(protocol_error(e))
+                await writer.drain()
+                return
+        else:
+            request = Request('EXISTS', data)
+        start = time.perf_counter()
+        metrics.observe('recv', start - ready)
+        await send_response_async(
+            writer, await run_answer([request], addr, start)
+        )
+
+    except Exception as e:
+        metrics.inc('errors')
+        request_log.error(addr, str(e))
+    finally:
+        async_active -= 1
+        writer.close()
+
+
+async def serve_async() -> None:
+    """Accept connections with asyncio until cancelled."""
+    # Without stream upgrades the loop runs the handshake itself
+    tls = ssl_context if not ASYNC_START_TLS else None
+    server = await asyncio.start_server(
+        handle_client_async,
+        HOST,
+        PORT,
+        ssl=tls,
+        ssl_handshake_timeout=TLS_HANDSHAKE_TIMEOUT if tls else None,
+        backlog=LISTEN_BACKLOG,
+        reuse_address=True,
+        reuse_port=PROCESSES > 1 or None
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def serve_threaded() -> None:
+    """Accept connections and hand them to the bounded worker pool."""
+    global pool
+    pool = WorkerPool(handle_client, MAX_WORKERS, ACCEPT_QUEUE)
+
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if PROCESSES > 1:
+        # Every worker process binds the port; the kernel spreads connections
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     server_socket.bind((HOST, PORT))
-    server_socket.listen(130)
-    
-    print("=" * 60)
-    print("String Search Server Started")
-    print("=" * 60)
-    print(f"Listening on: {HOST}:{PORT}")
-    print(f"Search file: {FILEPATH}")
-    print(f"REREAD_ON_QUERY: {REREAD}")
-    print(f"SSL enabled: {SSL_ENABLED}")
-    if searcher.lines_set:
-        print(f"Lines loaded: {len(searcher.lines_set)}")
-    else:
-        print("Lines loaded: dynamic (reread mode)")
-    print("=" * 60)
-    
+    server_socket.listen(LISTEN_BACKLOG)
+
     while True:
         try:
             conn, addr = server_socket.accept()
+            accepted = time.perf_counter()
             
-            # Wrap with SSL if enabled
+            # Wrap with SSL if enabled; the handshake itself runs on the
+            # worker, so a slow client cannot stall the accept loop
             if SSL_ENABLED and ssl_context:
                 try:
-                    conn = ssl_context.wrap_socket(conn, server_side=True)
+                    conn = ssl_context.wrap_socket(
+                        conn, server_side=True, do_handshake_on_connect=False
+                    )
                 except ssl.SSLError as e:
-                    print(f"SSL handshake failed from {addr}: {e}")
+                    metrics.inc('errors')
+                    request_log.error(addr, str(e), event='ssl')
                     conn.close()
                     continue
             
-            # Handle in new thread
-            t = threading.Thread(target=handle_client, args=(conn, addr))
-            t.daemon = True
-            t.start()
+            # Queue for a worker, or shed load if the pool is saturated
+            if not pool.submit(conn, addr, accepted):
+                reject_busy(conn, addr)
             
         except KeyboardInterrupt:
             print("\nShutting down...")
@@ -119,5 +778,165 @@ def main() -> None:
             print(f"Accept error: {e}")
 
 
+def start_metrics(slot: int) -> None:
+    """Expose this process's metrics on ``metrics_port`` plus ``slot``."""
+    metrics.gauge(
+        'active_connections', "Connections being served.",
+        lambda: pool.active if pool else async_active
+    )
+    metrics.gauge(
+        'queue_depth', "Accepted connections waiting for a worker.",
+        lambda: pool.queue_depth if pool else 0
+    )
+    metrics.gauge(
+        'index_lines', "Lines in the loaded index.",
+        lambda: {
+            name: len(s.index) if s.index is not None else 0
+            for name, s in searchers.items()
+        }
+    )
+    metrics.gauge(
+        'index_load_seconds', "Duration of the last index load or rebuild.",
+        lambda: {name: s.load_seconds for name, s in searchers.items()}
+    )
+
+    metrics.gauge(
+        'reloads_total', "Corpora reloaded without a restart.",
+        lambda: reloader.reloads, kind='counter'
+    )
+    metrics.gauge(
+        'reload_seconds', "Duration of the last reload.",
+        lambda: reloader.last_seconds
+    )
+    metrics.gauge(
+        'reload_peak_rss_bytes',
+        "Peak resident memory during the last reload.",
+        lambda: reloader.last_peak_rss
+    )
+
+    def caches():
+        # Looked up per scrape: a reload replaces the searcher and its cache
+        return {name: s.cache for name, s in searchers.items() if s.cache}
+
+    if caches():
+        metrics.gauge(
+            'cache_hits_total', "Queries answered from the result cache.",
+            lambda: {name: c.hits for name, c in caches().items()},
+            kind='counter'
+        )
+        metrics.gauge(
+            'cache_misses_total', "Queries that missed the result cache.",
+            lambda: {name: c.misses for name, c in caches().items()},
+            kind='counter'
+        )
+        metrics.gauge(
+            'cache_evictions_total', "Results evicted from the cache.",
+            lambda: {name: c.evictions for name, c in caches().items()},
+            kind='counter'
+        )
+        metrics.gauge(
+            'cache_entries', "Results held in the cache.",
+            lambda: {name: len(c) for name, c in caches().items()}
+        )
+    try:
+        serve_metrics(metrics, METRICS_HOST, METRICS_PORT + slot)
+    except OSError as e:
+        print(f"WARNING: metrics port {METRICS_PORT + slot} unavailable: {e}")
+
+
+def serve(slot: int = 0) -> None:
+    """Run the configured server mode in this process.
+
+    ``slot`` numbers the worker process in multi-process mode.
+    """
+    request_log.start()
+    if METRICS_PORT:
+        start_metrics(slot)
+    # systemctl reload sends SIGHUP; in multi-process mode the supervisor
+    # passes it on, and every worker rebuilds its own copy
+    signal.signal(signal.SIGHUP, lambda signum, frame: reloader.request())
+    if RELOAD_WATCH > 0:
+        reloader.watch(RELOAD_WATCH)
+    if SERVER_MODE == 'asyncio':
+        try:
+            asyncio.run(serve_async())
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+    else:
+        serve_threaded()
+
+
+def print_corpus(name: str) -> None:
+    """Print the startup summary of one corpus."""
+    corpus = CORPORA[name]
+    searcher = searchers[name]
+    default = " (default)" if name == DEFAULT_CORPUS else ""
+    print(f"Corpus: {name}{default}")
+    print(f"  Search file: {corpus.filepath}")
+    print(f"  REREAD_ON_QUERY: {corpus.reread}")
+    print(f"  Engine: {corpus.engine}")
+    if searcher.cache is not None:
+        print(f"  Result cache: {corpus.cache_entries or 'unbounded'} entries, "
+              f"{corpus.cache_bytes or 'unbounded'} bytes")
+    if searcher.lines_set:
+        print(f"  Lines loaded: {len(searcher.lines_set)}")
+    elif searcher.sorted_index is not None:
+        print(f"  Sorted index: {searcher.index_path} "
+              f"({len(searcher.sorted_index)} lines)")
+    elif searcher.fingerprint_index is not None:
+        print(f"  Lines indexed: {len(searcher.fingerprint_index)} "
+              f"({searcher.fingerprint_index.nbytes} bytes)")
+    elif searcher.prefix_index is not None:
+        prefixes = searcher.prefix_index
+        print(f"  Prefix index: {searcher.index_path} "
+              f"({len(prefixes)} lines in {len(prefixes.directory)} blocks)")
+    else:
+        print("  Lines loaded: dynamic (reread mode)")
+    if searcher.trigram_index is not None:
+        trigrams = searcher.trigram_index
+        print(f"  Substring index: {len(trigrams.postings)} trigrams "
+              f"({trigrams.nbytes} bytes, {trigrams.skipped} over budget)")
+    if searcher.normalized_index is not None:
+        print(f"  Normalization: {', '.join(searcher.normalizer.steps)} "
+              f"({len(searcher.normalized_index)} lines changed)")
+    if searcher.fuzzy_index is not None:
+        print(f"  Fuzzy index: distance {searcher.fuzzy_distance}, "
+              f"{len(searcher.fuzzy_index.variants)} variants")
+    if not corpus.reread:
+        print(f"  Index build time: {searcher.load_seconds:.3f}s "
+              f"({searcher.build_workers} build workers)")
+
+
+def main() -> None:
+    """Main server loop."""
+    print("=" * 60)
+    print("String Search Server Started")
+    print("=" * 60)
+    print(f"Listening on: {HOST}:{PORT}")
+    print(f"SSL enabled: {SSL_ENABLED}")
+    print(f"Server mode: {SERVER_MODE}")
+    print(f"Protocol: {PROTOCOL}")
+    print(f"Processes: {PROCESSES}")
+    if METRICS_PORT:
+        last = METRICS_PORT + PROCESSES - 1
+        ports = f"{METRICS_PORT}-{last}" if PROCESSES > 1 else METRICS_PORT
+        print(f"Metrics: http://{METRICS_HOST}:{ports}/metrics")
+    print(f"Max workers: {MAX_WORKERS} (accept queue {ACCEPT_QUEUE}, "
+          f"listen backlog {LISTEN_BACKLOG})")
+    for name in CORPORA:
+        print_corpus(name)
+    print("=" * 60)
+    
+    if PROCESSES > 1:
+        # The index was loaded before forking, so workers share it
+        # copy-on-write; freezing keeps the collector from touching (and
+        # so copying) its pages in every worker
+        gc.freeze()
+        Supervisor(serve, PROCESSES).run()
+        print("\nShutting down...")
+    else:
+        serve()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
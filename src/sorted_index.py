@@ -0,0 +1,173 @@
+"""Disk-resident sorted index with mmap binary search."""
+import heapq
+import mmap
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from generation import FileGeneration, read_generation
+from index_format import (
+    HEADER_SIZE, KIND_SORTED, make_header, unpack_header
+)
+
+
+# Approximate bytes of keys held in memory per sorted run while building
+RUN_BYTES = 64 * 1024 * 1024
+
+# Suffix of the index file written next to the corpus
+SORTED_INDEX_SUFFIX = '.sorted'
+
+
+def _write_run(keys: List[bytes], directory: str) -> str:
+    """Write one sorted, de-duplicated run to a temporary file."""
+    fd, path = tempfile.mkstemp(prefix='.run-', dir=directory)
+    with os.fdopen(fd, 'wb', buffering=1024 * 1024) as out:
+        previous = None
+        for key in sorted(keys):
+            if key != previous:
+                out.write(key + b'\n')
+                previous = key
+    return path
+
+
+def _read_run(path: str) -> Iterator[bytes]:
+    """Yield the keys of a run file in order."""
+    with open(path, 'rb', buffering=1024 * 1024) as f:
+        for line in f:
+            yield line[:-1]
+
+
+def _merge_runs(runs: List[str]) -> Iterator[bytes]:
+    """Merge sorted run files, yielding each distinct key once."""
+    previous = None
+    for key in heapq.merge(*(_read_run(run) for run in runs)):
+        if key != previous:
+            yield key
+            previous = key
+
+
+@contextmanager
+def sorted_lines(
+    source: str,
+    directory: str,
+    run_bytes: int = RUN_BYTES
+) -> Iterator[Iterator[bytes]]:
+    """Provide the distinct lines of ``source`` in sorted order.
+
+    Lines are sorted in bounded-memory runs, written to temporary files
+    in ``directory`` and merged, so the corpus does not need to fit in
+    RAM. The run files are removed when the context exits.
+    """
+    runs: List[str] = []
+    try:
+        with open(source, 'rb', buffering=1024 * 1024) as f:
+            keys: List[bytes] = []
+            held = 0
+            for line in f:
+                key = line.rstrip(b'\r\n')
+                keys.append(key)
+                # Account for the bytes object header as well as the data
+                held += len(key) + 40
+                if held >= run_bytes:
+                    runs.append(_write_run(keys, directory))
+                    keys = []
+                    held = 0
+            if keys or not runs:
+                runs.append(_write_run(keys, directory))
+
+        yield _merge_runs(runs)
+    finally:
+        for run in runs:
+            if os.path.exists(run):
+                os.unlink(run)
+
+
+def build_sorted_index(
+    source: str,
+    index_path: str,
+    run_bytes: int = RUN_BYTES,
+    generation: Optional[FileGeneration] = None
+) -> int:
+    """Build a sorted, newline-delimited index of the lines in ``source``.
+
+    Duplicate lines are written once. The index is written to a temporary
+    file and moved into place atomically, behind a header recording
+    ``generation`` (read from ``source`` if not given).
+
+    Returns the number of distinct lines written.
+    """
+    if generation is None:
+        generation = read_generation(source)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    with sorted_lines(source, directory, run_bytes) as keys:
+        fd, tmp_path = tempfile.mkstemp(prefix='.index-', dir=directory)
+        count = 0
+        crc = 0
+        with os.fdopen(fd, 'wb', buffering=1024 * 1024) as out:
+            out.write(bytes(HEADER_SIZE))
+            for key in keys:
+                record = key + b'\n'
+                out.write(record)
+                crc = zlib.crc32(record, crc)
+                count += 1
+            out.seek(0)
+            out.write(make_header(KIND_SORTED, count, generation, crc).pack())
+        os.replace(tmp_path, index_path)
+        return count
+
+
+class SortedIndex:
+    """Answers membership queries by binary search over a mapped index.
+
+    Only the pages touched by a search are read, so resident memory is
+    governed by the OS page cache rather than the Python heap.
+    """
+
+    def __init__(self, index_path: str):
+        """Map an index file built by ``build_sorted_index``."""
+        self.index_path = index_path
+        self._file = open(index_path, 'rb')
+        self.header = unpack_header(self._file.read(HEADER_SIZE))
+        if self.header is None or self.header.kind != KIND_SORTED:
+            self._file.close()
+            raise ValueError(f"Not a sorted index: {index_path}")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = None
+        if self.size > HEADER_SIZE:
+            self._mm = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+
+    def __len__(self) -> int:
+        return self.header.count
+
+    def __contains__(self, key: bytes) -> bool:
+        """Return True if ``key`` is one of the indexed lines."""
+        mm = self._mm
+        if mm is None:
+            return False
+
+        lo, hi = HEADER_SIZE, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # lo is always a line start, so the line holding mid starts
+            # at or after it
+            start = mm.rfind(b'\n', lo, mid) + 1 or lo
+            end = mm.find(b'\n', start)
+            line = mm[start:end]
+            if line == key:
+                return True
+            if line < key:
+                lo = end + 1
+            else:
+                hi = start
+        return False
+
+    def close(self) -> None:
+        """Release the mapping and file handle."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
@@ -0,0 +1,113 @@
+"""Pre-fork supervisor for running several server processes."""
+import os
+import signal
+import sys
+import time
+import traceback
+from typing import Callable, Dict
+
+
+class Supervisor:
+    """Forks workers that each run ``target(slot)`` and restarts them.
+
+    Workers are forked after the caller has loaded its index, so read-only
+    data (and any mmapped index file) is shared copy-on-write instead of
+    being loaded once per process. SIGTERM or SIGINT stops every worker
+    and makes ``run()`` return; SIGHUP is passed on to every worker.
+    Workers start with SIGHUP ignored, so one that arrives before
+    ``target`` installs its own handler is dropped rather than fatal.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[int], None],
+        processes: int,
+        restart_delay: float = 1.0
+    ):
+        """Prepare to run ``processes`` copies of ``target``."""
+        self.target = target
+        self.processes = processes
+        # Workers that die sooner than this are restarted only after a pause
+        self.restart_delay = restart_delay
+        self.workers: Dict[int, int] = {}
+        self.started: Dict[int, float] = {}
+        self.restarts = 0
+        self._stopping = False
+
+    def run(self) -> None:
+        """Start the workers and keep them running until stopped."""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        signal.signal(signal.SIGHUP, self._on_hangup)
+
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.workers.pop(pid, None)
+            if slot is None or self._stopping:
+                continue
+
+            print(
+                f"WARNING: worker {slot} (pid {pid}) exited "
+                f"with status {status}, restarting"
+            )
+            if time.monotonic() - self.started[slot] < self.restart_delay:
+                # Avoid a tight fork loop when workers fail at startup
+                time.sleep(self.restart_delay)
+            if not self._stopping:
+                self.restarts += 1
+                self._spawn(slot)
+
+    def stop(self) -> None:
+        """Ask every worker to exit; ``run()`` returns once they have."""
+        self._stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _on_signal(self, signum, frame) -> None:
+        """Signal handler for SIGTERM/SIGINT in the supervisor."""
+        self.stop()
+
+    def _on_hangup(self, signum, frame) -> None:
+        """Signal handler for SIGHUP in the supervisor."""
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, slot: int) -> None:
+        """Fork one worker process into ``slot``."""
+        # Unflushed output would otherwise be printed by both processes
+        sys.stdout.flush()
+        # Held back until the child ignores it, so neither the default
+        # action nor the inherited forwarding handler can run in the child
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGHUP})
+        try:
+            pid = os.fork()
+            if pid == 0:
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGHUP})
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.target(slot)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        self.workers[pid] = slot
+        self.started[slot] = time.monotonic()
@@ -0,0 +1,47 @@
+"""TLS settings for the server socket."""
+import ssl
+from typing import Optional
+
+
+# Default time allowed for a client to complete its handshake
+HANDSHAKE_TIMEOUT = 5.0
+
+# Session tickets issued after each TLS 1.3 handshake; a client presents
+# one to resume without the full key exchange
+SESSION_TICKETS = 2
+
+
+def make_server_context(
+    cert_path: str,
+    key_path: str,
+    min_version: str = 'TLSv1_2',
+    ciphers: Optional[str] = None,
+    session_tickets: int = SESSION_TICKETS
+) -> ssl.SSLContext:
+    """Build the server-side TLS context.
+
+    ``min_version`` names an ``ssl.TLSVersion`` member (``TLSv1_2`` or
+    ``TLSv1_3``). ``ciphers`` is an OpenSSL cipher string for TLS 1.2;
+    Python cannot set TLS 1.3 cipher suites, which follow the OpenSSL
+    configuration. ``session_tickets`` of 0 disables resumption by ticket
+    for both versions.
+
+    Ticket keys are generated with the context, so worker processes forked
+    after it is created accept each other's tickets.
+    """
+    try:
+        version = ssl.TLSVersion[min_version]
+    except KeyError:
+        raise ValueError(f"unknown TLS version: {min_version}")
+
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile=cert_path, keyfile=key_path)
+    context.minimum_version = version
+    if ciphers:
+        context.set_ciphers(ciphers)
+    if session_tickets > 0:
+        context.num_tickets = session_tickets
+    else:
+        context.num_tickets = 0
+        context.options |= ssl.OP_NO_TICKET
+    return context
@@ -0,0 +1,231 @@
+"""Trigram posting-list index for substring queries.
+
+Every line is split into its distinct 3-byte substrings (trigrams) and
+each trigram maps to the ascending ids of the lines that contain it. A
+query fragment of three or more bytes can only occur in lines that contain
+all of its trigrams, so intersecting a few short posting lists yields a
+small candidate set, which is then verified against the mapped file.
+
+The index is built within a memory budget. Trigrams that occur in many
+lines say little about a query and cost the most memory, so when the
+budget is tight the most common ones are left out; a query whose
+trigrams are all left out falls back to scanning the file. The budget
+also bounds the counting pass of the build: no more trigrams are counted
+than the budget could hold, and ones first seen after that are left out.
+
+A fixed 2 MiB bitmap records which of the 2**24 possible trigrams occur
+in the corpus without being indexed, so a query with a trigram that no
+line contains is answered at once.
+"""
+import mmap
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+
+# Default memory budget for the offsets and posting lists
+DEFAULT_BUDGET = 256 * 1024 * 1024
+
+# Approximate cost of one posting list beyond its 4-byte entries: the
+# dict slot, the 3-byte key object and the array object
+POSTING_OVERHEAD = 200
+
+# Posting lists intersected before the remaining candidates are verified
+# directly; further lists rarely shrink the set enough to pay for
+# themselves
+MAX_INTERSECT = 3
+
+# One bit per possible 3-byte trigram
+TRIGRAM_BITS = 1 << 24
+
+
+def _trigrams(line: bytes) -> set:
+    """Distinct 3-byte substrings of ``line``."""
+    return {line[i:i + 3] for i in range(len(line) - 2)}
+
+
+def _bit(gram: bytes) -> Tuple[int, int]:
+    """Byte index and mask of ``gram`` in a trigram bitmap."""
+    value = int.from_bytes(gram, 'big')
+    return value >> 3, 1 << (value & 7)
+
+
+def mapped_lines(mm: mmap.mmap) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, line) for every line of the mapped file."""
+    size = len(mm)
+    pos = 0
+    while pos < size:
+        end = mm.find(b'\n', pos)
+        if end == -1:
+            end = size
+        yield pos, mm[pos:end].rstrip(b'\r')
+        pos = end + 1
+
+
+class TrigramIndex:
+    """Substring search over a mapped corpus with trigram posting lists."""
+
+    def __init__(self, filepath: str, budget: int = DEFAULT_BUDGET):
+        """Map ``filepath`` and index it within ``budget`` bytes."""
+        self.filepath = filepath
+        self.budget = budget
+        self.offsets = array('Q')
+        self.postings: Dict[bytes, array] = {}
+        # Trigrams left out of the index to stay within the budget
+        self.skipped = 0
+        # Bitmap of the trigrams that occur in the corpus but were left out
+        self.unindexed = bytearray()
+        # Estimated bytes held by the offsets and posting lists
+        self.nbytes = 0
+        self._file = open(filepath, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = None
+        if self.size:
+            self._mm = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            self._build()
+
+    def _build(self) -> None:
+        """Index every line, keeping the rarest trigrams that fit."""
+        self.unindexed = unindexed = bytearray(TRIGRAM_BITS // 8)
+
+        def leave_out(gram: bytes) -> bool:
+            index, mask = _bit(gram)
+            if unindexed[index] & mask:
+                return False
+            unindexed[index] |= mask
+            return True
+
+        # Pass 1: line offsets and how many lines contain each trigram.
+        # Each kept trigram costs at least POSTING_OVERHEAD, so counting
+        # more than the budget could hold would only waste memory
+        frequency: Counter = Counter()
+        tracked = self.budget // POSTING_OVERHEAD
+        overflow = 0
+        offsets = self.offsets
+        for offset, line in mapped_lines(self._mm):
+            offsets.append(offset)
+            grams = _trigrams(line)
+            if len(frequency) < tracked:
+                frequency.update(grams)
+                continue
+            known = frequency.keys() & grams
+            frequency.update(known)
+            for gram in grams - known:
+                if leave_out(gram):
+                    overflow += 1
+
+        # Keep the most selective trigrams until the budget is spent
+        ranked = sorted(frequency.items(), key=lambda item: item[1])
+        del frequency
+        spent = offsets.itemsize * len(offsets)
+        kept = 0
+        for _, count in ranked:
+            cost = 4 * count + POSTING_OVERHEAD
+            if spent + cost > self.budget:
+                break
+            spent += cost
+            kept += 1
+        for gram, _ in ranked[kept:]:
+            leave_out(gram)
+        self.skipped = len(ranked) - kept + overflow
+        self.nbytes = spent
+
+        # Pass 2: fill the posting lists of the kept trigrams
+        postings = {gram: array('I') for gram, _ in ranked[:kept]}
+        del ranked
+        for line_id, (_, line) in enumerate(mapped_lines(self._mm)):
+            for gram in _trigrams(line):
+                posting = postings.get(gram)
+                if posting is not None:
+                    posting.append(line_id)
+        self.postings = postings
+
+    def __len__(self) -> int:
+        """Number of indexed lines."""
+        return len(self.offsets)
+
+    def _line(self, line_id: int) -> bytes:
+        """Return the text of line ``line_id``."""
+        start = self.offsets[line_id]
+        end = self._mm.find(b'\n', start)
+        if end == -1:
+            end = self.size
+        return self._mm[start:end].rstrip(b'\r')
+
+    def _scan(self, fragment: bytes, limit: int) -> Tuple[int, List[int]]:
+        """Find matching lines by scanning the whole file."""
+        mm = self._mm
+        count = 0
+        found: List[int] = []
+        pos = mm.find(fragment)
+        while pos != -1:
+            start = mm.rfind(b'\n', 0, pos) + 1
+            end = mm.find(b'\n', pos)
+            if end == -1:
+                end = self.size
+            # A match must not span lines
+            if b'\n' not in fragment and (
+                fragment in mm[start:end].rstrip(b'\r')
+            ):
+                count += 1
+                if len(found) < limit:
+                    found.append(start)
+            pos = mm.find(fragment, end + 1)
+        return count, found
+
+    def search(self, fragment: bytes, limit: int) -> Tuple[int, List[int]]:
+        """Count the lines containing ``fragment``.
+
+        Returns the number of matching lines and the byte offsets of the
+        first ``limit`` of them, in file order.
+        """
+        if self._mm is None:
+            return 0, []
+        if not fragment:
+            return len(self.offsets), list(self.offsets[:limit])
+
+        lists = []
+        for gram in _trigrams(fragment):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                lists.append(posting)
+                continue
+            index, mask = _bit(gram)
+            if not self.unindexed[index] & mask:
+                # No line contains this trigram
+                return 0, []
+        if not lists:
+            return self._scan(fragment, limit)
+
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for posting in lists[1:MAX_INTERSECT]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return 0, []
+
+        count = 0
+        found: List[int] = []
+        for line_id in sorted(candidates):
+            if fragment in self._line(line_id):
+                count += 1
+                if len(found) < limit:
+                    found.append(self.offsets[line_id])
+        return count, found
+
+    def line_at(self, offset: int) -> bytes:
+        """Return the line starting at byte ``offset``."""
+        end = self._mm.find(b'\n', offset)
+        if end == -1:
+            end = self.size
+        return self._mm[offset:end].rstrip(b'\r')
+
+    def close(self) -> None:
+        """Release the mapping and file handle."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
@@ -0,0 +1,64 @@
+"""Bounded worker thread pool with admission control."""
+import queue
+import threading
+from typing import Callable
+
+
+class WorkerPool:
+    """Fixed set of worker threads fed from a bounded queue.
+
+    ``submit()`` never blocks: when every worker is busy and the queue is
+    full the job is refused, so the caller can shed load instead of letting
+    latency grow without limit.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[..., None],
+        max_workers: int,
+        queue_size: int
+    ):
+        """Start ``max_workers`` daemon threads that call ``handler``."""
+        self.handler = handler
+        self.max_workers = max_workers
+        # A maxsize of 0 would make the queue unbounded
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.active = 0
+        self._threads = []
+        for i in range(max_workers):
+            t = threading.Thread(
+                target=self._run, name=f"worker-{i}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs accepted but not yet picked up by a worker."""
+        return self._queue.qsize()
+
+    def submit(self, *args) -> bool:
+        """Queue a job, or return False if the pool is saturated."""
+        try:
+            self._queue.put_nowait(args)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+    def _run(self) -> None:
+        """Worker loop: run queued jobs forever."""
+        while True:
+            args = self._queue.get()
+            with self._lock:
+                self.active += 1
+            try:
+                self.handler(*args)
+            except Exception as e:
+                print(f"DEBUG: Worker error: {e}")
+            finally:
+                with self._lock:
+                    self.active -= 1
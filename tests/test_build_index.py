@@ -0,0 +1,57 @@
+"""Index build CLI tests"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import build_index
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_bytes(b"apple\nbanana\n")
+    return path
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['build_index.py', *map(str, args)])
+    build_index.main()
+
+
+def write_config(tmp_path, corpus, engine):
+    config = tmp_path / "config.ini"
+    config.write_text(f"[SERVER]\nlinuxpath = {corpus}\nengine = {engine}\n")
+    return config
+
+
+class TestMain:
+    """Test choosing the engine to build."""
+
+    def test_configured_engine_with_index(self, tmp_path, corpus, monkeypatch):
+        config = write_config(tmp_path, corpus, 'sorted')
+        run(monkeypatch, '--config', config)
+        assert os.path.exists(str(corpus) + '.sorted')
+
+    def test_configured_engine_without_index(
+        self, tmp_path, corpus, monkeypatch, capsys
+    ):
+        config = write_config(tmp_path, corpus, 'set')
+        with pytest.raises(SystemExit) as exc:
+            run(monkeypatch, '--config', config)
+        assert exc.value.code == 2
+        assert "--engine" in capsys.readouterr().err
+
+    def test_engine_flag_overrides_config(self, tmp_path, corpus, monkeypatch):
+        config = write_config(tmp_path, corpus, 'set')
+        run(monkeypatch, '--config', config, '--engine', 'fingerprint')
+        assert os.path.exists(str(corpus) + '.fpidx')
+
+        # A current index passes --check
+        with pytest.raises(SystemExit) as exc:
+            run(monkeypatch, '--config', config, '--engine', 'fingerprint',
+                '--check')
+        assert exc.value.code == 0
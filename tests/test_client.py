@@ -0,0 +1,249 @@
+"""Client library tests against an in-process keep-alive server"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from protocol import RequestReader, format_batch
+from client import (
+    AsyncClient, Client, ConnectionFailed, RequestTimeout, ServerBusy,
+    ServerError, main, search
+)
+
+
+LINES = {b"apple", b"banana", b"::odd"}
+
+
+class FakeServer:
+    """Keep-alive server answering exact and batch queries from LINES."""
+
+    def __init__(self, keepalive=True, stall=False, busy=False):
+        self.keepalive = keepalive
+        self.stall = stall
+        self.busy = busy
+        self.connections = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(
+                target=self._serve, args=(conn,), daemon=True
+            ).start()
+
+    def _serve(self, conn):
+        reader = RequestReader()
+        with conn:
+            if self.busy:
+                conn.sendall(b"SERVER BUSY\n")
+                return
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                if self.stall:
+                    continue
+                out = b"".join(self._answer(r) for r in reader.feed(data))
+                conn.sendall(out)
+                if not self.keepalive:
+                    return
+
+    def _answer(self, request):
+        if request.verb == 'EXISTS':
+            found = request.arg in LINES
+            return b"STRING EXISTS\n" if found else b"STRING NOT FOUND\n"
+        if request.verb == 'BATCH':
+            return format_batch([line in LINES for line in request.lines])
+        return b"ERROR unknown command\n"
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def server():
+    server = FakeServer()
+    yield server
+    server.close()
+
+
+class TestClient:
+    """Test the pooled, pipelining client."""
+
+    def test_exists(self, server):
+        with Client('127.0.0.1', server.port) as client:
+            assert client.exists("apple") is True
+            assert client.exists("cherry") is False
+            # Queries that look like commands are escaped
+            assert client.exists("::odd") is True
+
+    def test_connection_reused(self, server):
+        with Client('127.0.0.1', server.port, pool_size=2) as client:
+            for _ in range(10):
+                client.exists("apple")
+            assert client.connects == 1
+
+    def test_submit_futures(self, server):
+        queries = ["apple", "cherry", "banana"] * 200
+        with Client('127.0.0.1', server.port, pool_size=3) as client:
+            futures = [client.submit(q) for q in queries]
+            results = [future.result(timeout=5) for future in futures]
+            assert client.connects <= 3
+        assert results == [q != "cherry" for q in queries]
+
+    def test_pipeline_without_keepalive(self):
+        server = FakeServer(keepalive=False)
+        try:
+            with Client('127.0.0.1', server.port, keepalive=False) as client:
+                assert client.pipeline(["apple", "cherry"]) == [True, False]
+            assert server.connections == 2
+        finally:
+            server.close()
+
+    def test_exists_many_batches(self, server):
+        queries = ["apple", "cherry", "banana", "date", "apple"]
+        with Client('127.0.0.1', server.port) as client:
+            results = client.exists_many(queries, batch_size=2)
+        assert results == [True, False, True, False, True]
+
+    def test_server_error(self, server):
+        with Client('127.0.0.1', server.port) as client:
+            with pytest.raises(ServerError, match="unknown command"):
+                client.nearest("apple")
+            # The connection stays usable after an error response
+            assert client.exists("apple") is True
+            assert client.connects == 1
+
+    def test_server_busy(self):
+        server = FakeServer(busy=True)
+        try:
+            with Client('127.0.0.1', server.port) as client:
+                with pytest.raises(ServerBusy):
+                    client.exists("apple")
+        finally:
+            server.close()
+
+    def test_connection_refused(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        with Client('127.0.0.1', port) as client:
+            with pytest.raises(ConnectionFailed):
+                client.exists("apple")
+            future = client.submit("apple")
+            with pytest.raises(ConnectionFailed):
+                future.result(timeout=5)
+
+    def test_timeout(self):
+        server = FakeServer(stall=True)
+        try:
+            with Client('127.0.0.1', server.port, timeout=0.2) as client:
+                with pytest.raises(RequestTimeout):
+                    client.exists("apple")
+        finally:
+            server.close()
+
+    def test_query_with_newline_rejected(self, server):
+        with Client('127.0.0.1', server.port) as client:
+            with pytest.raises(ValueError):
+                client.submit("two\nlines").result(timeout=5)
+
+    def test_search_compat(self):
+        server = FakeServer(keepalive=False)
+        try:
+            assert search("apple", '127.0.0.1', server.port) == "STRING EXISTS"
+        finally:
+            server.close()
+
+
+class TestAsyncClient:
+    """Test the asyncio client."""
+
+    def test_exists_and_pipeline(self, server):
+        async def run():
+            async with AsyncClient('127.0.0.1', server.port,
+                                   pool_size=2, max_pipeline=50) as client:
+                single = await client.exists("banana")
+                many = await client.pipeline(["apple", "cherry"] * 100)
+                batch = await client.exists_many(["apple", "date"])
+                return single, many, batch, client.connects
+
+        single, many, batch, connects = asyncio.run(run())
+        assert single is True
+        assert many == [True, False] * 100
+        assert batch == [True, False]
+        assert connects <= 2
+
+    def test_timeout(self):
+        server = FakeServer(stall=True)
+
+        async def run():
+            async with AsyncClient('127.0.0.1', server.port,
+                                   timeout=0.2) as client:
+                await client.exists("apple")
+
+        try:
+            with pytest.raises(RequestTimeout):
+                asyncio.run(run())
+        finally:
+            server.close()
+
+
+    def test_timeout_on_pooled_connection_is_not_retried(self):
+        server = FakeServer()
+
+        async def run():
+            async with AsyncClient('127.0.0.1', server.port,
+                                   timeout=0.5) as client:
+                assert await client.exists("apple") is True
+                server.stall = True
+                start = time.perf_counter()
+                with pytest.raises(RequestTimeout):
+                    await client.exists("apple")
+                return time.perf_counter() - start
+
+        try:
+            elapsed = asyncio.run(run())
+            assert elapsed < 0.9
+            assert server.connections == 1
+        finally:
+            server.close()
+
+
+class TestMain:
+    """Test the command-line client."""
+
+    def test_bulk_stdin(self, server, monkeypatch, capsys):
+        monkeypatch.setattr(sys, 'stdin', iter(["apple\n", "cherry\n"]))
+        assert main(['--host', '127.0.0.1', '--port', str(server.port)]) == 0
+        out, err = capsys.readouterr()
+        assert out.splitlines() == [
+            "apple\tSTRING EXISTS", "cherry\tSTRING NOT FOUND"
+        ]
+        assert "2 queries, 1 found" in err
+
+    def test_batch_mode(self, server, capsys):
+        argv = ['--host', '127.0.0.1', '--port', str(server.port),
+                '--mode', 'batch', '--batch-size', '1', '--quiet',
+                'apple', 'banana', 'cherry']
+        assert main(argv) == 0
+        out, err = capsys.readouterr()
+        assert out == ""
+        assert "3 queries, 2 found" in err
@@ -0,0 +1,188 @@
+"""Benchmark comparison tests"""
+
+import json
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks')
+)
+
+from compare_results import (
+    bootstrap_ratio, compare, describe_thresholds, load_run,
+    mann_whitney_greater, to_markdown, verdict
+)
+
+
+HOST = {
+    'hostname': 'bench-1', 'cpu': 'Test CPU', 'cpu_count': 4,
+    'machine': 'x86_64', 'python': '3.11.7',
+    'python_implementation': 'CPython', 'kernel': '6.1.0',
+}
+
+SETTINGS = {'seed': 0, 'repeats': 5, 'queries': 200}
+
+
+def samples(scale=1.0, n=200, seed=1):
+    rng = random.Random(seed)
+    return [round(scale * rng.uniform(1.0, 1.2), 6) for _ in range(n)]
+
+
+def results(**engines):
+    return {'10000': [
+        {'method': name, 'samples_ms': values}
+        for name, values in engines.items()
+    ]}
+
+
+def write_run(path, data, host=HOST, settings=SETTINGS):
+    with open(path, 'w') as f:
+        json.dump({'host': host, 'settings': settings, 'results': data}, f)
+    return str(path)
+
+
+class TestMannWhitney:
+    """Test the one-sided rank test against hand-computed values."""
+
+    def test_known_answer_with_ties(self):
+        # Ranks of 1 2 2 3 4 5 are 1 2.5 2.5 4 5 6, so b's rank sum is
+        # 13.5 and U = 13.5 - 3 * 4 / 2 = 7.5 against a mean of 4.5. The
+        # tied pair gives a variance of 9 / 12 * (7 - 6 / 30) = 5.1.
+        z = (7.5 - 4.5 - 0.5) / math.sqrt(5.1)
+        expected = 0.5 * math.erfc(z / math.sqrt(2))
+        assert expected == pytest.approx(0.134143, abs=1e-6)
+        assert mann_whitney_greater([1, 2, 3], [2, 4, 5]) == pytest.approx(
+            expected
+        )
+
+    def test_direction(self):
+        a = samples()
+        b = [x + 0.2 for x in a]
+        assert mann_whitney_greater(a, b) < 0.01
+        assert mann_whitney_greater(b, a) > 0.99
+
+    def test_identical_samples(self):
+        a = samples()
+        assert mann_whitney_greater(a, list(a)) > 0.4
+        assert mann_whitney_greater([1.0] * 10, [1.0] * 10) == 1.0
+
+    def test_empty(self):
+        assert mann_whitney_greater([], [1.0]) == 1.0
+
+
+class TestBootstrap:
+    """Test the bootstrap interval of the median ratio."""
+
+    def test_brackets_known_ratio(self):
+        a = samples()
+        low, high = bootstrap_ratio(a, [1.5 * x for x in a], seed=7)
+        assert low < 1.5 < high
+        assert high - low < 0.1
+        assert bootstrap_ratio(a, [1.5 * x for x in a], seed=7) == (low, high)
+
+    def test_zero_baseline(self):
+        low, high = bootstrap_ratio([0.0] * 5, [1.0] * 5, rounds=10)
+        assert math.isnan(low) and math.isnan(high)
+
+
+class TestCompare:
+    """Test the per-engine verdicts."""
+
+    def test_identical_runs_are_unchanged(self):
+        run = results(set=samples(), prefix=samples(seed=2))
+        comparisons = compare(run, run)
+        assert [c['status'] for c in comparisons] == ['unchanged'] * 2
+        assert all(c['change'] == 0 for c in comparisons)
+
+    def test_slowdown_is_a_regression(self):
+        base = results(set=samples(), prefix=samples(seed=2))
+        cand = results(set=samples(2.0, seed=3), prefix=samples(seed=4))
+        by_engine = {c['engine']: c for c in compare(base, cand)}
+
+        assert by_engine['set']['status'] == 'regression'
+        assert by_engine['set']['change'] == pytest.approx(1.0, abs=0.05)
+        assert by_engine['set']['p_slower'] < 1e-6
+        low, high = by_engine['set']['ratio_ci95']
+        assert low < 1.0 < high
+        assert by_engine['prefix']['status'] == 'unchanged'
+
+        # The same slowdown the other way round is an improvement
+        reverse = {c['engine']: c for c in compare(cand, base)}
+        assert reverse['set']['status'] == 'improvement'
+
+    def test_small_change_is_not_flagged(self):
+        base = results(set=samples())
+        cand = results(set=[x * 1.05 for x in samples()])
+        comparison, = compare(base, cand)
+        assert comparison['p_slower'] < 0.01
+        assert comparison['status'] == 'unchanged'
+
+    def test_engine_threshold(self):
+        base = results(set=samples(), prefix=samples(seed=2))
+        cand = results(set=samples(2.0, seed=3), prefix=samples(2.0, seed=4))
+        by_engine = {
+            c['engine']: c
+            for c in compare(base, cand, engine_thresholds={'set': 1.5})
+        }
+        assert by_engine['set']['threshold'] == 1.5
+        assert by_engine['set']['status'] == 'unchanged'
+        assert by_engine['prefix']['status'] == 'regression'
+
+    def test_missing_samples(self):
+        base = {'10000': [{'method': 'set'}]}
+        comparison, = compare(base, results(set=samples()))
+        assert comparison['status'] == 'no samples'
+
+
+class TestVerdict:
+    """Test the verdict built from two results files."""
+
+    def test_regression_fails(self, tmp_path):
+        base = write_run(tmp_path / "base.json", results(set=samples()))
+        cand = write_run(
+            tmp_path / "cand.json", results(set=samples(2.0, seed=3))
+        )
+        result = verdict(base, cand)
+        assert result['like_for_like'] is True
+        assert result['regressions'] == 1
+        assert result['passed'] is False
+        assert "**FAIL**" in to_markdown(result)
+
+    def test_identical_runs_pass(self, tmp_path):
+        base = write_run(tmp_path / "base.json", results(set=samples()))
+        result = verdict(base, base)
+        assert result['passed'] is True
+        assert result['regressions'] == result['improvements'] == 0
+
+    def test_host_and_settings_differences(self, tmp_path):
+        base = write_run(tmp_path / "base.json", results(set=samples()))
+        cand = write_run(
+            tmp_path / "cand.json", results(set=samples()),
+            host=dict(HOST, cpu='Other CPU'),
+            settings=dict(SETTINGS, seed=1)
+        )
+        result = verdict(base, cand)
+        assert result['like_for_like'] is False
+        assert result['host_differences'] == [
+            "cpu: Test CPU -> Other CPU", "seed: 0 -> 1"
+        ]
+
+    def test_old_layout_has_no_host(self, tmp_path):
+        path = tmp_path / "old.json"
+        path.write_text(json.dumps(results(set=samples())))
+        host, data = load_run(str(path))
+        assert host is None
+        assert data['10000'][0]['method'] == 'set'
+
+    def test_thresholds_described(self, tmp_path):
+        base = write_run(
+            tmp_path / "base.json", results(set=samples(), prefix=samples())
+        )
+        result = verdict(base, base, engine_thresholds={'prefix': 0.25})
+        assert describe_thresholds(result) == "10% (prefix 25%)"
+        assert "threshold 10% (prefix 25%)" in to_markdown(result)
+        assert describe_thresholds(verdict(base, base)) == "10%"
@@ -0,0 +1,77 @@
+"""Corpus configuration tests"""
+
+import configparser
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from corpora import DEFAULT_CORPUS, load_corpus_configs
+
+
+def parse(text):
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    return config
+
+
+class TestLoadCorpusConfigs:
+    """Test [SERVER] and [CORPUS:name] parsing."""
+
+    def test_legacy_single_corpus(self):
+        corpora, default = load_corpus_configs(parse(
+            "[SERVER]\nlinuxpath = /data/200k.txt\nREREAD_ON_QUERY = True\n"
+        ))
+
+        assert default == DEFAULT_CORPUS
+        assert list(corpora) == [DEFAULT_CORPUS]
+        assert corpora[DEFAULT_CORPUS].filepath == '/data/200k.txt'
+        assert corpora[DEFAULT_CORPUS].reread is True
+
+    def test_corpus_sections_inherit_server_options(self):
+        corpora, default = load_corpus_configs(parse(
+            "[SERVER]\n"
+            "linuxpath = /data/main.txt\n"
+            "engine = fingerprint\n"
+            "index_path = /var/lib/main.fpidx\n"
+            "cache_entries = 500\n"
+            "[CORPUS:words]\n"
+            "linuxpath = /data/words.txt\n"
+            "[CORPUS:logs]\n"
+            "linuxpath = /data/logs.txt\n"
+            "engine = set\n"
+            "REREAD_ON_QUERY = True\n"
+        ))
+
+        assert default == DEFAULT_CORPUS
+        assert list(corpora) == [DEFAULT_CORPUS, 'words', 'logs']
+        words, logs = corpora['words'], corpora['logs']
+        assert words.engine == 'fingerprint'
+        assert words.cache_entries == 500
+        # The [SERVER] index path belongs to the default corpus only
+        assert words.index_path is None
+        assert corpora[DEFAULT_CORPUS].index_path == '/var/lib/main.fpidx'
+        assert logs.engine == 'set'
+        assert logs.reread is True
+        assert words.reread is False
+
+    def test_default_corpus(self):
+        text = (
+            "[SERVER]\n{}"
+            "[CORPUS:a]\nlinuxpath = /data/a.txt\n"
+            "[CORPUS:b]\nlinuxpath = /data/b.txt\n"
+        )
+        assert load_corpus_configs(parse(text.format("")))[1] == 'a'
+        assert load_corpus_configs(
+            parse(text.format("default_corpus = b\n"))
+        )[1] == 'b'
+        with pytest.raises(ValueError):
+            load_corpus_configs(parse(text.format("default_corpus = c\n")))
+
+    def test_invalid_configs(self):
+        with pytest.raises(ValueError):
+            load_corpus_configs(parse("[SERVER]\nport = 1\n"))
+        with pytest.raises(ValueError):
+            load_corpus_configs(parse("[SERVER]\n[CORPUS:x]\nengine = set\n"))
@@ -0,0 +1,159 @@
+"""FileSearcher reload behaviour tests"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from searcher import FileSearcher
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        f.write("apple\n")
+        f.write("banana\n")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+
+
+class TestIncrementalReload:
+    """Test change-aware reloading in REREAD_ON_QUERY mode."""
+
+    def test_unchanged_file_is_not_reloaded(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True)
+        assert searcher.exists("apple") is True
+
+        lines_set = searcher.lines_set
+        generation = searcher.generation
+        assert searcher.exists("banana") is True
+        assert searcher.lines_set is lines_set
+        assert searcher.generation is generation
+
+    def test_append_ingests_tail_only(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True)
+        assert searcher.exists("apple") is True
+        lines_set = searcher.lines_set
+
+        with open(test_file, 'a') as f:
+            f.write("fig\n")
+
+        assert searcher.exists("fig") is True
+        # Same set object: appended lines were added in place
+        assert searcher.lines_set is lines_set
+
+    def test_unterminated_last_line_is_extended(self, test_file):
+        with open(test_file, 'a') as f:
+            f.write("gra")
+
+        searcher = FileSearcher(test_file, reread_on_query=True)
+        assert searcher.exists("gra") is True
+
+        with open(test_file, 'a') as f:
+            f.write("pe\n")
+
+        assert searcher.exists("grape") is True
+        assert searcher.exists("gra") is False
+
+    def test_rewrite_triggers_full_rebuild(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True)
+        assert searcher.exists("apple") is True
+
+        with open(test_file, 'w') as f:
+            f.write("cherry\ndate\nelderberry\n")
+
+        assert searcher.exists("cherry") is True
+        assert searcher.exists("apple") is False
+
+    def test_truncation_triggers_full_rebuild(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True)
+        assert searcher.exists("banana") is True
+
+        with open(test_file, 'w') as f:
+            f.write("apple\n")
+
+        assert searcher.exists("apple") is True
+        assert searcher.exists("banana") is False
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
+            test_path = f.name
+
+        try:
+            searcher = FileSearcher(test_path, reread_on_query=True)
+            assert searcher.exists("anything") is False
+
+            with open(test_path, 'a') as f:
+                f.write("anything\n")
+
+            assert searcher.exists("anything") is True
+        finally:
+            os.unlink(test_path)
+
+
+class TestExistsMany:
+    """Test batched lookups across engines."""
+
+    @pytest.mark.parametrize('engine', ['set', 'sorted', 'fingerprint'])
+    def test_exists_many(self, test_file, engine):
+        searcher = FileSearcher(test_file, engine=engine)
+        try:
+            assert searcher.exists_many(
+                ["banana", "grape", "apple", "", "banana"]
+            ) == [True, False, True, False, True]
+            assert searcher.exists_many([]) == []
+        finally:
+            searcher.close()
+            for suffix in ('.sorted', '.fpidx'):
+                if os.path.exists(test_file + suffix):
+                    os.unlink(test_file + suffix)
+
+    def test_exists_many_in_reread_mode(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True)
+        assert searcher.exists_many(["fig"]) == [False]
+
+        with open(test_file, 'a') as f:
+            f.write("fig\n")
+
+        assert searcher.exists_many(["fig", "apple"]) == [True, True]
+
+
+class TestResultCache:
+    """Test the result cache in front of the index."""
+
+    def test_repeated_queries_hit_cache(self, test_file):
+        searcher = FileSearcher(test_file, cache_entries=100)
+        assert searcher.exists("apple") is True
+        assert searcher.exists("apple") is True
+        assert searcher.exists_many(["apple", "fig"]) == [True, False]
+        assert searcher.cache.hits == 2
+        assert searcher.cache.misses == 2
+
+    def test_cache_is_invalidated_by_file_change(self, test_file):
+        searcher = FileSearcher(
+            test_file, reread_on_query=True, cache_entries=100
+        )
+        assert searcher.exists("fig") is False
+        assert searcher.exists("fig") is False
+
+        with open(test_file, 'a') as f:
+            f.write("fig\n")
+
+        assert searcher.exists("fig") is True
+        assert searcher.exists_many(["fig", "banana"]) == [True, True]
+
+        with open(test_file, 'w') as f:
+            f.write("cherry\n")
+
+        assert searcher.exists_many(["fig", "cherry"]) == [False, True]
+        assert searcher.exists("banana") is False
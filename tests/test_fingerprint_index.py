@@ -0,0 +1,271 @@
+"""Fingerprint index engine tests"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import fingerprint_index
+from fingerprint_index import FingerprintIndex, split_ranges
+from generation import read_generation
+from searcher import FileSearcher
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='wb',
+        delete=False
+    ) as f:
+        for i in range(1000):
+            f.write(f"line_{i}\n".encode())
+        f.write(b"windows\r\n")
+        f.write("你好\n".encode('utf-8'))
+        f.write(b"last")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+    if os.path.exists(test_path + '.fpidx'):
+        os.unlink(test_path + '.fpidx')
+
+
+class TestFingerprintIndex:
+    """Test the fingerprint index directly."""
+
+    def test_lookup(self, test_file):
+        index = FingerprintIndex(test_file)
+
+        try:
+            assert len(index) == 1003
+            assert index.nbytes == 1003 * 16
+            assert b"line_0" in index
+            assert b"line_999" in index
+            assert b"windows" in index
+            assert "你好".encode('utf-8') in index
+            assert b"last" in index
+            assert b"line_1000" not in index
+            assert b"line_" not in index
+        finally:
+            index.close()
+
+    def test_collisions_are_confirmed(self, test_file, monkeypatch):
+        monkeypatch.setattr(fingerprint_index, 'fingerprint', lambda key: 7)
+        index = FingerprintIndex(test_file)
+
+        try:
+            assert b"line_500" in index
+            assert b"line_5000" not in index
+        finally:
+            index.close()
+
+    def test_contains_many(self, test_file):
+        index = FingerprintIndex(test_file)
+        queries = [b"line_3", b"missing", b"line_998", b"line_3", b"last"]
+
+        try:
+            assert index.contains_many(queries) == [
+                True, False, True, True, True
+            ]
+            assert index.contains_many([]) == []
+        finally:
+            index.close()
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            test_path = f.name
+
+        try:
+            index = FingerprintIndex(test_path)
+            assert len(index) == 0
+            assert b"" not in index
+            assert index.contains_many([b"a"]) == [False]
+            index.close()
+        finally:
+            os.unlink(test_path)
+
+
+class TestParallelBuild:
+    """Test building the index in a process pool."""
+
+    def test_ranges_are_newline_aligned(self, test_file):
+        index = FingerprintIndex(test_file)
+
+        try:
+            mm = index._mm
+            ranges = split_ranges(mm, 7)
+            assert len(ranges) == 7
+            assert ranges[0][0] == 0
+            assert ranges[-1][1] == mm.size()
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                assert end == start
+                assert mm[start - 1:start] == b"\n"
+        finally:
+            index.close()
+
+    def test_more_parts_than_lines(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b"a\nb\n")
+            test_path = f.name
+
+        try:
+            index = FingerprintIndex(test_path)
+            assert split_ranges(index._mm, 8) == [(0, 2), (2, 4)]
+            index.close()
+        finally:
+            os.unlink(test_path)
+
+    def test_matches_sequential_build(self, test_file, monkeypatch):
+        monkeypatch.setattr(fingerprint_index, 'PARALLEL_MIN_BYTES', 0)
+        sequential = FingerprintIndex(test_file)
+        parallel = FingerprintIndex(test_file, workers=3)
+
+        try:
+            assert parallel.fingerprints == sequential.fingerprints
+            assert sorted(parallel.offsets) == sorted(sequential.offsets)
+            assert b"line_123" in parallel
+            assert b"last" in parallel
+        finally:
+            sequential.close()
+            parallel.close()
+
+
+class TestSpilledBuild:
+    """Test building from sorted runs spilled to disk."""
+
+    def test_matches_in_memory_build(self, test_file, monkeypatch):
+        in_memory = FingerprintIndex(test_file)
+        monkeypatch.setattr(fingerprint_index, 'SORT_RUN_LINES', 64)
+        spilled = FingerprintIndex(test_file)
+
+        try:
+            assert spilled.fingerprints == in_memory.fingerprints
+            assert sorted(spilled.offsets) == sorted(in_memory.offsets)
+            assert b"line_500" in spilled
+            assert b"last" in spilled
+        finally:
+            in_memory.close()
+            spilled.close()
+
+    def test_parallel_runs(self, test_file, monkeypatch):
+        sequential = FingerprintIndex(test_file)
+        monkeypatch.setattr(fingerprint_index, 'PARALLEL_MIN_BYTES', 0)
+        monkeypatch.setattr(fingerprint_index, 'SORT_RUN_LINES', 100)
+        parallel = FingerprintIndex(test_file, workers=3)
+
+        try:
+            assert parallel.fingerprints == sequential.fingerprints
+            assert parallel.contains_many(
+                [b"line_9", b"nope", b"line_9", "你好".encode('utf-8')]
+            ) == [True, False, True, True]
+        finally:
+            sequential.close()
+            parallel.close()
+
+    def test_build_memory_is_bounded(self, monkeypatch):
+        lines = 300000
+        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
+            f.write(b"".join(b"row_%d\n" % i for i in range(lines)))
+            test_path = f.name
+
+        monkeypatch.setattr(fingerprint_index, 'SORT_RUN_LINES', 10000)
+        tracemalloc.start()
+        try:
+            index = FingerprintIndex(test_path)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            os.unlink(test_path)
+
+        try:
+            assert len(index) == lines
+            assert b"row_123456" in index
+            # 16 bytes per line for the index, plus one sorted run
+            assert peak < 24 * lines
+        finally:
+            index.close()
+
+
+class TestSavedIndex:
+    """Test saving and reloading the fingerprint index."""
+
+    def test_round_trip(self, test_file):
+        index_path = test_file + '.fpidx'
+        generation = read_generation(test_file)
+        index = FingerprintIndex(test_file)
+        index.save(index_path, generation)
+
+        loaded = FingerprintIndex.load(test_file, index_path, generation)
+        try:
+            assert loaded is not None
+            assert loaded.fingerprints == index.fingerprints
+            assert loaded.offsets == index.offsets
+            assert b"line_7" in loaded
+        finally:
+            index.close()
+            loaded.close()
+
+    def test_stale_index_is_rejected(self, test_file):
+        index_path = test_file + '.fpidx'
+        index = FingerprintIndex(test_file)
+        index.save(index_path, read_generation(test_file))
+        index.close()
+
+        with open(test_file, 'a') as f:
+            f.write("\nfig\n")
+
+        generation = read_generation(test_file)
+        assert FingerprintIndex.load(test_file, index_path, generation) is None
+
+    def test_corrupt_index_is_rejected(self, test_file):
+        index_path = test_file + '.fpidx'
+        generation = read_generation(test_file)
+        index = FingerprintIndex(test_file)
+        index.save(index_path, generation)
+        index.close()
+
+        with open(index_path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\xff")
+
+        assert FingerprintIndex.load(test_file, index_path, generation) is None
+
+    def test_searcher_writes_and_reuses_index(self, test_file, monkeypatch):
+        FileSearcher(test_file, engine='fingerprint').close()
+        assert os.path.exists(test_file + '.fpidx')
+
+        def no_scan(*args):
+            raise AssertionError("index should have been loaded")
+
+        monkeypatch.setattr(fingerprint_index, 'scan_fingerprints', no_scan)
+        searcher = FileSearcher(test_file, engine='fingerprint')
+        assert searcher.exists("line_999") is True
+        searcher.close()
+
+
+class TestFingerprintEngine:
+    """Test FileSearcher with the fingerprint engine."""
+
+    def test_exists(self, test_file):
+        searcher = FileSearcher(test_file, engine='fingerprint')
+
+        assert searcher.exists("line_42") is True
+        assert searcher.exists("line_42 ") is False
+        assert searcher.lines_set is None
+        searcher.close()
+
+    def test_reread_mode(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True,
+                                engine='fingerprint')
+        assert searcher.exists("fig") is False
+
+        with open(test_file, 'a') as f:
+            f.write("\nfig\n")
+
+        assert searcher.exists("fig") is True
+        assert searcher.exists("last") is True
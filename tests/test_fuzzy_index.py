@@ -0,0 +1,140 @@
+"""Symmetric-delete fuzzy index tests"""
+
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fuzzy_index import FuzzyIndex, deletes, edit_distance
+from protocol import ProtocolError, format_fuzzy, parse_distance
+from searcher import FileSearcher
+
+
+LINES = [
+    "hello world", "help", "yellow", "kitten", "sitting", "",
+    "naïve café", "hello world",
+]
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)
+            ))
+        previous = current
+    return previous[-1]
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        for line in LINES:
+            f.write(line + "\n")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+
+
+class TestHelpers:
+    """Test variant generation and bounded edit distance."""
+
+    def test_deletes(self):
+        assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+        assert "" in deletes("ab", 2)
+
+    @pytest.mark.parametrize('a,b', [
+        ("kitten", "sitting"), ("", "abc"), ("flaw", "lawn"), ("same", "same"),
+    ])
+    def test_edit_distance(self, a, b):
+        assert edit_distance(a, b, 10) == levenshtein(a, b)
+        assert edit_distance(a, b, 1) == min(levenshtein(a, b), 2)
+
+
+class TestFuzzyIndex:
+    """Test nearest-line lookups."""
+
+    def test_nearest(self, test_file):
+        index = FuzzyIndex(test_file, max_distance=2)
+        assert index.nearest("hello world", 2) == (0, "hello world")
+        assert index.nearest("helo wrld", 2) == (2, "hello world")
+        assert index.nearest("kiten", 1) == (1, "kitten")
+        assert index.nearest("naive cafe", 2) == (2, "naïve café")
+        assert index.nearest("zzzzzz", 2) is None
+        # Duplicate lines are indexed once
+        assert len(index) == len(set(LINES))
+        index.close()
+
+    def test_distance_capped(self, test_file):
+        index = FuzzyIndex(test_file, max_distance=1)
+        assert index.nearest("sittin", 3) == (1, "sitting")
+        assert index.nearest("kitteeen", 3) is None
+        index.close()
+
+    def test_invalid_settings(self, test_file):
+        with pytest.raises(ValueError):
+            FuzzyIndex(test_file, max_distance=4)
+        with pytest.raises(ValueError):
+            FuzzyIndex(test_file, max_distance=2, prefix_length=2)
+
+    def test_matches_brute_force(self, tmp_path):
+        rng = random.Random(7)
+        lines = [
+            ''.join(rng.choices('abc', k=rng.randint(0, 10)))
+            for _ in range(300)
+        ]
+        path = tmp_path / 'lines.txt'
+        path.write_text('\n'.join(lines) + '\n')
+        index = FuzzyIndex(str(path), max_distance=2, prefix_length=4)
+        for _ in range(200):
+            query = ''.join(rng.choices('abc', k=rng.randint(0, 10)))
+            best = min((levenshtein(query, line) for line in lines))
+            match = index.nearest(query, 2)
+            if best > 2:
+                assert match is None
+            else:
+                assert match[0] == best
+                assert levenshtein(query, match[1]) == best
+        index.close()
+
+
+class TestSearcherFuzzy:
+    """Test fuzzy queries through FileSearcher."""
+
+    def test_enabled(self, test_file):
+        searcher = FileSearcher(test_file, engine='sorted', fuzzy_distance=2)
+        assert searcher.nearest("yelow", 2) == (1, "yellow")
+        searcher.close()
+        os.unlink(test_file + '.sorted')
+
+    def test_disabled(self, test_file):
+        searcher = FileSearcher(test_file)
+        with pytest.raises(ValueError):
+            searcher.nearest("yelow", 1)
+
+
+class TestProtocol:
+    """Test FUZZY argument parsing and responses."""
+
+    def test_parse_distance(self):
+        assert parse_distance(b"2 helo wrld\r") == (2, b"helo wrld")
+        with pytest.raises(ProtocolError):
+            parse_distance(b"x helo")
+        with pytest.raises(ProtocolError):
+            parse_distance(b"-1 helo")
+
+    def test_format_fuzzy(self):
+        assert format_fuzzy((1, b"kitten")) == b"1 kitten\n"
+        assert format_fuzzy(None) == b"STRING NOT FOUND\n"
@@ -0,0 +1,134 @@
+"""Metrics histogram and exposition tests"""
+
+import os
+import sys
+import threading
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import (
+    BUCKET_COUNT, Histogram, Metrics, bucket_index, bucket_upper,
+    serve_metrics
+)
+
+
+class TestHistogram:
+    """Test log-linear bucketing and quantiles."""
+
+    def test_buckets_are_contiguous_and_bounded(self):
+        for micros in [0, 1, 15, 16, 17, 100, 1000, 123456, 10 ** 9]:
+            index = bucket_index(micros)
+            assert micros < bucket_upper(index)
+            if index:
+                assert bucket_upper(index - 1) <= micros
+            # Relative error of a bucket is at most 1/8
+            assert bucket_upper(index) <= micros * 1.125 + 1
+
+    def test_huge_values_land_in_last_bucket(self):
+        assert bucket_index(2 ** 60) == BUCKET_COUNT - 1
+
+    def test_quantiles(self):
+        histogram = Histogram()
+        for _ in range(990):
+            histogram.record(0.001)
+        for _ in range(10):
+            histogram.record(0.100)
+
+        assert histogram.count == 1000
+        assert 0.001 <= histogram.quantile(0.5) <= 0.001125
+        assert 0.001 <= histogram.quantile(0.99) <= 0.001125
+        assert 0.1 <= histogram.quantile(0.999) <= 0.1125
+        assert Histogram().quantile(0.99) == 0.0
+
+
+class TestMetrics:
+    """Test per-thread recording and Prometheus rendering."""
+
+    def test_threads_are_merged(self):
+        metrics = Metrics()
+
+        def work():
+            for _ in range(100):
+                metrics.observe('search', 0.0005)
+                metrics.inc('hits')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        metrics.inc('misses', 3)
+
+        histograms, counters = metrics.snapshot()
+        assert histograms['search', ''].count == 400
+        assert counters['hits', ''] == 400
+        assert counters['misses', ''] == 3
+
+    def test_render(self):
+        metrics = Metrics()
+        metrics.observe('send', 0.002)
+        metrics.inc('hits', 2)
+        metrics.inc('errors')
+        metrics.gauge('index_lines', "Lines in the loaded index.", lambda: 42)
+
+        text = metrics.render()
+        assert 'string_search_requests_total{result="hit"} 2\n' in text
+        assert 'string_search_requests_total{result="miss"} 0\n' in text
+        assert 'string_search_errors_total 1\n' in text
+        assert 'string_search_stage_seconds_count{stage="send"} 1\n' in text
+        assert 'string_search_stage_seconds_count{stage="search"} 0\n' in text
+        assert '# TYPE string_search_index_lines gauge\n' in text
+        assert 'string_search_index_lines 42\n' in text
+
+    def test_corpus_labels(self):
+        metrics = Metrics()
+        metrics.observe('search', 0.001, 'words')
+        metrics.inc('hits', 3, 'words')
+        metrics.inc('misses', 1, 'logs')
+        metrics.gauge(
+            'index_lines', "Lines in the loaded index.",
+            lambda: {'words': 10, 'logs': 20}
+        )
+
+        lines = metrics.render().splitlines()
+        assert (
+            'string_search_requests_total{corpus="words",result="hit"} 3'
+            in lines
+        )
+        assert (
+            'string_search_requests_total{corpus="logs",result="miss"} 1'
+            in lines
+        )
+        assert (
+            'string_search_stage_seconds_count{stage="search",corpus="words"} 1'
+            in lines
+        )
+        assert 'string_search_index_lines{corpus="logs"} 20' in lines
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        metrics.inc('hits', 1, 'a"b\\c\nd')
+        lines = metrics.render().splitlines()
+        assert (
+            'string_search_requests_total{corpus="a\\"b\\\\c\\nd",'
+            'result="hit"} 1' in lines
+        )
+
+    def test_http_endpoint(self):
+        metrics = Metrics()
+        metrics.inc('hits')
+        server = serve_metrics(metrics, '127.0.0.1', 0)
+        try:
+            port = server.server_address[1]
+            url = f'http://127.0.0.1:{port}/metrics'
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers['Content-Type'].startswith(
+                    'text/plain'
+                )
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert 'string_search_requests_total{result="hit"} 1' in body
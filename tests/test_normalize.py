@@ -0,0 +1,119 @@
+"""Normalized matching tests"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from normalize import NormalizedIndex, Normalizer
+from protocol import RequestReader
+from searcher import FileSearcher
+
+
+LINES = [
+    "hello world", "Hello  World", "Straße", "ﬁle", "café", "café",
+    "  padded ", "ǰ",
+]
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        for line in LINES:
+            f.write(line + "\n")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+
+
+class TestNormalizer:
+    """Test the normalization steps."""
+
+    def test_steps(self):
+        normalize = Normalizer(['casefold', 'nfkc', 'whitespace'])
+        assert normalize("  Hello \t World ") == "hello world"
+        assert normalize("STRASSE") == normalize("Straße") == "strasse"
+        assert normalize("ﬁle") == "file"
+        assert normalize("café") == normalize("café")
+
+    def test_idempotent(self):
+        normalize = Normalizer(['casefold', 'nfc'])
+        for line in LINES:
+            assert normalize(normalize(line)) == normalize(line)
+
+    def test_from_spec(self):
+        assert Normalizer.from_spec(None) is None
+        assert Normalizer.from_spec(" ") is None
+        assert Normalizer.from_spec("lower, nfc").steps == ('lower', 'nfc')
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            Normalizer(['upper'])
+        with pytest.raises(ValueError):
+            Normalizer(['nfc', 'nfkc'])
+
+
+class TestNormalizedIndex:
+    """Test that only changed lines are stored."""
+
+    def test_only_changed_lines(self, test_file):
+        index = NormalizedIndex(test_file, Normalizer(['casefold', 'nfc']))
+        # "hello world", "  padded ", the precomposed "café" and "ǰ"
+        # already normalize to themselves
+        assert index.keys == {
+            "hello  world".encode(), b"strasse", b"file", "café".encode(),
+        }
+        assert "straße".casefold().encode() in index
+        assert b"hello world" not in index
+
+
+class TestSearcherNormalized:
+    """Test exact and normalized lookups from the same searcher."""
+
+    @pytest.mark.parametrize('engine', ['set', 'sorted', 'fingerprint'])
+    def test_both_modes(self, test_file, engine):
+        searcher = FileSearcher(
+            test_file, engine=engine, normalize="casefold, nfkc, whitespace"
+        )
+        assert searcher.exists_normalized("HELLO WORLD")
+        assert searcher.exists_normalized("strasse")
+        assert searcher.exists_normalized("FILE")
+        assert searcher.exists_normalized("padded")
+        assert not searcher.exists_normalized("goodbye")
+        assert searcher.exists("Hello  World")
+        assert not searcher.exists("HELLO WORLD")
+        searcher.close()
+        for suffix in ('.sorted', '.fpidx'):
+            if os.path.exists(test_file + suffix):
+                os.unlink(test_file + suffix)
+
+    def test_reread_sees_appends(self, test_file):
+        searcher = FileSearcher(
+            test_file, reread_on_query=True, normalize="casefold"
+        )
+        assert not searcher.exists_normalized("new LINE")
+        with open(test_file, 'a', encoding='utf-8') as f:
+            f.write("New Line\n")
+        assert searcher.exists_normalized("new LINE")
+
+    def test_disabled(self, test_file):
+        searcher = FileSearcher(test_file)
+        with pytest.raises(ValueError):
+            searcher.exists_normalized("hello world")
+
+
+def test_norm_command():
+    reader = RequestReader()
+    request, = reader.feed(b"::NORM@words Hello World\n")
+    assert (request.verb, request.arg, request.corpus) == (
+        'NORM', b"Hello World", 'words'
+    )
@@ -0,0 +1,143 @@
+"""Front-coded prefix index tests"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from index_format import KIND_PREFIX, read_header
+from prefix_index import PrefixIndex, build_prefix_index
+from searcher import FileSearcher
+
+
+WORDS = [
+    "apple", "applesauce", "application", "apply", "apricot", "banana",
+    "band", "bandana", "bandit", "can", "candle", "candy", "cane", "",
+    "zebra", "apple",
+]
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        for word in WORDS:
+            f.write(word + "\n")
+        for i in range(500):
+            f.write(f"item_{i:04d}\n")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+    if os.path.exists(test_path + '.prefix'):
+        os.unlink(test_path + '.prefix')
+
+
+@pytest.fixture
+def index(test_file):
+    build_prefix_index(test_file, test_file + '.prefix', block_size=4)
+    index = PrefixIndex(test_file + '.prefix')
+    yield index
+    index.close()
+
+
+class TestPrefixIndex:
+    """Test building and querying the front-coded index."""
+
+    def test_build(self, test_file):
+        count = build_prefix_index(test_file, test_file + '.prefix')
+        assert count == len(set(WORDS)) + 500
+
+        header = read_header(test_file + '.prefix')
+        assert header.kind == KIND_PREFIX
+        assert header.count == count
+        # Sorted keys with shared prefixes are stored smaller than the file
+        assert os.path.getsize(test_file + '.prefix') < os.path.getsize(
+            test_file
+        )
+
+    def test_exact_lookup(self, index):
+        for word in set(WORDS):
+            assert word.encode() in index
+        for i in range(500):
+            assert f"item_{i:04d}".encode() in index
+        for missing in [b"appl", b"applez", b"aaa", b"zzz", b"item_0500"]:
+            assert missing not in index
+
+    def test_prefix(self, index):
+        assert index.prefix(b"app", 10) == [
+            b"apple", b"applesauce", b"application", b"apply"
+        ]
+        assert index.prefix(b"band", 2) == [b"band", b"bandana"]
+        assert index.prefix(b"cat", 10) == []
+        assert index.prefix(b"zebra", 10) == [b"zebra"]
+        assert len(index.prefix(b"item_", 1000)) == 500
+
+    def test_continuation(self, index):
+        pages = []
+        after = None
+        while True:
+            page = index.prefix(b"item_01", 7, after)
+            if not page:
+                break
+            pages.extend(page)
+            after = page[-1]
+
+        assert pages == [f"item_{i:04d}".encode() for i in range(100, 200)]
+
+    def test_empty_corpus(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            test_path = f.name
+        try:
+            assert build_prefix_index(test_path, test_path + '.prefix') == 0
+            index = PrefixIndex(test_path + '.prefix')
+            assert b"x" not in index
+            assert index.prefix(b"", 10) == []
+            index.close()
+        finally:
+            os.unlink(test_path)
+            os.unlink(test_path + '.prefix')
+
+
+class TestPrefixEngine:
+    """Test prefix queries through FileSearcher."""
+
+    def test_exists_and_prefix(self, test_file):
+        searcher = FileSearcher(test_file, engine='prefix')
+        try:
+            assert searcher.exists("apricot") is True
+            assert searcher.exists("apri") is False
+
+            lines, cursor = searcher.prefix("ban", 2)
+            assert lines == ["banana", "band"]
+            lines, cursor = searcher.prefix("ban", 2, cursor)
+            assert lines == ["bandana", "bandit"]
+            assert cursor is None
+        finally:
+            searcher.close()
+
+    def test_reread_sees_new_lines(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True, engine='prefix')
+        try:
+            assert searcher.prefix("cand", 10) == (["candle", "candy"], None)
+
+            with open(test_file, 'a') as f:
+                f.write("candor\n")
+
+            assert searcher.prefix("cand", 10) == (
+                ["candle", "candor", "candy"], None
+            )
+        finally:
+            searcher.close()
+
+    def test_other_engines_reject_prefix(self, test_file):
+        searcher = FileSearcher(test_file)
+        with pytest.raises(ValueError):
+            searcher.prefix("app", 10)
@@ -0,0 +1,170 @@
+"""Wire protocol helper tests"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from protocol import (
+    LineBuffer, ProtocolError, Request, RequestReader, decode_cursor,
+    encode_cursor, format_batch, format_prefix, parse_limit
+)
+
+
+class TestLineBuffer:
+    """Test splitting a stream into query lines."""
+
+    def test_complete_lines(self):
+        buffer = LineBuffer()
+        assert buffer.feed(b"apple\nbanana\n") == [b"apple", b"banana"]
+        assert buffer.pending == b""
+
+    def test_line_split_across_reads(self):
+        buffer = LineBuffer()
+        assert buffer.feed(b"app") == []
+        assert buffer.feed(b"le\nban") == [b"apple"]
+        assert buffer.pending == b"ban"
+        assert buffer.feed(b"ana\n") == [b"banana"]
+
+    def test_empty_lines_are_queries(self):
+        buffer = LineBuffer()
+        assert buffer.feed(b"\n\r\n") == [b"", b"\r"]
+
+    def test_overlong_line_rejected(self):
+        buffer = LineBuffer(max_line=8)
+        assert buffer.feed(b"12345678\n") == [b"12345678"]
+        with pytest.raises(ProtocolError):
+            buffer.feed(b"123456789")
+
+
+class TestRequestReader:
+    """Test parsing queries and commands."""
+
+    def test_plain_queries(self):
+        reader = RequestReader()
+        assert reader.feed(b"apple\nbanana\n") == [
+            Request('EXISTS', b"apple"),
+            Request('EXISTS', b"banana"),
+        ]
+
+    def test_batch_collects_following_lines(self):
+        reader = RequestReader()
+        assert reader.feed(b"::BATCH 3\napple\n") == []
+        assert reader.in_batch is True
+        assert reader.feed(b"::BATCH 1\n\nnext\n") == [
+            Request('BATCH', b"3", (b"apple", b"::BATCH 1", b"")),
+            Request('EXISTS', b"next"),
+        ]
+        assert reader.in_batch is False
+
+    def test_empty_batch(self):
+        reader = RequestReader()
+        assert reader.feed(b"::batch 0\n") == [Request('BATCH', b"0", ())]
+
+    def test_batch_limit(self):
+        reader = RequestReader(max_batch=2)
+        with pytest.raises(ProtocolError):
+            reader.feed(b"::BATCH 3\n")
+        with pytest.raises(ProtocolError):
+            RequestReader().feed(b"::BATCH many\n")
+
+    def test_batch_byte_limit(self):
+        # Each line counts with its newline: 4 + 4 bytes fit, 12 do not
+        reader = RequestReader(max_batch_bytes=8)
+        assert reader.feed(b"::BATCH 2\nabc\ndef\n") == [
+            Request('BATCH', b"2", (b"abc", b"def"))
+        ]
+        reader.feed(b"::BATCH 3\nabc\ndef\n")
+        with pytest.raises(ProtocolError):
+            reader.feed(b"ghi\n")
+
+    def test_escaped_query_and_unknown_verb(self):
+        reader = RequestReader()
+        assert reader.feed(b"::EXISTS ::odd line\n::NOPE x\n") == [
+            Request('EXISTS', b"::odd line"),
+            Request('NOPE', b"x"),
+        ]
+
+    def test_commands_disabled_without_prefix(self):
+        reader = RequestReader(prefix='')
+        assert reader.feed(b"::BATCH 2\n") == [
+            Request('EXISTS', b"::BATCH 2")
+        ]
+
+    def test_finish(self):
+        reader = RequestReader()
+        reader.feed(b"apple\nban")
+        assert reader.finish() == [Request('EXISTS', b"ban")]
+
+        reader = RequestReader()
+        reader.feed(b"::BATCH 2\na\nb")
+        assert reader.finish() == [Request('BATCH', b"2", (b"a", b"b"))]
+
+        reader = RequestReader()
+        reader.feed(b"::BATCH 3\na\n")
+        with pytest.raises(ProtocolError):
+            reader.finish()
+
+    def test_corpus_on_verb(self):
+        reader = RequestReader()
+        assert reader.feed(b"::EXISTS@words apple\n::BATCH@logs 1\nx\n") == [
+            Request('EXISTS', b"apple", corpus='words'),
+            Request('BATCH', b"1", (b"x",), 'logs'),
+        ]
+        # Naming a corpus on a verb does not change the connection's corpus
+        assert reader.feed(b"plain\n") == [Request('EXISTS', b"plain")]
+
+    def test_use_switches_corpus(self):
+        reader = RequestReader(corpora={'words', 'logs'})
+        assert reader.feed(b"::USE words\napple\n::BATCH 1\nx\n") == [
+            Request('USE', b"words", corpus='words'),
+            Request('EXISTS', b"apple", corpus='words'),
+            Request('BATCH', b"1", (b"x",), 'words'),
+        ]
+        assert reader.feed(b"::EXISTS@logs y\n") == [
+            Request('EXISTS', b"y", corpus='logs')
+        ]
+
+    def test_use_unknown_corpus_keeps_current(self):
+        reader = RequestReader(corpora={'words'})
+        reader.feed(b"::USE words\n")
+        assert reader.feed(b"::USE nope\napple\n") == [
+            Request('USE', b"nope", corpus='nope'),
+            Request('EXISTS', b"apple", corpus='words'),
+        ]
+        assert RequestReader().feed(b"::USE\napple\n") == [
+            Request('USE'), Request('EXISTS', b"apple")
+        ]
+
+
+def test_format_batch():
+    assert format_batch([True, False, True]) == b"101\n"
+    assert format_batch([]) == b"\n"
+
+
+def test_parse_limit():
+    assert parse_limit(b"10 new york", 1000) == (10, b"new york")
+    assert parse_limit(b"5000 a\r", 1000) == (1000, b"a")
+    assert parse_limit(b"3", 1000) == (3, b"")
+    with pytest.raises(ProtocolError):
+        parse_limit(b"x abc", 1000)
+    with pytest.raises(ProtocolError):
+        parse_limit(b"0 abc", 1000)
+
+
+def test_cursor_round_trip():
+    token = encode_cursor(b"new y", b"new york city")
+    assert decode_cursor(token.encode()) == (b"new y", b"new york city")
+    with pytest.raises(ProtocolError):
+        decode_cursor(b"not hex")
+    with pytest.raises(ProtocolError):
+        decode_cursor(b"6162")
+
+
+def test_format_prefix():
+    assert format_prefix([b"band", b"bandana"], "abc") == (
+        b"2 abc\nband\nbandana\n"
+    )
+    assert format_prefix([], None) == b"0 -\n"
@@ -0,0 +1,155 @@
+"""Hot reload tests"""
+
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from corpora import CorpusConfig, open_searcher
+from reloader import Reloader, peak_rss_bytes, reset_peak_rss
+
+
+def corpus_config(name, path, **overrides):
+    settings = dict(
+        name=name, filepath=path, reread=False, engine='set',
+        index_path=None, persist_index=True, build_workers=1,
+        cache_entries=0, cache_bytes=0, substring=False,
+        substring_budget=0, fuzzy_distance=0, fuzzy_prefix_length=7,
+        normalize=None,
+    )
+    settings.update(overrides)
+    return CorpusConfig(**settings)
+
+
+@pytest.fixture
+def corpus():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        f.write("old line\n")
+        test_path = f.name
+
+    corpora = {'default': corpus_config('default', test_path)}
+    searchers = {'default': open_searcher(corpora['default'])}
+    yield test_path, corpora, searchers
+
+    os.unlink(test_path)
+
+
+def replace_file(path, text):
+    """Replace ``path`` the way deploy tools do: write aside, then rename."""
+    tmp_path = path + '.new'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class TestReloader:
+    """Test rebuilding and swapping searchers."""
+
+    def test_reload_swaps_searcher(self, corpus):
+        path, corpora, searchers = corpus
+        reloader = Reloader(searchers, corpora)
+        old = searchers['default']
+        replace_file(path, "new line\n")
+
+        assert reloader.stale() == ['default']
+        timings = reloader.reload()
+
+        assert list(timings) == ['default']
+        assert searchers['default'] is not old
+        assert searchers['default'].exists("new line")
+        assert not searchers['default'].exists("old line")
+        # A query holding the old searcher still sees the old generation
+        assert old.exists("old line")
+        assert reloader.reloads == 1
+        assert reloader.last_peak_rss > 0
+        assert reloader.stale() == []
+
+    def test_peak_rss_is_per_reload(self, corpus):
+        _, corpora, searchers = corpus
+        reset_peak_rss()
+        before = peak_rss_bytes()
+        # Raise the process's lifetime peak well above the reload's
+        blob = b"x" * (128 * 1024 * 1024)
+        del blob
+        lifetime_peak = resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss * 1024
+        if peak_rss_bytes() < before + 64 * 1024 * 1024:
+            pytest.skip("peak RSS is not tracked through procfs here")
+
+        reloader = Reloader(searchers, corpora)
+        reloader.reload()
+        if reloader.last_peak_rss >= lifetime_peak:
+            pytest.skip("peak RSS cannot be reset on this kernel")
+        assert 0 < reloader.last_peak_rss < lifetime_peak - 64 * 1024 * 1024
+
+    def test_old_searcher_is_closed(self, corpus):
+        path, corpora, searchers = corpus
+        closed = []
+        old = searchers['default']
+        old.close = lambda: closed.append(True)
+
+        reloader = Reloader(searchers, corpora, close_delay=0.05)
+        replace_file(path, "new line\n")
+        reloader.reload()
+        # Queries already holding it get the grace period
+        assert closed == []
+        deadline = time.monotonic() + 5
+        while not closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert closed == [True]
+
+    def test_failed_reload_keeps_old_searcher(self, corpus):
+        path, corpora, searchers = corpus
+        old = searchers['default']
+
+        def broken(config):
+            raise OSError("disk on fire")
+
+        reloader = Reloader(searchers, corpora, opener=broken)
+        assert reloader.reload() == {}
+        assert searchers['default'] is old
+        assert reloader.failures == 1
+
+    def test_unknown_corpus(self, corpus):
+        _, corpora, searchers = corpus
+        with pytest.raises(ValueError):
+            Reloader(searchers, corpora).reload(['nope'])
+
+    def test_request_runs_in_background(self, corpus):
+        path, corpora, searchers = corpus
+        reloader = Reloader(searchers, corpora)
+        replace_file(path, "new line\n")
+
+        reloader.request()
+        deadline = time.monotonic() + 5
+        while reloader.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert searchers['default'].exists("new line")
+
+    def test_watch_reloads_changed_files(self, corpus):
+        path, corpora, searchers = corpus
+        reloader = Reloader(searchers, corpora)
+        reloader.watch(0.05)
+        replace_file(path, "watched line\n")
+
+        deadline = time.monotonic() + 5
+        while reloader.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert searchers['default'].exists("watched line")
+
+    def test_reread_corpora_are_not_watched(self, corpus):
+        path, corpora, searchers = corpus
+        corpora['default'] = corpus_config('default', path, reread=True)
+        searchers['default'] = open_searcher(corpora['default'])
+        replace_file(path, "new line\n")
+        assert Reloader(searchers, corpora).stale() == []
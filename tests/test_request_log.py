@@ -0,0 +1,84 @@
+"""Request logger tests"""
+
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from request_log import RequestLogger
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestRequestLogger:
+    """Test JSON output, sampling and the queue bound."""
+
+    def test_writes_json_lines(self):
+        stream = io.StringIO()
+        logger = RequestLogger(stream)
+        logger.start()
+
+        logger.request(('127.0.0.1', 5000), "apple", 0.1234, 'EXISTS')
+        logger.error(('127.0.0.1', 5001), "timed out")
+        logger.flush()
+
+        query, error = records(stream)
+        assert query['event'] == 'query'
+        assert query['ip'] == '127.0.0.1'
+        assert query['query'] == 'apple'
+        assert query['ms'] == 0.123
+        assert query['result'] == 'EXISTS'
+        assert 'ts' in query
+        assert error['event'] == 'error'
+        assert error['error'] == 'timed out'
+
+    def test_long_queries_are_truncated(self):
+        stream = io.StringIO()
+        logger = RequestLogger(stream)
+        logger.start()
+
+        logger.request(('127.0.0.1', 5000), "x" * 1000, 1.0, 'NOT_FOUND')
+        logger.flush()
+
+        assert len(records(stream)[0]['query']) == 50
+
+    def test_sampling_keeps_errors_and_slow_queries(self):
+        stream = io.StringIO()
+        logger = RequestLogger(stream, sample_rate=0.0, slow_ms=10.0)
+        logger.start()
+
+        for _ in range(100):
+            logger.request(('127.0.0.1', 5000), "fast", 0.5, 'EXISTS')
+        logger.request(('127.0.0.1', 5000), "slow", 25.0, 'EXISTS')
+        logger.error(('127.0.0.1', 5000), "boom")
+        logger.flush()
+
+        assert [r.get('query', r['event']) for r in records(stream)] == [
+            'slow', 'error'
+        ]
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        stream = io.StringIO()
+        logger = RequestLogger(stream, queue_size=5)
+
+        # Writer not started yet, so nothing drains the queue
+        for i in range(20):
+            logger.request(('127.0.0.1', 5000), str(i), 0.1, 'EXISTS')
+        assert logger.dropped == 15
+
+        logger.start()
+        logger.flush()
+        logger.request(('127.0.0.1', 5000), "after", 0.1, 'EXISTS')
+        logger.flush()
+
+        written = records(stream)
+        assert [r['query'] for r in written if r['event'] == 'query'] == [
+            '0', '1', '2', '3', '4', 'after'
+        ]
+        assert {'event': 'dropped', 'count': 15}.items() <= [
+            r for r in written if r['event'] == 'dropped'
+        ][0].items()
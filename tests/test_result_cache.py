@@ -0,0 +1,68 @@
+"""Result cache tests"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from result_cache import ENTRY_OVERHEAD, ResultCache
+
+
+class TestResultCache:
+    """Test LRU eviction, bounds and generation invalidation."""
+
+    def test_hit_and_miss(self):
+        cache = ResultCache(max_entries=10)
+        assert cache.get(b"apple", 1) is None
+        cache.put(b"apple", 1, True)
+        cache.put(b"fig", 1, False)
+
+        assert cache.get(b"apple", 1) is True
+        assert cache.get(b"fig", 1) is False
+        assert cache.hits == 2
+        assert cache.misses == 1
+        assert cache.hit_ratio == pytest.approx(2 / 3)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        cache.get(b"a", 1)
+        cache.put(b"a", 1, True)
+        cache.put(b"b", 1, True)
+        assert cache.get(b"a", 1) is True
+
+        cache.put(b"c", 1, True)
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        assert cache.get(b"b", 1) is None
+        assert cache.get(b"a", 1) is True
+        assert cache.get(b"c", 1) is True
+
+    def test_byte_bound(self):
+        entry = sys.getsizeof(b"k0") + ENTRY_OVERHEAD
+        cache = ResultCache(max_bytes=entry * 3)
+        cache.get(b"k0", 1)
+        for i in range(5):
+            cache.put(f"k{i}".encode(), 1, True)
+
+        assert len(cache) == 3
+        assert cache.nbytes <= cache.max_bytes
+        assert cache.evictions == 2
+
+    def test_new_generation_invalidates(self):
+        cache = ResultCache(max_entries=10)
+        cache.get(b"apple", 1)
+        cache.put(b"apple", 1, True)
+
+        assert cache.get(b"apple", 2) is None
+        assert len(cache) == 0
+        assert cache.invalidations == 1
+
+        # A result computed against the old generation is not stored
+        cache.put(b"apple", 1, True)
+        assert len(cache) == 0
+
+    def test_needs_a_bound(self):
+        with pytest.raises(ValueError):
+            ResultCache()
@@ -0,0 +1,294 @@
+"""search functionality test"""
+
+import pytest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from searcher import ENGINES, FileSearcher, register_engine
+
+
+def open_searcher(path, engine='set', **kwargs):
+    """Open a searcher that leaves no index file behind."""
+    return FileSearcher(path, engine=engine, persist_index=False, **kwargs)
+
+
+def remove_index(path, engine):
+    index_path = path + ENGINES[engine].index_suffix
+    if index_path != path and os.path.exists(index_path):
+        os.unlink(index_path)
+
+
+class TestFileSearcher:
+    """Test FileSearcher class."""
+
+    @pytest.fixture
+    def test_file(self):
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False,
+            encoding='utf-8'
+        ) as f:
+            f.write("apple\n")
+            f.write("banana\n")
+            f.write("cherry\n")
+            f.write("date\n")
+            f.write("elderberry\n")
+            test_path = f.name
+
+        yield test_path
+
+        for engine in ENGINES:
+            remove_index(test_path, engine)
+        os.unlink(test_path)
+
+    def test_string_exists(self, test_file):
+        """Test finding existing string."""
+        searcher = open_searcher(test_file)
+        assert searcher.exists("apple") is True
+
+    def test_string_not_found(self, test_file):
+        searcher = open_searcher(test_file)
+        assert searcher.exists("grape") is False
+
+    def test_partial_match_rejected(self, test_file):
+        """Ensure partial matches don't count."""
+        # Add a line with "app" as substring
+        with open(test_file, 'a') as f:
+            f.write("pineapple\n")
+
+        searcher = open_searcher(test_file)
+
+        assert searcher.exists("app") is False
+        assert searcher.exists("apple") is True
+
+    def test_exact_match_only(self, test_file):
+        """Test that only exact line matches count."""
+        with open(test_file, 'a') as f:
+            f.write("hello world\n")
+
+        searcher = open_searcher(test_file)
+
+        # Should not find partial
+        assert searcher.exists("hello") is False
+        assert searcher.exists("world") is False
+
+        # Should find exact
+        assert searcher.exists("hello world") is True
+
+    def test_empty_file(self):
+        """Test searching empty file."""
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False
+        ) as f:
+            test_path = f.name
+
+        try:
+            searcher = open_searcher(test_path)
+            assert searcher.exists("anything") is False
+        finally:
+            os.unlink(test_path)
+
+    def test_empty_query(self, test_file):
+        """Test searching for empty string."""
+        # Add empty line to file
+        with open(test_file, 'a') as f:
+            f.write("\n")
+
+        searcher = open_searcher(test_file)
+        assert searcher.exists("") is True
+
+    def test_unicode_characters(self):
+        """Test handling Unicode characters."""
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False,
+            encoding='utf-8'
+        ) as f:
+            f.write("hello\n")
+            f.write("你好\n")
+            f.write("مرحبا\n")
+            f.write("🍎\n")
+            test_path = f.name
+
+        try:
+            searcher = open_searcher(test_path)
+
+            assert searcher.exists("你好") is True
+            assert searcher.exists("مرحبا") is True
+            assert searcher.exists("🍎") is True
+            assert searcher.exists("你") is False
+        finally:
+            os.unlink(test_path)
+
+    def test_reread_on_query_mode(self, test_file):
+        """Test REREAD_ON_QUERY mode."""
+        searcher = open_searcher(test_file, reread_on_query=True)
+
+        # finds existing
+        assert searcher.exists("apple") is True
+
+        # Add new line to file
+        with open(test_file, 'a') as f:
+            f.write("fig\n")
+
+        # finds newly added line
+        assert searcher.exists("fig") is True
+
+    def test_cached_mode(self, test_file):
+        """Test cached mode (REREAD_ON_QUERY=False)."""
+        searcher = open_searcher(test_file)
+
+        # Should find existing
+        assert searcher.exists("apple") is True
+
+        # Add new line to file
+        with open(test_file, 'a') as f:
+            f.write("fig\n")
+
+        # Should NOT find newly added line (cached)
+        assert searcher.exists("fig") is False
+
+    def test_large_file(self):
+        """Test lookups in a larger file."""
+        # Create file with 10,000 lines
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False,
+            encoding='utf-8'
+        ) as f:
+            for i in range(10000):
+                f.write(f"line_{i:06d}\n")
+            test_path = f.name
+
+        try:
+            searcher = open_searcher(test_path)
+
+            # Search for string at end
+            assert searcher.exists("line_009999") is True
+
+            # Search for non-existent
+            assert searcher.exists("line_999999") is False
+        finally:
+            os.unlink(test_path)
+
+
+class TestEngines:
+    """Test every registered engine through the same code path."""
+
+    @pytest.fixture
+    def test_file(self):
+        """Create temporary test file."""
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False,
+            encoding='utf-8'
+        ) as f:
+            for i in range(1000):
+                f.write(f"test_line_{i}\n")
+            test_path = f.name
+
+        yield test_path
+        for engine in ENGINES:
+            remove_index(test_path, engine)
+        os.unlink(test_path)
+
+    @pytest.mark.parametrize('engine', list(ENGINES))
+    def test_engine_lookups(self, test_file, engine):
+        searcher = FileSearcher(test_file, engine=engine)
+        try:
+            assert searcher.exists("test_line_500") is True
+            assert searcher.exists("test_line_999") is True
+            assert searcher.exists("test_line_1000") is False
+            assert searcher.exists("test_line_") is False
+        finally:
+            searcher.close()
+
+    @pytest.mark.parametrize('engine', list(ENGINES))
+    def test_engine_reuses_index_file(self, test_file, engine):
+        FileSearcher(test_file, engine=engine).close()
+        searcher = FileSearcher(test_file, engine=engine)
+        try:
+            assert searcher.exists("test_line_0") is True
+        finally:
+            searcher.close()
+
+    def test_registered_engine(self, test_file):
+        class ListIndex:
+            def __init__(self, path):
+                with open(path, 'rb') as f:
+                    self.lines = f.read().splitlines()
+                self.closed = False
+
+            def __contains__(self, key):
+                return key in self.lines
+
+            def close(self):
+                self.closed = True
+
+        def load_list(searcher):
+            searcher.index = ListIndex(searcher.filepath)
+
+        register_engine('list', load_list)
+        try:
+            searcher = FileSearcher(test_file, engine='list')
+            assert searcher.exists_many(
+                ["test_line_7", "nope"]
+            ) == [True, False]
+            searcher.close()
+            assert searcher.index.closed
+        finally:
+            del ENGINES['list']
+
+    def test_unknown_engine(self, test_file):
+        with pytest.raises(ValueError, match="Unknown engine"):
+            FileSearcher(test_file, engine='btree')
+
+
+class TestEdgeCases:
+    """Test edge cases and error handling."""
+
+    def test_file_not_found(self):
+        """Test handling of non-existent file."""
+        with pytest.raises(FileNotFoundError):
+            FileSearcher("/nonexistent/path/file.txt")
+
+    def test_very_long_line(self):
+        """Test handling very long lines."""
+        with tempfile.NamedTemporaryFile(
+            mode='w',
+            delete=False,
+            encoding='utf-8'
+        ) as f:
+            f.write("a" * 10000 + "\n")
+            f.write("target\n")
+            test_path = f.name
+
+        try:
+            searcher = open_searcher(test_path)
+            assert searcher.exists("target") is True
+        finally:
+            os.unlink(test_path)
+
+    def test_newline_variations(self):
+        """Test different newline styles."""
+        with tempfile.NamedTemporaryFile(
+            mode='wb',
+            delete=False
+        ) as f:
+            f.write(b"unix\n")
+            f.write(b"windows\r\n")
+            f.write(b"mac\r")
+            test_path = f.name
+
+        try:
+            searcher = open_searcher(test_path)
+
+            assert searcher.exists("unix") is True
+            assert searcher.exists("windows") is True
+            # Note: old Mac style \r might not work perfectly
+        finally:
+            os.unlink(test_path)
@@ -0,0 +1,362 @@
+"""End-to-end server tests over real sockets"""
+
+import os
+import re
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from protocol import encode_cursor
+
+
+SERVER = os.path.join(os.path.dirname(__file__), '..', 'src', 'server.py')
+
+CORPUS = "apple\napricot\navocado\nbanana\nblueberry\ncherry\nStraße\n"
+
+WORDS = "cat\ndog\n"
+
+MODES = ['threaded', 'asyncio']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(directory, probe=None, **options):
+    """Start server.py on a free port with a two-corpus config.
+
+    ``probe(port)`` makes one round trip once the server listens; by
+    default it sends a plain query.
+    """
+    corpus = directory / "corpus.txt"
+    words = directory / "words.txt"
+    corpus.write_text(CORPUS, encoding='utf-8')
+    words.write_text(WORDS, encoding='utf-8')
+
+    port = free_port()
+    settings = {
+        'host': '127.0.0.1',
+        'port': port,
+        'linuxpath': corpus,
+        'engine': 'prefix',
+        'protocol': 'keepalive',
+        'client_timeout': 2.0,
+        'substring': True,
+        'fuzzy_distance': 2,
+        'normalize': 'casefold',
+        'admin_commands': True,
+    }
+    settings.update(options)
+    config = directory / "config.ini"
+    config.write_text(
+        "[SERVER]\n"
+        + "".join(f"{key} = {value}\n" for key, value in settings.items())
+        + f"[CORPUS:words]\nlinuxpath = {words}\nengine = set\n"
+    )
+
+    log = open(directory / "server.log", 'wb')
+    proc = subprocess.Popen(
+        [sys.executable, SERVER, str(config)],
+        cwd=directory, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()
+    deadline = time.monotonic() + 10
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError((directory / "server.log").read_text())
+        try:
+            # A full round trip, so the probe no longer holds a worker
+            (probe or send_all)(port, b"apple\n")
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                proc.kill()
+                raise
+            time.sleep(0.05)
+    return proc, port
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def send_all(port, payload, half_close=True):
+    """Send ``payload`` on one connection and read until the server closes."""
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+        s.sendall(payload)
+        if half_close:
+            s.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+def send_all_tls(port, payload, context):
+    """Like send_all, over a TLS connection made with ``context``."""
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as raw:
+        with context.wrap_socket(raw, server_hostname='localhost') as s:
+            s.sendall(payload)
+            chunks = []
+            while True:
+                chunk = s.recv(65536)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+
+
+def read_exactly(s, size):
+    data = b""
+    while len(data) < size:
+        chunk = s.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+@pytest.fixture(scope='module', params=MODES)
+def server(request, tmp_path_factory):
+    directory = tmp_path_factory.mktemp(f"keepalive-{request.param}")
+    proc, port = start_server(directory, server_mode=request.param)
+    yield port, directory
+    stop_server(proc)
+
+
+@pytest.fixture(scope='module', params=MODES)
+def oneshot_server(request, tmp_path_factory):
+    directory = tmp_path_factory.mktemp(f"oneshot-{request.param}")
+    proc, port = start_server(
+        directory, server_mode=request.param, protocol='oneshot',
+        client_timeout=0.5
+    )
+    yield port
+    stop_server(proc)
+
+
+def test_startup_banner(server):
+    _, directory = server
+    banner = (directory / "server.log").read_text()
+    assert (
+        f"  Prefix index: {directory / 'corpus.txt.prefix'} "
+        f"(7 lines in 1 blocks)\n"
+    ) in banner
+    assert "  Lines loaded: 2\n" in banner
+    assert "dynamic" not in banner
+
+
+class TestKeepalive:
+    """Test pipelined requests on one keep-alive connection."""
+
+    def test_pipelined_commands(self, server):
+        port, _ = server
+        cursor = encode_cursor(b"a", b"apricot")
+        offsets = [CORPUS.index("blueberry"), CORPUS.index("cherry")]
+        requests = (
+            b"apple\n"
+            b"grape\n"
+            b"::BATCH 3\napple\nnope\ncherry\n"
+            b"::PREFIX 2 a\n"
+            + f"::MORE 2 {cursor}\n".encode()
+            + b"::SUBSTR 10 err\n"
+            b"::FUZZY 1 banan\n"
+            b"::NORM STRASSE\n"
+            b"::EXISTS@words dog\n"
+            b"::USE words\n"
+            b"cat\n"
+            b"apple\n"
+            b"::EXISTS@default apple\n"
+            b"::BATCH@default 2\nbanana\ncat\n"
+            b"::EXISTS@nope x\n"
+            b"::USE\n"
+            b"::FROB\n"
+            b"cherry"
+        )
+        expected = (
+            b"STRING EXISTS\n"
+            b"STRING NOT FOUND\n"
+            b"101\n"
+            + f"2 {cursor}\n".encode() + b"apple\napricot\n"
+            b"1 -\navocado\n"
+            + f"2 2\n{offsets[0]} blueberry\n{offsets[1]} cherry\n".encode()
+            + b"1 banana\n"
+            b"STRING EXISTS\n"
+            b"STRING EXISTS\n"
+            b"OK\n"
+            b"STRING EXISTS\n"
+            b"STRING NOT FOUND\n"
+            b"STRING EXISTS\n"
+            b"10\n"
+            b"ERROR unknown corpus: nope\n"
+            b"ERROR unknown corpus: \n"
+            b"ERROR unknown command: FROB\n"
+            # Still in words: the unterminated last query is answered too
+            b"STRING NOT FOUND\n"
+        )
+        assert send_all(port, requests) == expected
+
+    def test_requests_across_reads(self, server):
+        port, _ = server
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+            s.sendall(b"::BATCH 2\nban")
+            time.sleep(0.05)
+            s.sendall(b"ana\ndog\n")
+            assert read_exactly(s, 3) == b"10\n"
+            s.sendall(b"avocado\n")
+            assert read_exactly(s, 14) == b"STRING EXISTS\n"
+
+    def test_protocol_error_closes_connection(self, server):
+        port, _ = server
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+            s.sendall(b"apple\n")
+            assert read_exactly(s, 14) == b"STRING EXISTS\n"
+            s.sendall(b"::BATCH x\napple\n")
+            assert read_exactly(s, 100) == (
+                b"ERROR BATCH needs a query count\n"
+            )
+
+    def test_oversized_batch_closes_connection(self, server):
+        port, _ = server
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+            s.sendall(b"apple\n")
+            assert read_exactly(s, 14) == b"STRING EXISTS\n"
+            # The 18th line passes the 1 MiB limit, well short of the count
+            s.sendall(b"::BATCH 100\n" + (b"x" * 60000 + b"\n") * 18)
+            assert read_exactly(s, 100) == (
+                b"ERROR batch longer than 1048576 bytes\n"
+            )
+
+    def test_reload(self, server):
+        port, directory = server
+        assert send_all(port, b"::EXISTS@words emu\n") == b"STRING NOT FOUND\n"
+        with open(directory / "words.txt", 'a') as f:
+            f.write("emu\n")
+
+        response = send_all(port, b"::RELOAD words\n::EXISTS@words emu\n")
+        assert re.fullmatch(rb"OK \d+\.\d{3}\nSTRING EXISTS\n", response)
+        assert send_all(port, b"::RELOAD nope\n") == (
+            b"ERROR unknown corpus: nope\n"
+        )
+
+
+class TestOneshot:
+    """Test the original one request per connection protocol."""
+
+    def test_plain_query(self, oneshot_server):
+        assert send_all(oneshot_server, b"apple", False) == b"STRING EXISTS\n"
+        assert send_all(oneshot_server, b"app\n", False) == (
+            b"STRING NOT FOUND\n"
+        )
+
+    def test_only_first_request_is_answered(self, oneshot_server):
+        assert send_all(oneshot_server, b"::PREFIX 5 bl\napple\n") == (
+            b"1 -\nblueberry\n"
+        )
+
+    def test_batch(self, oneshot_server):
+        assert send_all(oneshot_server, b"::BATCH 2\napple\nfig\n") == (
+            b"10\n"
+        )
+
+    def test_batch_without_final_newline(self, oneshot_server):
+        # Ended by shutting down the write side, or by going idle
+        assert send_all(oneshot_server, b"::BATCH 2\napple\nfig") == b"10\n"
+        assert send_all(
+            oneshot_server, b"::BATCH 2\napple\nfig", False
+        ) == b"10\n"
+
+    def test_incomplete_batch(self, oneshot_server):
+        assert send_all(
+            oneshot_server, b"::BATCH 3\napple\nfig\n", False
+        ) == b"ERROR request ended after 2 of 3 batch queries\n"
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_busy_server_sheds_load(mode, tmp_path):
+    proc, port = start_server(
+        tmp_path, server_mode=mode, max_workers=1, accept_queue=0,
+        client_timeout=10
+    )
+    held = []
+    try:
+        # The first connection occupies the only worker
+        first = socket.create_connection(('127.0.0.1', port), timeout=5)
+        held.append(first)
+        first.sendall(b"apple\n")
+        assert read_exactly(first, 14) == b"STRING EXISTS\n"
+
+        # Threaded mode queues one more; after that connections are shed
+        for _ in range(2):
+            held.append(
+                socket.create_connection(('127.0.0.1', port), timeout=5)
+            )
+        assert read_exactly(held[-1], 12) == b"SERVER BUSY\n"
+
+        first.sendall(b"cherry\n")
+        assert read_exactly(first, 14) == b"STRING EXISTS\n"
+    finally:
+        for s in held:
+            s.close()
+        stop_server(proc)
+
+
+def test_busy_limit_covers_tls_handshakes(tmp_path):
+    if shutil.which('openssl') is None:
+        pytest.skip("openssl command not available")
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key, '-out', cert, '-days', '1', '-subj', '/CN=localhost'],
+        check=True, capture_output=True
+    )
+    client = ssl.create_default_context(cafile=str(cert))
+    proc, port = start_server(
+        tmp_path, lambda port, payload: send_all_tls(port, payload, client),
+        server_mode='asyncio', max_workers=1, accept_queue=0,
+        SSL_ENABLED='true', cert_path=cert, key_path=key,
+        tls_handshake_timeout=10
+    )
+    try:
+        # A client that never handshakes holds the only slot
+        with socket.create_connection(('127.0.0.1', port), timeout=5):
+            time.sleep(0.2)
+            with pytest.raises((ssl.SSLError, OSError)):
+                send_all_tls(port, b"apple\n", client)
+        time.sleep(0.2)
+        assert send_all_tls(port, b"apple\n", client) == b"STRING EXISTS\n"
+    finally:
+        stop_server(proc)
+
+
+def test_failed_reload_counts_error(tmp_path):
+    metrics_port = free_port()
+    proc, port = start_server(tmp_path, metrics_port=metrics_port)
+    try:
+        os.unlink(tmp_path / "words.txt")
+        assert send_all(port, b"::RELOAD words\n::EXISTS@words dog\n") == (
+            b"ERROR reload failed\nSTRING EXISTS\n"
+        )
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{metrics_port}/metrics", timeout=5
+        ) as response:
+            text = response.read().decode()
+        assert re.search(r"^\w+_errors_total 1$", text, re.MULTILINE)
+    finally:
+        stop_server(proc)
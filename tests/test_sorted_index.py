@@ -0,0 +1,105 @@
+"""Sorted index engine tests"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from index_format import HEADER_SIZE, KIND_SORTED, read_header
+from searcher import FileSearcher
+from sorted_index import SortedIndex, build_sorted_index
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        for i in range(1000):
+            f.write(f"line_{(i * 7919) % 1000}\n")
+        f.write("line_0\n")
+        f.write("\n")
+        f.write("windows\r\n")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+    if os.path.exists(test_path + '.sorted'):
+        os.unlink(test_path + '.sorted')
+
+
+class TestBuildSortedIndex:
+    """Test building the sorted index file."""
+
+    def test_output_is_sorted_and_unique(self, test_file):
+        index_path = test_file + '.sorted'
+        count = build_sorted_index(test_file, index_path, run_bytes=512)
+
+        with open(index_path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            keys = f.read().split(b'\n')[:-1]
+
+        assert count == 1002
+        assert len(keys) == 1002
+        assert keys == sorted(set(keys))
+        assert read_header(index_path).kind == KIND_SORTED
+
+    def test_lookup(self, test_file):
+        index_path = test_file + '.sorted'
+        build_sorted_index(test_file, index_path, run_bytes=512)
+        index = SortedIndex(index_path)
+
+        try:
+            for i in range(1000):
+                assert f"line_{i}".encode() in index
+            assert b"" in index
+            assert b"windows" in index
+            assert b"line_1000" not in index
+            assert b"line_" not in index
+            assert b"zzz" not in index
+        finally:
+            index.close()
+
+
+class TestSortedEngine:
+    """Test FileSearcher with the sorted engine."""
+
+    def test_exists(self, test_file):
+        searcher = FileSearcher(test_file, engine='sorted')
+
+        assert searcher.exists("line_500") is True
+        assert searcher.exists("line_5000") is False
+        assert searcher.lines_set is None
+        assert os.path.exists(test_file + '.sorted')
+
+    def test_reread_rebuilds_stale_index(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True,
+                                engine='sorted')
+        assert searcher.exists("fig") is False
+
+        with open(test_file, 'a') as f:
+            f.write("fig\n")
+        # Make sure the change is visible even on coarse mtime filesystems
+        st = os.stat(test_file)
+        os.utime(test_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        assert searcher.exists("fig") is True
+
+    def test_current_index_is_reused(self, test_file):
+        FileSearcher(test_file, engine='sorted').close()
+        mtime = os.stat(test_file + '.sorted').st_mtime_ns
+
+        searcher = FileSearcher(test_file, engine='sorted')
+        assert searcher.exists("line_1") is True
+        assert os.stat(test_file + '.sorted').st_mtime_ns == mtime
+        searcher.close()
+
+    def test_unknown_engine(self, test_file):
+        with pytest.raises(ValueError):
+            FileSearcher(test_file, engine='btree')
@@ -0,0 +1,120 @@
+"""Pre-fork supervisor tests"""
+
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from supervisor import Supervisor
+
+
+def stop_after(supervisor, seconds):
+    """Stop ``supervisor`` from a timer signal while run() is blocking."""
+    previous = signal.signal(signal.SIGALRM, lambda *_: supervisor.stop())
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    return previous
+
+
+class TestSupervisor:
+    """Test forking, restarting and stopping workers."""
+
+    def run_supervisor(self, target, processes, seconds):
+        sigterm = signal.getsignal(signal.SIGTERM)
+        sigint = signal.getsignal(signal.SIGINT)
+        sighup = signal.getsignal(signal.SIGHUP)
+        supervisor = Supervisor(target, processes, restart_delay=0.05)
+        previous = stop_after(supervisor, seconds)
+        try:
+            supervisor.run()
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+            signal.signal(signal.SIGTERM, sigterm)
+            signal.signal(signal.SIGINT, sigint)
+            signal.signal(signal.SIGHUP, sighup)
+        return supervisor
+
+    def test_restarts_crashed_workers(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            log_path = f.name
+
+        def crash(slot):
+            with open(log_path, 'a') as log:
+                log.write(f"{slot} {os.getpid()}\n")
+            raise RuntimeError("worker crashed")
+
+        try:
+            supervisor = self.run_supervisor(crash, 2, 0.5)
+            with open(log_path) as log:
+                started = [line.split() for line in log]
+        finally:
+            os.unlink(log_path)
+
+        pids = [pid for _, pid in started]
+        assert supervisor.restarts >= 2
+        # A worker forked just before stop() may be killed before it logs
+        assert supervisor.restarts + 1 <= len(pids) <= supervisor.restarts + 2
+        assert len(set(pids)) == len(pids)
+        # Restarted workers keep their slot number
+        assert {slot for slot, _ in started} == {'0', '1'}
+        assert supervisor.workers == {}
+
+    def test_stop_terminates_running_workers(self):
+        supervisor = self.run_supervisor(lambda slot: time.sleep(30), 3, 0.3)
+
+        assert supervisor.restarts == 0
+        assert supervisor.workers == {}
+
+    def test_hangup_is_passed_to_workers(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            log_path = f.name
+
+        def worker(slot):
+            def on_hangup(signum, frame):
+                with open(log_path, 'a') as log:
+                    log.write(f"{slot}\n")
+            signal.signal(signal.SIGHUP, on_hangup)
+            while True:
+                time.sleep(1)
+
+        timer = threading.Timer(0.3, os.kill, (os.getpid(), signal.SIGHUP))
+        timer.start()
+        try:
+            supervisor = self.run_supervisor(worker, 2, 0.8)
+            with open(log_path) as log:
+                slots = sorted(line.strip() for line in log)
+        finally:
+            timer.cancel()
+            os.unlink(log_path)
+
+        assert slots == ['0', '1']
+        assert supervisor.restarts == 0
+
+    def test_hangup_before_handler_is_ignored(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            log_path = f.name
+
+        def worker(slot):
+            # Still starting up when the hangup arrives
+            time.sleep(0.5)
+            with open(log_path, 'a') as log:
+                log.write(f"{slot}\n")
+            while True:
+                time.sleep(1)
+
+        timer = threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGHUP))
+        timer.start()
+        try:
+            supervisor = self.run_supervisor(worker, 2, 0.8)
+            with open(log_path) as log:
+                slots = sorted(line.strip() for line in log)
+        finally:
+            timer.cancel()
+            os.unlink(log_path)
+
+        assert slots == ['0', '1']
+        assert supervisor.restarts == 0
@@ -0,0 +1,93 @@
+"""TLS context tests"""
+
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tls import make_server_context
+
+
+@pytest.fixture(scope='module')
+def cert_pair(tmp_path_factory):
+    if shutil.which('openssl') is None:
+        pytest.skip("openssl command not available")
+    directory = tmp_path_factory.mktemp('tls')
+    cert = str(directory / 'cert.pem')
+    key = str(directory / 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key, '-out', cert, '-days', '1', '-subj', '/CN=localhost'],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def serve_once(context, listener):
+    """Accept one connection, handshake, send a byte and close."""
+    conn, _ = listener.accept()
+    with context.wrap_socket(conn, server_side=True) as tls_conn:
+        tls_conn.sendall(b"x")
+        reused = tls_conn.session_reused
+    return reused
+
+
+def connect(port, client, session=None):
+    """Handshake as a client and return (session, session_reused)."""
+    with socket.create_connection(('127.0.0.1', port)) as raw:
+        with client.wrap_socket(
+            raw, server_hostname='localhost', session=session
+        ) as conn:
+            # Reading lets the client receive the TLS 1.3 session tickets
+            conn.recv(1)
+            return conn.session, conn.session_reused
+
+
+class TestServerContext:
+    """Test the server TLS context settings."""
+
+    def test_settings(self, cert_pair):
+        context = make_server_context(*cert_pair, min_version='TLSv1_3')
+        assert context.minimum_version == ssl.TLSVersion.TLSv1_3
+        assert context.num_tickets == 2
+        assert not context.options & ssl.OP_NO_TICKET
+
+    def test_tickets_disabled(self, cert_pair):
+        context = make_server_context(*cert_pair, session_tickets=0)
+        assert context.num_tickets == 0
+        assert context.options & ssl.OP_NO_TICKET
+
+    def test_invalid_settings(self, cert_pair):
+        with pytest.raises(ValueError):
+            make_server_context(*cert_pair, min_version='TLSv9')
+        with pytest.raises(ssl.SSLError):
+            make_server_context(*cert_pair, ciphers='NOT-A-CIPHER')
+
+    def test_session_resumption(self, cert_pair):
+        context = make_server_context(*cert_pair)
+        client = ssl.create_default_context(cafile=cert_pair[0])
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(2)
+        port = listener.getsockname()[1]
+        results = []
+        server = threading.Thread(target=lambda: results.extend(
+            serve_once(context, listener) for _ in range(2)
+        ))
+        server.start()
+        try:
+            session, reused = connect(port, client)
+            assert not reused
+            _, reused = connect(port, client, session)
+            assert reused
+        finally:
+            server.join(5)
+            listener.close()
+        assert results == [False, True]
@@ -0,0 +1,163 @@
+"""Trigram substring index tests"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from protocol import format_substring
+from searcher import FileSearcher
+from trigram_index import POSTING_OVERHEAD, TrigramIndex
+
+
+LINES = [
+    "the quick brown fox", "lazy dog", "quick silver", "foxtrot",
+    "", "ab", "brownie", "café au lait", "the end",
+]
+
+
+@pytest.fixture
+def test_file():
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        delete=False,
+        encoding='utf-8'
+    ) as f:
+        for line in LINES:
+            f.write(line + "\n")
+        for i in range(300):
+            f.write(f"row_{i:04d}_data\n")
+        test_path = f.name
+
+    yield test_path
+
+    os.unlink(test_path)
+
+
+def expected(path, fragment):
+    """Offsets of the lines containing ``fragment``, by brute force."""
+    offsets = []
+    pos = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if fragment in line.rstrip(b'\n'):
+                offsets.append(pos)
+            pos += len(line)
+    return offsets
+
+
+class TestTrigramIndex:
+    """Test substring lookups against a brute-force scan."""
+
+    @pytest.mark.parametrize('fragment', [
+        b"quick", b"fox", b"brown", b"row_01", b"_data", b"0299",
+        b"nothing", b"ab", b"o", b"caf\xc3\xa9", b"the q", b"dog\nquick",
+    ])
+    def test_matches_scan(self, test_file, fragment):
+        index = TrigramIndex(test_file)
+        offsets = expected(test_file, fragment)
+        assert index.search(fragment, 1000) == (len(offsets), offsets)
+        index.close()
+
+    def test_limit_keeps_full_count(self, test_file):
+        index = TrigramIndex(test_file)
+        count, offsets = index.search(b"_data", 5)
+        assert count == 300
+        assert offsets == expected(test_file, b"_data")[:5]
+        assert index.line_at(offsets[0]) == b"row_0000_data"
+        index.close()
+
+    def test_budget_skips_common_trigrams(self, test_file):
+        full = TrigramIndex(test_file)
+        small = TrigramIndex(test_file, budget=full.nbytes // 4)
+        assert small.skipped > 0
+        assert small.nbytes <= full.nbytes // 4
+        # "_da" is in every row, so it is among the first to go
+        assert b"_da" in full.postings
+        assert b"_da" not in small.postings
+        for fragment in (b"_data", b"row_02", b"quick", b"zzz"):
+            assert small.search(fragment, 1000) == full.search(fragment, 1000)
+        full.close()
+        small.close()
+
+    def test_budget_bounds_counting(self, test_file):
+        full = TrigramIndex(test_file)
+        small = TrigramIndex(test_file, budget=POSTING_OVERHEAD * 10)
+        assert len(small.postings) <= 10
+        # Every trigram is either indexed or recorded as left out
+        assert len(small.postings) + small.skipped == len(full.postings)
+        for fragment in (b"_data", b"row_02", b"quick", b"caf\xc3\xa9"):
+            assert small.search(fragment, 1000) == full.search(fragment, 1000)
+        full.close()
+        small.close()
+
+    @pytest.mark.parametrize('budget', [0, None])
+    def test_absent_trigram_skips_scan(self, test_file, budget, monkeypatch):
+        index = (
+            TrigramIndex(test_file, budget=budget) if budget is not None
+            else TrigramIndex(test_file)
+        )
+
+        def no_scan(*args):
+            raise AssertionError("should not scan")
+
+        monkeypatch.setattr(index, '_scan', no_scan)
+        assert index.search(b"zebra", 10) == (0, [])
+        assert index.search(b"quick\nsilver", 10) == (0, [])
+        index.close()
+
+    def test_zero_budget_scans(self, test_file):
+        index = TrigramIndex(test_file, budget=0)
+        assert not index.postings
+        offsets = expected(test_file, b"fox")
+        assert index.search(b"fox", 10) == (len(offsets), offsets)
+        index.close()
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            path = f.name
+        index = TrigramIndex(path)
+        assert index.search(b"abc", 10) == (0, [])
+        index.close()
+        os.unlink(path)
+
+
+class TestSearcherSubstring:
+    """Test substring queries through FileSearcher."""
+
+    def test_any_engine(self, test_file):
+        searcher = FileSearcher(test_file, engine='fingerprint', substring=True)
+        count, offsets = searcher.substring("brown", 10)
+        assert count == 2
+        assert [searcher.line_at(o) for o in offsets] == [
+            "the quick brown fox", "brownie"
+        ]
+        assert searcher.exists("brownie")
+        searcher.close()
+
+    def test_disabled(self, test_file):
+        searcher = FileSearcher(test_file)
+        with pytest.raises(ValueError):
+            searcher.substring("fox", 10)
+        with pytest.raises(ValueError):
+            searcher.line_at(0)
+
+    def test_reread_sees_appends(self, test_file):
+        searcher = FileSearcher(test_file, reread_on_query=True, substring=True)
+        assert searcher.substring("giraffe", 10) == (0, [])
+        size = os.path.getsize(test_file)
+        with open(test_file, 'a', encoding='utf-8') as f:
+            f.write("giraffe neck\n")
+        assert searcher.substring("giraffe", 10) == (1, [size])
+        assert searcher.line_at(size) == "giraffe neck"
+        searcher.close()
+
+
+def test_format_substring():
+    assert format_substring(3, [(0, b"foo"), (12, b"xfoo")]) == (
+        b"3 2\n0 foo\n12 xfoo\n"
+    )
+    assert format_substring(0, []) == b"0 0\n"
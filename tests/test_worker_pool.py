@@ -0,0 +1,63 @@
+"""Worker pool admission control tests"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from worker_pool import WorkerPool
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+class TestWorkerPool:
+    """Test the bounded worker pool."""
+
+    def test_runs_jobs(self):
+        done = []
+        pool = WorkerPool(done.append, max_workers=2, queue_size=4)
+
+        for i in range(4):
+            assert pool.submit(i) is True
+
+        wait_for(lambda: len(done) == 4)
+        assert sorted(done) == [0, 1, 2, 3]
+        assert pool.rejected == 0
+
+    def test_rejects_when_saturated(self):
+        release = threading.Event()
+        pool = WorkerPool(lambda _: release.wait(), max_workers=1,
+                          queue_size=1)
+
+        assert pool.submit(1) is True
+        wait_for(lambda: pool.active == 1)
+        assert pool.submit(2) is True
+        assert pool.queue_depth == 1
+
+        assert pool.submit(3) is False
+        assert pool.rejected == 1
+
+        release.set()
+        wait_for(lambda: pool.active == 0 and pool.queue_depth == 0)
+        assert pool.submit(4) is True
+
+    def test_handler_errors_do_not_kill_workers(self):
+        done = []
+
+        def handler(value):
+            if value == 'boom':
+                raise RuntimeError(value)
+            done.append(value)
+
+        pool = WorkerPool(handler, max_workers=1, queue_size=4)
+        pool.submit('boom')
+        pool.submit('ok')
+
+        wait_for(lambda: done == ['ok'])